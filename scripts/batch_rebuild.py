@@ -0,0 +1,25 @@
+import argparse
+import asyncio
+import os
+import pathlib
+import sys
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.modules.memory.service import rebuild_memory_from_history
+
+async def run(history_file):
+    history_text = pathlib.Path(history_file).read_text(encoding="utf-8")
+    print(f"📜 Rebuilding ledgers from {history_file} ({len(history_text)} chars)...")
+    count = await rebuild_memory_from_history(history_text, use_batch=True)
+    print(f"✅ {count} ledger files written to ./memory")
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild ./memory ledgers from exported channel history as a batch job, outside the bot process.")
+    parser.add_argument("history", help="Text file with one 'author: message' line per message")
+    args = parser.parse_args()
+    asyncio.run(run(args.history))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.modules.narrative.parser import NARRATIVE_CHAR_LIMIT, render_table_as_ascii, smart_chunk_text
+
+class _Block:
+    """Stands in for the regex match `render_table_as_ascii` expects."""
+
+    def __init__(self, body):
+        self.body = body
+
+    def group(self, n):
+        return self.body
+
+def synthetic_response(size, seed=0):
+    """GM-style text of at least `size` chars: narrative paragraphs with DATA_TABLE renders mixed in."""
+    rng = random.Random(seed)
+    words = ["The", "torchlight", "flickers", "across", "wet", "stone.", "Kaelen", "draws", "steel!", "Who", "moves", "first?", "A", "goblin", "shrieks."]
+    parts = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.2:
+            rows = "\n".join(f"Item {i} | {rng.randint(1, 500)} gp | {' '.join(rng.choices(words, k=4))}" for i in range(rng.randint(3, 40)))
+            part = render_table_as_ascii(_Block(f"Title: Loot\nName | Cost | Notes\n{rows}"))
+        else:
+            part = "\n".join(" ".join(rng.choices(words, k=rng.randint(8, 60))) for _ in range(rng.randint(1, 4)))
+        parts.append(part)
+        length += len(part) + 2
+    return "\n\n".join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark smart_chunk_text on long GM outputs (offline).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2_000, 20_000, 200_000, 2_000_000], help="Response sizes in characters")
+    parser.add_argument("--limit", type=int, default=NARRATIVE_CHAR_LIMIT, help="Chunk size limit")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed runs per size")
+    args = parser.parse_args()
+
+    print(f"📊 smart_chunk_text, limit={args.limit}, best/median of {args.rounds} runs")
+    for size in args.sizes:
+        text = synthetic_response(size)
+        samples = []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            chunks = smart_chunk_text(text, limit=args.limit)
+            samples.append(time.perf_counter() - started)
+        longest = max(len(c) for c in chunks)
+        split_fences = sum(1 for c in chunks if c.count("```") % 2)
+        per_kb = min(samples) / (len(text) / 1000) * 1e6
+        print(
+            f"{len(text):>10} chars  {len(chunks):>5} chunks  best={min(samples) * 1000:8.2f} ms  "
+            f"median={statistics.median(samples) * 1000:8.2f} ms  {per_kb:6.1f} µs/KB  longest={longest}  unbalanced={split_fences}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Offline run: nothing below may reach the network
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+os.environ.setdefault("LLM_RESPONSE_CACHE", "false")
+
+from src.core.llm_replay import ReplayProvider
+from src.modules.narrative.parser import process_response_formatting, apply_length_guard, smart_chunk_text
+
+def _summary(name, samples):
+    if not samples:
+        return f"{name:<10} n=0"
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"{name:<10} n={len(samples):<4} mean={statistics.mean(samples) * 1000:8.2f} ms  p50={statistics.median(samples) * 1000:8.2f} ms  p95={p95 * 1000:8.2f} ms"
+
+async def run(fixture, realtime, speed, rounds):
+    provider = ReplayProvider(fixture, realtime=realtime, speed=speed)
+    timings = {"llm": [], "parser": [], "chunking": [], "ledgers": []}
+
+    # save_ledger_files writes to ./memory: run the ledger stage inside a scratch directory
+    from src.modules.memory.service import save_ledger_files
+    workdir = tempfile.mkdtemp(prefix="ledger-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for _ in range(rounds):
+            for record in provider.records:
+                started = time.perf_counter()
+                text = await provider.replay(record)
+                timings["llm"].append(time.perf_counter() - started)
+
+                if "```FILE:" in text or "FILE:" in text[:200]:
+                    # Memory Architect output
+                    started = time.perf_counter()
+                    save_ledger_files(text)
+                    timings["ledgers"].append(time.perf_counter() - started)
+                    continue
+
+                started = time.perf_counter()
+                final_text = process_response_formatting(text)[0]
+                final_text, _ = apply_length_guard(final_text)
+                timings["parser"].append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                smart_chunk_text(final_text)
+                timings["chunking"].append(time.perf_counter() - started)
+    finally:
+        os.chdir(cwd)
+
+    mode = f"realtime x{speed}" if realtime else "zero-delay"
+    print(f"\n📊 Replayed {len(provider.records)} recorded calls x {rounds} round(s) ({mode})")
+    for name, samples in timings.items():
+        print(_summary(name, samples))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the response pipeline against recorded LLM calls (offline).")
+    parser.add_argument("fixture", help="JSONL file captured with LLM_RECORD_FILE")
+    parser.add_argument("--realtime", action="store_true", help="Reproduce the recorded LLM latency")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed-up factor for --realtime")
+    parser.add_argument("--rounds", type=int, default=1, help="How many times to replay the fixture")
+    args = parser.parse_args()
+    asyncio.run(run(args.fixture, args.realtime, args.speed, args.rounds))
+
+if __name__ == "__main__":
+    main()
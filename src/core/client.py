@@ -1,15 +1,107 @@
 
 import discord
-from google import genai
-from .config import GEMINI_API_KEY, LLM_PROVIDER
-from .llm import ProviderFactory
+from .config import (
+    GEMINI_API_KEY, LLM_PROVIDER, GEMINI_CONTEXT_CACHE, GEMINI_CONTEXT_CACHE_TTL,
+    GENAI_MAX_CONNECTIONS, GENAI_KEEPALIVE_EXPIRY,
+    LLM_RESPONSE_CACHE, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL, LLM_CACHE_DIR,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX, LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET,
+    LLM_TIMEOUT, LLM_HEDGE_PERCENTILE, LLM_RPM, LLM_TPM, LLM_RATE_RESERVE,
+    LLM_RECORD_FILE, LLM_REPLAY_FILE, LLM_REPLAY_REALTIME, LLM_REPLAY_STRICT,
+    OLLAMA_HOST, OLLAMA_KEEP_ALIVE, OLLAMA_MAX_CONCURRENCY,
+    MODEL_GM_FALLBACK, MODEL_ARCHITECT_FALLBACK, MODEL_FEEDBACK_FALLBACK,
+    LLM_SLO_P95, LLM_SLO_ERROR_RATE, LLM_SLO_WINDOW,
+    LLM_TELEMETRY_MAX_RECORDS, LLM_TELEMETRY_FILE
+)
+from .genai_clients import genai_registry
+from .llm import ProviderFactory, ResilientProvider
+from .llm_cache import CachingProvider, ResponseCache
+from .llm_replay import RecordingProvider
+from .ollama import PrefixRouter
+from .rate_limit import RateLimitedProvider, RateLimiter
+from .routing import ModelRouter
+from .telemetry import Telemetry, TelemetryProvider
 
 # Initialize Clients
+# One pooled genai.Client is shared by the LLM provider, TTS and terminal mode
+genai_registry.configure(max_connections=GENAI_MAX_CONNECTIONS, keepalive_expiry=GENAI_KEEPALIVE_EXPIRY)
+
+def get_gemini_client():
+    """The shared genai.Client. Created on first use, so replay and Ollama runs need no Gemini key."""
+    return genai_registry.get(GEMINI_API_KEY)
+
 # client_genai is kept for backward compatibility if needed, but we should move to llm_provider
-client_genai = genai.Client(api_key=GEMINI_API_KEY, http_options={'api_version': 'v1beta'})
+client_genai = get_gemini_client() if LLM_PROVIDER.lower() == "gemini" else None
 
 # New Modular Provider
-llm_provider = ProviderFactory.get_provider(LLM_PROVIDER, api_key=GEMINI_API_KEY)
+llm_provider = ProviderFactory.get_provider(
+    LLM_PROVIDER,
+    api_key=GEMINI_API_KEY,
+    context_cache=GEMINI_CONTEXT_CACHE,
+    cache_ttl=GEMINI_CONTEXT_CACHE_TTL,
+    replay_file=LLM_REPLAY_FILE,
+    replay_realtime=LLM_REPLAY_REALTIME,
+    replay_strict=LLM_REPLAY_STRICT,
+    ollama_host=OLLAMA_HOST,
+    ollama_keep_alive=OLLAMA_KEEP_ALIVE,
+    ollama_max_concurrency=OLLAMA_MAX_CONCURRENCY
+)
+
+# Local models: any MODEL_* set to "ollama:<model>" runs on the Ollama server
+ollama_provider = llm_provider if LLM_PROVIDER.lower() == "ollama" else ProviderFactory.get_provider(
+    "ollama",
+    ollama_host=OLLAMA_HOST,
+    ollama_keep_alive=OLLAMA_KEEP_ALIVE,
+    ollama_max_concurrency=OLLAMA_MAX_CONCURRENCY
+)
+# Shared remote quota, served by priority class (callers pass caller="gm"/"feedback"/"bard"/"architect"/"rebuild")
+if LLM_RPM or LLM_TPM:
+    llm_provider = RateLimitedProvider(llm_provider, RateLimiter(rpm=LLM_RPM, tpm=LLM_TPM, reserve=LLM_RATE_RESERVE))
+
+llm_provider = PrefixRouter(llm_provider, {"ollama": ollama_provider})
+
+# Capture raw provider calls (fingerprint, response, latency) for offline replay
+if LLM_RECORD_FILE:
+    llm_provider = RecordingProvider(llm_provider, LLM_RECORD_FILE)
+
+# Retries with backoff, per-model circuit breakers, deadlines and optional hedging
+llm_provider = ResilientProvider(
+    llm_provider,
+    max_retries=LLM_MAX_RETRIES,
+    backoff_base=LLM_BACKOFF_BASE,
+    backoff_max=LLM_BACKOFF_MAX,
+    breaker_threshold=LLM_BREAKER_THRESHOLD,
+    breaker_reset=LLM_BREAKER_RESET,
+    timeout=LLM_TIMEOUT or None,
+    hedge_percentile=LLM_HEDGE_PERCENTILE
+)
+
+# Per-persona fallback models while the primary breaches its latency/error SLO
+persona_fallbacks = {
+    "gm": MODEL_GM_FALLBACK,
+    "bard": MODEL_GM_FALLBACK,
+    "architect": MODEL_ARCHITECT_FALLBACK,
+    "rebuild": MODEL_ARCHITECT_FALLBACK,
+    "feedback": MODEL_FEEDBACK_FALLBACK,
+}
+if any(persona_fallbacks.values()):
+    llm_provider = ModelRouter(
+        llm_provider,
+        persona_fallbacks,
+        p95_slo=LLM_SLO_P95,
+        error_budget=LLM_SLO_ERROR_RATE,
+        window=LLM_SLO_WINDOW
+    )
+
+# Repeatable calls (feedback, recaps) opt in per call with use_cache=True
+if LLM_RESPONSE_CACHE:
+    llm_provider = CachingProvider(
+        llm_provider,
+        ResponseCache(max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL, disk_dir=LLM_CACHE_DIR or None)
+    )
+
+# One record per call as the caller sees it (tokens reported by the provider, wall time incl. retries)
+llm_telemetry = Telemetry(max_records=LLM_TELEMETRY_MAX_RECORDS, dump_path=LLM_TELEMETRY_FILE or None)
+llm_provider = TelemetryProvider(llm_provider, llm_telemetry)
 
 intents = discord.Intents.default()
 intents.message_content = True 
@@ -12,6 +12,56 @@ TARGET_CHANNEL_ID_STR = os.getenv("TARGET_CHANNEL_ID")
 AI_MODEL = os.getenv("AI_MODEL", "gemini-2.0-flash-lite")
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
 
+# Explicit Gemini context caching of the static persona + knowledge prefix (opt-in)
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() in ("1", "true", "yes")
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+
+# Shared Gemini HTTP pool: max concurrent connections and how long idle connections stay open (seconds)
+GENAI_MAX_CONNECTIONS = int(os.getenv("GENAI_MAX_CONNECTIONS", "20"))
+GENAI_KEEPALIVE_EXPIRY = float(os.getenv("GENAI_KEEPALIVE_EXPIRY", "300"))
+
+# Content-addressed LLM response cache for calls that opt in (off by default; memory LRU + disk tier only when a dir is set)
+LLM_RESPONSE_CACHE = os.getenv("LLM_RESPONSE_CACHE", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "21600"))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")
+
+# LLM resilience: retries with jittered exponential backoff (seconds), per-model circuit breaker,
+# per-call deadline in seconds (0 = none) and hedged requests past this latency percentile (0 = off)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20.0"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30.0"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "90"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))
+
+# Shared LLM quota: requests/tokens per minute (0 = unlimited). Background callers leave LLM_RATE_RESERVE of it for narration
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+LLM_RATE_RESERVE = float(os.getenv("LLM_RATE_RESERVE", "0.2"))
+
+# Per-call telemetry (caller, tokens, latency): in-memory ring for /llm_stats, optionally appended to a JSONL file
+LLM_TELEMETRY_MAX_RECORDS = int(os.getenv("LLM_TELEMETRY_MAX_RECORDS", "2000"))
+LLM_TELEMETRY_FILE = os.getenv("LLM_TELEMETRY_FILE", "")
+
+# Batch jobs: /reset_memory rebuilds through the provider batch API (cheaper, minutes to hours); poll start interval and timeout (0 = none) in seconds
+LLM_BATCH_REBUILD = os.getenv("LLM_BATCH_REBUILD", "false").lower() in ("1", "true", "yes")
+LLM_BATCH_POLL_INTERVAL = float(os.getenv("LLM_BATCH_POLL_INTERVAL", "10"))
+LLM_BATCH_TIMEOUT = float(os.getenv("LLM_BATCH_TIMEOUT", "0"))
+
+# Record/replay: LLM_RECORD_FILE captures every provider call; LLM_PROVIDER=replay serves LLM_REPLAY_FILE offline
+# (REALTIME reproduces recorded latency; STRICT=false falls back to the next recording for the same model)
+LLM_RECORD_FILE = os.getenv("LLM_RECORD_FILE", "")
+LLM_REPLAY_FILE = os.getenv("LLM_REPLAY_FILE", "./fixtures/llm_calls.jsonl")
+LLM_REPLAY_REALTIME = os.getenv("LLM_REPLAY_REALTIME", "false").lower() in ("1", "true", "yes")
+LLM_REPLAY_STRICT = os.getenv("LLM_REPLAY_STRICT", "true").lower() in ("1", "true", "yes")
+
+# Local Ollama server (LLM_PROVIDER=ollama, or per persona via MODEL_*=ollama:<model>)
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+
 # Model Overrides per Persona/Function
 MODEL_GM = os.getenv("MODEL_GM", AI_MODEL)
 MODEL_ARCHITECT = os.getenv("MODEL_ARCHITECT", AI_MODEL)
@@ -19,6 +69,50 @@ MODEL_VISUAL = os.getenv("MODEL_VISUAL", "gemini-2.5-flash-image") # Default for
 MODEL_FEEDBACK = os.getenv("MODEL_FEEDBACK", AI_MODEL)
 GEMINI_AUDIO_MODEL = os.getenv("GEMINI_AUDIO_MODEL", "gemini-2.5-flash-preview-tts")
 
+# SLO routing: while a persona's model breaches the p95 latency (seconds) or error rate over the window (seconds),
+# its calls go to the fallback model (empty = no fallback for that persona)
+MODEL_GM_FALLBACK = os.getenv("MODEL_GM_FALLBACK", "")
+MODEL_ARCHITECT_FALLBACK = os.getenv("MODEL_ARCHITECT_FALLBACK", "")
+MODEL_FEEDBACK_FALLBACK = os.getenv("MODEL_FEEDBACK_FALLBACK", "")
+LLM_SLO_P95 = float(os.getenv("LLM_SLO_P95", "20"))
+LLM_SLO_ERROR_RATE = float(os.getenv("LLM_SLO_ERROR_RATE", "0.25"))
+LLM_SLO_WINDOW = float(os.getenv("LLM_SLO_WINDOW", "300"))
+
+# Context Assembly (Narrative Loop)
+# Approximate token budget for system instruction + history. 0 disables the limit.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "250000"))
+CONTEXT_HISTORY_LIMIT = int(os.getenv("CONTEXT_HISTORY_LIMIT", "15"))
+CONTEXT_MIN_HISTORY = int(os.getenv("CONTEXT_MIN_HISTORY", "4"))
+CONTEXT_PINNED_LEDGERS = [l.strip() for l in os.getenv("CONTEXT_PINNED_LEDGERS", "party.ledger").split(",") if l.strip()]
+
+# Per-channel message ring buffer (replaces channel.history() calls on the hot path)
+HISTORY_BUFFER_SIZE = int(os.getenv("HISTORY_BUFFER_SIZE", "100"))
+
+# Turn coalescing: seconds of quiet before a GM turn starts, and the longest a burst may delay it
+TURN_COALESCE_WINDOW = float(os.getenv("TURN_COALESCE_WINDOW", "1.5"))
+TURN_COALESCE_MAX_DELAY = float(os.getenv("TURN_COALESCE_MAX_DELAY", "6.0"))
+# Turn scheduling: queued messages per channel, and how often newer input may supersede a turn
+TURN_QUEUE_LIMIT = int(os.getenv("TURN_QUEUE_LIMIT", "20"))
+TURN_MAX_RESTARTS = int(os.getenv("TURN_MAX_RESTARTS", "2"))
+
+# Background ledger updates: MEMORY_UPDATE blocks arriving within this many seconds share one architect call
+LEDGER_BATCH_WINDOW = float(os.getenv("LEDGER_BATCH_WINDOW", "5.0"))
+
+# Streaming GM replies: post the first text early and edit it as tokens arrive (edits throttled to this interval)
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() in ("1", "true", "yes")
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+
+# GM length control: output token cap (0 = derived from the 1900-character narrative limit) and the
+# minimum share of an over-long reply local condensation must keep before a full retry is used instead
+GM_MAX_OUTPUT_TOKENS = int(os.getenv("GM_MAX_OUTPUT_TOKENS", "0"))
+LENGTH_CONDENSE_MIN_KEEP = float(os.getenv("LENGTH_CONDENSE_MIN_KEEP", "0.6"))
+
+# DATA_TABLE rendering: target width in monospace columns (wider tables wrap, then go compact), the longest
+# render kept inline (extra rows go to an attached file) and how many distinct table blocks stay memoized
+DATA_TABLE_MAX_WIDTH = int(os.getenv("DATA_TABLE_MAX_WIDTH", "60"))
+DATA_TABLE_MAX_CHARS = int(os.getenv("DATA_TABLE_MAX_CHARS", "1200"))
+DATA_TABLE_CACHE_SIZE = int(os.getenv("DATA_TABLE_CACHE_SIZE", "128"))
+
 TARGET_CHANNEL_ID = 0
 try:
     if TARGET_CHANNEL_ID_STR:
@@ -28,6 +122,9 @@ except ValueError:
     exit(1)
 
 def validate_config():
-    if not all([DISCORD_TOKEN, GEMINI_API_KEY, TARGET_CHANNEL_ID_STR]):
+    # The Gemini key is only required when Gemini generates the narrative (replay and Ollama run without it)
+    if not all([DISCORD_TOKEN, TARGET_CHANNEL_ID_STR]):
+        return False
+    if LLM_PROVIDER.lower() == "gemini" and not GEMINI_API_KEY:
         return False
     return True
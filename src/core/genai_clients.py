@@ -0,0 +1,157 @@
+import time
+from typing import Any, Dict, Optional, Tuple
+import httpx
+import google.genai as genai
+from google.genai import types
+
+class GenAIClientRegistry:
+    """
+    Hands out one shared `genai.Client` per (api_key, api_version).
+
+    Every client is backed by pooled httpx clients (async for the bot, sync for the
+    ingestion scripts) with long-lived keep-alive connections, so the LLM provider,
+    TTS and ingestion reuse the same TLS connections. `warm_up()` opens a connection
+    ahead of the first player message; `get_stats()` reports pool usage.
+    """
+
+    def __init__(self, max_connections: int = 20, max_keepalive: int = 10, keepalive_expiry: float = 300.0, timeout: float = 120.0, transport=None, sync_transport=None):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self._transport = transport
+        self._sync_transport = sync_transport
+        self._clients: Dict[Tuple[str, str], genai.Client] = {}
+        self._http: Dict[Tuple[str, str], Tuple[httpx.AsyncClient, httpx.Client]] = {}
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "new_connections": 0,
+            "total_latency": 0.0,
+            "warmups": 0,
+            "last_warmup_ms": 0.0,
+        }
+
+    def configure(self, **settings):
+        """Updates pool settings. Only affects clients created afterwards."""
+        for key, value in settings.items():
+            if not hasattr(self, key):
+                raise ValueError(f"Unknown pool setting: {key}")
+            setattr(self, key, value)
+
+    def get(self, api_key: str, api_version: str = "v1beta") -> genai.Client:
+        """Returns the shared client for this key, creating it (and its pools) on first use."""
+        key = (api_key, api_version)
+        if key not in self._clients:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry
+            )
+            async_http = httpx.AsyncClient(
+                limits=limits, timeout=self.timeout, transport=self._transport,
+                event_hooks={"request": [self._on_async_request], "response": [self._on_async_response]}
+            )
+            sync_http = httpx.Client(
+                limits=limits, timeout=self.timeout, transport=self._sync_transport,
+                event_hooks={"request": [self._on_request], "response": [self._on_response]}
+            )
+            self._http[key] = (async_http, sync_http)
+            self._clients[key] = genai.Client(
+                api_key=api_key,
+                http_options=types.HttpOptions(
+                    api_version=api_version,
+                    httpx_async_client=async_http,
+                    httpx_client=sync_http
+                )
+            )
+        return self._clients[key]
+
+    # --- httpx hooks -------------------------------------------------------
+
+    def _on_request(self, request: httpx.Request):
+        request.extensions["pool_started"] = time.perf_counter()
+        request.extensions["trace"] = self._trace
+
+    def _on_response(self, response: httpx.Response):
+        self.stats["requests"] += 1
+        if response.status_code >= 400:
+            self.stats["errors"] += 1
+        started = response.request.extensions.get("pool_started")
+        if started is not None:
+            self.stats["total_latency"] += time.perf_counter() - started
+
+    async def _on_async_request(self, request: httpx.Request):
+        request.extensions["pool_started"] = time.perf_counter()
+        request.extensions["trace"] = self._atrace
+
+    async def _on_async_response(self, response: httpx.Response):
+        self._on_response(response)
+
+    def _trace(self, event: str, info: Dict[str, Any]):
+        if event == "connection.connect_tcp.complete":
+            self.stats["new_connections"] += 1
+
+    async def _atrace(self, event: str, info: Dict[str, Any]):
+        self._trace(event, info)
+
+    # --- Warm-up & stats ---------------------------------------------------
+
+    async def warm_up(self, model_name: str, api_key: Optional[str] = None) -> Optional[float]:
+        """
+        Opens a pooled connection with a cheap metadata request (models.get) so the
+        first real generation skips DNS/TLS setup. Returns the latency in ms, or None on failure.
+        """
+        clients = [self.get(api_key)] if api_key else list(self._clients.values())
+        latency = None
+        for client in clients:
+            started = time.perf_counter()
+            try:
+                await client.aio.models.get(model=model_name)
+            except Exception as e:
+                print(f"⚠️ Gemini connection warm-up failed: {e}")
+                continue
+            latency = (time.perf_counter() - started) * 1000
+            self.stats["warmups"] += 1
+            self.stats["last_warmup_ms"] = latency
+            print(f"🔥 Gemini connection warmed up in {latency:.0f} ms.")
+        return latency
+
+    def _pool_connections(self) -> Tuple[int, int]:
+        """Returns (open, idle) connection counts across all pools (best effort)."""
+        open_count = idle_count = 0
+        for async_http, sync_http in self._http.values():
+            for http in (async_http, sync_http):
+                pool = getattr(getattr(http, "_transport", None), "_pool", None)
+                for conn in getattr(pool, "connections", []):
+                    open_count += 1
+                    if conn.is_idle():
+                        idle_count += 1
+        return open_count, idle_count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool statistics: requests, connection reuse, latency, open/idle connections."""
+        requests = self.stats["requests"]
+        open_count, idle_count = self._pool_connections()
+        return {
+            "clients": len(self._clients),
+            "open_connections": open_count,
+            "idle_connections": idle_count,
+            "reused_requests": max(0, requests - self.stats["new_connections"]),
+            "avg_latency_ms": (self.stats["total_latency"] / requests * 1000) if requests else 0.0,
+            **self.stats,
+        }
+
+    async def aclose(self):
+        """Closes every pooled connection."""
+        for async_http, sync_http in self._http.values():
+            await async_http.aclose()
+            sync_http.close()
+        self._http.clear()
+        self._clients.clear()
+
+genai_registry = GenAIClientRegistry()
+
+def get_genai_client(api_key: str, api_version: str = "v1beta") -> genai.Client:
+    """Shortcut for `genai_registry.get()`."""
+    return genai_registry.get(api_key, api_version)
@@ -1,56 +1,697 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Deque, List, Optional, Dict, Any, Tuple
+import asyncio
+import hashlib
 import os
-import google.genai as genai
+import random
+import time
+import httpx
 from google.genai import types
+from .genai_clients import get_genai_client
+from .messages import to_gemini_contents
 
 class LLMProvider(ABC):
     """Abstract base class for LLM providers."""
-    
+
     @abstractmethod
-    async def generate(self, model_name: str, system_instruction: str, history: List[Any], temperature: float = 0.7) -> str:
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], temperature: float = 0.7, static_prefix: Optional[str] = None, max_output_tokens: Optional[int] = None, **kwargs) -> str:
         """
         Generates content from the LLM.
-        
+
         Args:
             model_name: The identifier of the model to use.
             system_instruction: The system prompt.
             history: A list of message objects (format depends on provider, but we'll try to standardize).
             temperature: Creativity parameter.
-            
+            static_prefix: Optional leading part of `system_instruction` that rarely changes
+                (persona + knowledge). Providers with prompt caching may cache it server-side;
+                others ignore it.
+            max_output_tokens: Optional hard cap on generated tokens.
+            **kwargs: Per-call hints for provider wrappers (e.g. `use_cache`); providers ignore them.
+
         Returns:
             The generated text response.
         """
         pass
 
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], temperature: float = 0.7, static_prefix: Optional[str] = None, max_output_tokens: Optional[int] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Streams the response as text deltas. Takes the same arguments as `generate()`.
+        Providers without native streaming yield the full response as a single delta.
+        """
+        yield await self.generate(model_name, system_instruction, history, temperature=temperature, static_prefix=static_prefix, max_output_tokens=max_output_tokens)
+
+    # --- Batch jobs ---------------------------------------------------------
+    # Providers without a batch API run jobs through `LocalBatchRunner` (in-process, in the background).
+
+    async def submit_batch(self, requests: List["BatchRequest"]) -> "BatchJob":
+        """Submits many requests as one job and returns immediately."""
+        if getattr(self, "_local_batches", None) is None:
+            self._local_batches = LocalBatchRunner(self)
+        return self._local_batches.submit(requests)
+
+    async def get_batch(self, name: str) -> "BatchJob":
+        """Returns the current state (and, once done, the results) of a submitted job."""
+        runner = getattr(self, "_local_batches", None)
+        if runner is None:
+            raise KeyError(f"Unknown batch job: {name}")
+        return runner.get(name)
+
+    async def run_batch(self, requests: List["BatchRequest"], poll_interval: float = 5.0, max_interval: float = 60.0, timeout: Optional[float] = None) -> "BatchJob":
+        """
+        Submits a job and polls it with exponential backoff (`poll_interval` doubling up to
+        `max_interval`) until it finishes. Raises `asyncio.TimeoutError` after `timeout` seconds.
+        """
+        job = await self.submit_batch(requests)
+        print(f"📦 Batch job {job.name} submitted ({len(requests)} requests).")
+        deadline = time.monotonic() + timeout if timeout else None
+        interval = poll_interval
+        while not job.done:
+            if deadline and time.monotonic() + interval > deadline:
+                raise asyncio.TimeoutError(f"Batch job {job.name} still {job.state} after {timeout}s")
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, max_interval)
+            job = await self.get_batch(job.name)
+        print(f"📦 Batch job {job.name} {job.state}: {len(job.results)} results, {len(job.errors)} errors.")
+        return job
+
+class ProviderWrapper(LLMProvider):
+    """
+    Base for providers that decorate another provider (caching, retries, ...).
+    Calls are forwarded with all keyword arguments; any other attribute lookup
+    falls through to the wrapped provider.
+    """
+
+    def __init__(self, inner: LLMProvider):
+        self.inner = inner
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> str:
+        return await self.inner.generate(model_name, system_instruction, history, **kwargs)
+
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> AsyncIterator[str]:
+        async for delta in self.inner.generate_stream(model_name, system_instruction, history, **kwargs):
+            yield delta
+
+    # Batch jobs bypass per-call wrappers (cache, retries, quota) and go to the wrapped provider
+    async def submit_batch(self, requests: List["BatchRequest"]) -> "BatchJob":
+        return await self.inner.submit_batch(requests)
+
+    async def get_batch(self, name: str) -> "BatchJob":
+        return await self.inner.get_batch(name)
+
+@dataclass
+class BatchRequest:
+    """One request of a batch job; `key` identifies its result."""
+    key: str
+    model_name: str
+    system_instruction: str
+    history: List[Any]
+    temperature: float = 0.7
+    max_output_tokens: Optional[int] = None
+
+@dataclass
+class BatchJob:
+    """
+    State of a batch job. `state` is one of "pending", "running", "succeeded", "failed",
+    "cancelled" or "expired"; `results` / `errors` are keyed by `BatchRequest.key`.
+    """
+    name: str
+    state: str = "pending"
+    total: int = 0
+    results: Dict[str, str] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("succeeded", "failed", "cancelled", "expired")
+
+class LocalBatchRunner:
+    """
+    In-process stand-in for a batch API: each job runs its requests through
+    `provider.generate` in a background task, at most `concurrency` at a time.
+    """
+
+    def __init__(self, provider: LLMProvider, concurrency: int = 4):
+        self.provider = provider
+        self.concurrency = concurrency
+        self.jobs: Dict[str, BatchJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._counter = 0
+
+    def submit(self, requests: List[BatchRequest]) -> BatchJob:
+        self._counter += 1
+        job = BatchJob(name=f"local-batch-{self._counter}", total=len(requests))
+        self.jobs[job.name] = job
+        self._tasks[job.name] = asyncio.create_task(self._run(job, requests))
+        return job
+
+    def get(self, name: str) -> BatchJob:
+        if name not in self.jobs:
+            raise KeyError(f"Unknown batch job: {name}")
+        return self.jobs[name]
+
+    async def _run(self, job: BatchJob, requests: List[BatchRequest]):
+        job.state = "running"
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(request: BatchRequest):
+            async with semaphore:
+                try:
+                    job.results[request.key] = await self.provider.generate(
+                        request.model_name, request.system_instruction, request.history,
+                        temperature=request.temperature, max_output_tokens=request.max_output_tokens
+                    )
+                except Exception as e:
+                    job.errors[request.key] = str(e)
+
+        await asyncio.gather(*(run_one(r) for r in requests))
+        job.state = "failed" if requests and not job.results else "succeeded"
+        self._tasks.pop(job.name, None)
+
+@dataclass
+class CachedPrefix:
+    """A server-side cached-content handle for one model's static prefix."""
+    key: str
+    name: str
+    expires_at: float
+
+# Leads the first turn carrying the dynamic system context on cached requests
+DYNAMIC_CONTEXT_HEADER = "[SYSTEM CONTEXT, not player input: read-only state for this turn]\n"
+
+def is_cache_error(error: BaseException) -> bool:
+    """True when a request failed because of its cached content (expired or deleted handle)."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code in (400, 403, 404) and "cache" in str(error).lower()
+
+class ContextCacheManager:
+    """
+    Keeps one Gemini cached-content handle per model for the static prompt prefix.
+    Handles are keyed by a hash of the prefix: a changed prefix (e.g. new knowledge)
+    deletes the old handle and creates a new one. Handles are re-used until half of
+    their TTL has elapsed, at which point the TTL is refreshed. Lookups are serialized
+    per model, so concurrent turns that miss the cache create a single handle.
+    """
+
+    def __init__(self, client, ttl_seconds: int = 3600):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self._handles: Dict[str, CachedPrefix] = {}
+        self._failed_keys = set()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {"created": 0, "reused": 0, "refreshed": 0, "deleted": 0, "failures": 0}
+
+    @staticmethod
+    def prefix_key(model_name: str, prefix: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{prefix}".encode("utf-8")).hexdigest()
+
+    async def get_handle(self, model_name: str, prefix: str) -> Optional[str]:
+        """Returns a cached-content name for the prefix, or None if caching is unavailable."""
+        lock = self._locks.setdefault(model_name, asyncio.Lock())
+        async with lock:
+            return await self._get_handle(model_name, prefix)
+
+    async def _get_handle(self, model_name: str, prefix: str) -> Optional[str]:
+        key = self.prefix_key(model_name, prefix)
+        handle = self._handles.get(model_name)
+        now = time.time()
+
+        if handle and handle.key == key and handle.expires_at > now:
+            if handle.expires_at - now < self.ttl_seconds / 2:
+                try:
+                    await self.client.aio.caches.update(
+                        name=handle.name,
+                        config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s")
+                    )
+                    handle.expires_at = now + self.ttl_seconds
+                    self.stats["refreshed"] += 1
+                except Exception as e:
+                    print(f"⚠️ Failed to refresh context cache {handle.name}: {e}")
+                    self.invalidate(model_name)
+                    return await self._get_handle(model_name, prefix)
+            self.stats["reused"] += 1
+            return handle.name
+
+        if handle:
+            await self._delete(model_name)
+
+        if key in self._failed_keys:
+            return None
+
+        try:
+            cached = await self.client.aio.caches.create(
+                model=model_name,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=prefix,
+                    ttl=f"{self.ttl_seconds}s",
+                    display_name=f"gm-prefix-{key[:12]}"
+                )
+            )
+        except Exception as e:
+            # Typically the prefix is below the model's minimum cacheable size.
+            print(f"⚠️ Context caching unavailable for {model_name}: {e}")
+            self._failed_keys.add(key)
+            self.stats["failures"] += 1
+            return None
+
+        self._handles[model_name] = CachedPrefix(key=key, name=cached.name, expires_at=now + self.ttl_seconds)
+        self.stats["created"] += 1
+        print(f"🗄️ Created context cache {cached.name} for {model_name} ({len(prefix)} chars).")
+        return cached.name
+
+    def invalidate(self, model_name: str):
+        """Forgets the handle for a model without deleting it server-side."""
+        self._handles.pop(model_name, None)
+
+    async def _delete(self, model_name: str):
+        handle = self._handles.pop(model_name, None)
+        if not handle:
+            return
+        try:
+            await self.client.aio.caches.delete(name=handle.name)
+            self.stats["deleted"] += 1
+        except Exception as e:
+            print(f"⚠️ Failed to delete stale context cache {handle.name}: {e}")
+
 class GeminiProvider(LLMProvider):
     """Provider implementation for Google Gemini API."""
-    
-    def __init__(self, api_key: str):
-        self.client = genai.Client(api_key=api_key, http_options={'api_version': 'v1beta'})
-        
-    async def generate(self, model_name: str, system_instruction: str, history: List[Any], temperature: float = 0.7) -> str:
-        # Convert standard history to Gemini format if necessary, 
-        # but for now we assume the app uses Gemini format internally or we adapt it here.
-        # The current app uses google.genai.types.Content.
-        
-        response = await self.client.aio.models.generate_content(
-            model=model_name,
-            contents=history,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                temperature=temperature
-            )
-        )
+
+    def __init__(self, api_key: str, client=None, context_cache: bool = False, cache_ttl: int = 3600):
+        self.client = client or get_genai_client(api_key)
+        self._batch_keys: Dict[str, List[str]] = {}
+        self.cache_manager = ContextCacheManager(self.client, ttl_seconds=cache_ttl) if context_cache else None
+
+    async def _build_request(self, model_name: str, system_instruction: str, history: List[Any], temperature: float, static_prefix: Optional[str], max_output_tokens: Optional[int]) -> Tuple[List[Any], types.GenerateContentConfig, bool]:
+        """Returns (contents, config, uses_cache) for a generate call."""
+        # ChatMessage entries are converted (and cached) lazily; Content objects pass through.
+        cache_name = None
+        if self.cache_manager and static_prefix and system_instruction.startswith(static_prefix):
+            cache_name = await self.cache_manager.get_handle(model_name, static_prefix)
+
+        if cache_name:
+            # Cached content carries the static prefix as its system instruction, and the API
+            # rejects a second system_instruction next to cached_content. The dynamic remainder
+            # (table state, ledgers) therefore travels as the first turn, labelled so the model
+            # does not read it as something a player said.
+            contents = to_gemini_contents(history)
+            dynamic = system_instruction[len(static_prefix):].strip()
+            if dynamic:
+                contents.insert(0, types.Content(role="user", parts=[types.Part.from_text(text=DYNAMIC_CONTEXT_HEADER + dynamic)]))
+            return contents, types.GenerateContentConfig(cached_content=cache_name, temperature=temperature, max_output_tokens=max_output_tokens), True
+
+        contents, config = self._uncached_request(system_instruction, history, temperature, max_output_tokens)
+        return contents, config, False
+
+    @staticmethod
+    def _uncached_request(system_instruction: str, history: List[Any], temperature: float, max_output_tokens: Optional[int]) -> Tuple[List[Any], types.GenerateContentConfig]:
+        return to_gemini_contents(history), types.GenerateContentConfig(system_instruction=system_instruction, temperature=temperature, max_output_tokens=max_output_tokens)
+
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], temperature: float = 0.7, static_prefix: Optional[str] = None, max_output_tokens: Optional[int] = None, **kwargs) -> str:
+        from .telemetry import report_usage_metadata
+        contents, config, cached = await self._build_request(model_name, system_instruction, history, temperature, static_prefix, max_output_tokens)
+        try:
+            response = await self.client.aio.models.generate_content(model=model_name, contents=contents, config=config)
+        except Exception as e:
+            # Rate limits and outages are left to ResilientProvider's backoff; the handle is still valid.
+            if not cached or not is_cache_error(e):
+                raise
+            # The handle expired or was deleted server-side; drop it and send the full prompt.
+            print(f"⚠️ Cached generation failed ({e}); retrying without context cache.")
+            self.cache_manager.invalidate(model_name)
+            contents, config = self._uncached_request(system_instruction, history, temperature, max_output_tokens)
+            response = await self.client.aio.models.generate_content(model=model_name, contents=contents, config=config)
+        report_usage_metadata(getattr(response, "usage_metadata", None))
         return response.text if response.text else ""
 
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], temperature: float = 0.7, static_prefix: Optional[str] = None, max_output_tokens: Optional[int] = None, **kwargs) -> AsyncIterator[str]:
+        from .telemetry import report_usage_metadata
+        contents, config, cached = await self._build_request(model_name, system_instruction, history, temperature, static_prefix, max_output_tokens)
+        yielded = False
+        usage = None
+        try:
+            stream = await self.client.aio.models.generate_content_stream(model=model_name, contents=contents, config=config)
+            async for chunk in stream:
+                # Usage is cumulative per chunk; the last report covers the whole response
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                if chunk.text:
+                    yielded = True
+                    yield chunk.text
+            report_usage_metadata(usage)
+            return
+        except Exception as e:
+            # Only fall back if nothing reached the caller yet; a partial stream cannot be replayed.
+            if not cached or yielded or not is_cache_error(e):
+                raise
+            print(f"⚠️ Cached streaming failed ({e}); retrying without context cache.")
+            self.cache_manager.invalidate(model_name)
+
+        contents, config = self._uncached_request(system_instruction, history, temperature, max_output_tokens)
+        stream = await self.client.aio.models.generate_content_stream(model=model_name, contents=contents, config=config)
+        async for chunk in stream:
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if chunk.text:
+                yield chunk.text
+        report_usage_metadata(usage)
+
+    # --- Batch API ----------------------------------------------------------
+
+    # Gemini job states -> BatchJob.state
+    BATCH_STATES = {
+        "JOB_STATE_QUEUED": "pending",
+        "JOB_STATE_PENDING": "pending",
+        "JOB_STATE_RUNNING": "running",
+        "JOB_STATE_UPDATING": "running",
+        "JOB_STATE_PAUSED": "running",
+        "JOB_STATE_CANCELLING": "running",
+        "JOB_STATE_SUCCEEDED": "succeeded",
+        "JOB_STATE_PARTIALLY_SUCCEEDED": "succeeded",
+        "JOB_STATE_FAILED": "failed",
+        "JOB_STATE_CANCELLED": "cancelled",
+        "JOB_STATE_EXPIRED": "expired",
+    }
+
+    async def submit_batch(self, requests: List[BatchRequest]) -> BatchJob:
+        """Submits an inline Gemini batch job. All requests must target the same model."""
+        models = {r.model_name for r in requests}
+        if len(models) != 1:
+            raise ValueError(f"A Gemini batch job needs exactly one model, got {sorted(models)}")
+        inlined = [
+            types.InlinedRequest(
+                contents=to_gemini_contents(r.history),
+                config=types.GenerateContentConfig(system_instruction=r.system_instruction, temperature=r.temperature, max_output_tokens=r.max_output_tokens),
+                metadata={"key": r.key},
+            )
+            for r in requests
+        ]
+        job = await self.client.aio.batches.create(model=models.pop(), src=inlined)
+        self._batch_keys[job.name] = [r.key for r in requests]
+        return self._to_batch_job(job)
+
+    async def get_batch(self, name: str) -> BatchJob:
+        return self._to_batch_job(await self.client.aio.batches.get(name=name))
+
+    def _to_batch_job(self, job) -> BatchJob:
+        state = getattr(job.state, "value", job.state) or ""
+        keys = self._batch_keys.get(job.name, [])
+        result = BatchJob(name=job.name, state=self.BATCH_STATES.get(state, "pending"), total=len(keys))
+        responses = (job.dest.inlined_responses or []) if job.dest else []
+        for index, item in enumerate(responses):
+            # Responses come back in request order; metadata carries the key when echoed
+            key = (item.metadata or {}).get("key") or (keys[index] if index < len(keys) else str(index))
+            if item.error:
+                result.errors[key] = getattr(item.error, "message", None) or str(item.error)
+            else:
+                result.results[key] = (item.response.text if item.response else None) or ""
+        if result.done:
+            self._batch_keys.pop(job.name, None)
+        return result
+
+# --- Resilience -------------------------------------------------------------
+
+# HTTP statuses worth retrying: timeouts, rate limits and server-side failures.
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a model's circuit breaker rejects a call."""
+
+def is_retryable(error: BaseException) -> bool:
+    """True for rate limits, 5xx responses, timeouts and connection failures."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS
+    return isinstance(error, (asyncio.TimeoutError, httpx.TransportError, ConnectionError))
+
+class CircuitBreaker:
+    """
+    Per-model breaker. Opens after `failure_threshold` consecutive retryable failures
+    and rejects calls for `reset_timeout` seconds; then lets a single probe through
+    (half-open) which either closes it again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> bool:
+        """Counts a failure. Returns True if this opened the breaker."""
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            opened = self.state != "open"
+            self.state = "open"
+            self.opened_at = self.clock()
+            self._probing = False
+            return opened
+        return False
+
+class ResilientProvider(ProviderWrapper):
+    """
+    Retries, circuit breaking, deadlines and hedging around another provider.
+
+    - Retries: retryable errors (see `is_retryable`) are retried up to `max_retries`
+      times with full-jitter exponential backoff (`backoff_base * 2**n`, capped at `backoff_max`).
+    - Circuit breakers: one `CircuitBreaker` per model; open breakers fail fast with `CircuitOpenError`.
+    - Deadlines: callers may pass `deadline=` (a `time.monotonic()` timestamp); otherwise
+      `timeout` seconds from the call. Every attempt and backoff sleep is bounded by it and
+      the deadline is forwarded to the wrapped provider.
+    - Hedging: with `hedge_percentile` set, a second identical request is started when the
+      first has not answered within that latency percentile of recent calls; the first
+      success wins and the other is cancelled. Streams are never hedged.
+    """
+
+    def __init__(self, inner: LLMProvider, max_retries: int = 3, backoff_base: float = 1.0, backoff_max: float = 20.0,
+                 breaker_threshold: int = 5, breaker_reset: float = 30.0, timeout: Optional[float] = 60.0,
+                 hedge_percentile: float = 0.0, hedge_min_samples: int = 20, clock: Callable[[], float] = time.monotonic):
+        super().__init__(inner)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.clock = clock
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+        self.stats = {
+            "calls": 0, "attempts": 0, "successes": 0, "retries": 0, "failures": 0,
+            "timeouts": 0, "gave_up": 0, "breaker_opened": 0, "breaker_rejected": 0,
+            "hedges": 0, "hedge_wins": 0,
+        }
+
+    def _breaker(self, model_name: str) -> CircuitBreaker:
+        if model_name not in self.breakers:
+            self.breakers[model_name] = CircuitBreaker(self.breaker_threshold, self.breaker_reset, clock=self.clock)
+        return self.breakers[model_name]
+
+    def _remaining(self, deadline: Optional[float]) -> Optional[float]:
+        if deadline is None:
+            return None
+        remaining = deadline - self.clock()
+        if remaining <= 0:
+            raise asyncio.TimeoutError("LLM deadline exceeded")
+        return remaining
+
+    def backoff_delay(self, retry: int) -> float:
+        """Full-jitter delay before retry number `retry` (0-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** retry)))
+
+    def hedge_delay(self, model_name: str) -> Optional[float]:
+        """Latency percentile after which a hedge is sent, or None if hedging is off/unprimed."""
+        samples = self._latencies.get(model_name)
+        if not self.hedge_percentile or not samples or len(samples) < self.hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return ordered[index]
+
+    def _record_latency(self, model_name: str, seconds: float):
+        self._latencies.setdefault(model_name, deque(maxlen=100)).append(seconds)
+
+    def _before_attempt(self, model_name: str, breaker: CircuitBreaker):
+        if not breaker.allow():
+            self.stats["breaker_rejected"] += 1
+            raise CircuitOpenError(f"Circuit open for {model_name}; failing fast.")
+        self.stats["attempts"] += 1
+
+    async def _after_failure(self, model_name: str, breaker: CircuitBreaker, error: Exception, retry: int, deadline: Optional[float]) -> bool:
+        """Books a failed attempt. Returns True if the call should be retried (after backing off)."""
+        self.stats["failures"] += 1
+        if isinstance(error, asyncio.TimeoutError):
+            self.stats["timeouts"] += 1
+        if not is_retryable(error):
+            # The service answered; a bad request says nothing about its health.
+            breaker.record_success()
+            return False
+        if breaker.record_failure():
+            self.stats["breaker_opened"] += 1
+            print(f"🔌 Circuit breaker opened for {model_name} after {breaker.failures} failures.")
+        if retry >= self.max_retries or breaker.state == "open":
+            self.stats["gave_up"] += 1
+            return False
+        delay = self.backoff_delay(retry)
+        if deadline is not None and self.clock() + delay >= deadline:
+            self.stats["gave_up"] += 1
+            return False
+        print(f"🔁 {model_name} call failed ({error}); retrying in {delay:.1f}s.")
+        self.stats["retries"] += 1
+        await asyncio.sleep(delay)
+        return True
+
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], deadline: Optional[float] = None, **kwargs) -> str:
+        self.stats["calls"] += 1
+        if deadline is None and self.timeout:
+            deadline = self.clock() + self.timeout
+        breaker = self._breaker(model_name)
+        retry = 0
+        while True:
+            self._before_attempt(model_name, breaker)
+            started = self.clock()
+            try:
+                text = await self._attempt(model_name, system_instruction, history, deadline, kwargs)
+            except asyncio.CancelledError:
+                breaker._probing = False
+                raise
+            except Exception as e:
+                if await self._after_failure(model_name, breaker, e, retry, deadline):
+                    retry += 1
+                    continue
+                raise
+            breaker.record_success()
+            self.stats["successes"] += 1
+            self._record_latency(model_name, self.clock() - started)
+            return text
+
+    async def _attempt(self, model_name: str, system_instruction: str, history: List[Any], deadline: Optional[float], kwargs: Dict[str, Any]) -> str:
+        def call():
+            return asyncio.ensure_future(self.inner.generate(model_name, system_instruction, history, deadline=deadline, **kwargs))
+
+        hedge_after = self.hedge_delay(model_name)
+        remaining = self._remaining(deadline)
+        if hedge_after is None or (remaining is not None and hedge_after >= remaining):
+            return await asyncio.wait_for(call(), timeout=remaining)
+
+        primary = call()
+        tasks = {primary}
+        hedge = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                self.stats["hedges"] += 1
+                hedge = call()
+                tasks.add(hedge)
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, timeout=self._remaining(deadline), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError("LLM deadline exceeded")
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in (primary, hedge):
+                if task and not task.done():
+                    task.cancel()
+
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], deadline: Optional[float] = None, **kwargs) -> AsyncIterator[str]:
+        self.stats["calls"] += 1
+        if deadline is None and self.timeout:
+            deadline = self.clock() + self.timeout
+        breaker = self._breaker(model_name)
+        retry = 0
+        while True:
+            self._before_attempt(model_name, breaker)
+            started = self.clock()
+            yielded = False
+            stream = self.inner.generate_stream(model_name, system_instruction, history, deadline=deadline, **kwargs)
+            try:
+                while True:
+                    try:
+                        delta = await asyncio.wait_for(stream.__anext__(), timeout=self._remaining(deadline))
+                    except StopAsyncIteration:
+                        break
+                    yielded = True
+                    yield delta
+            except asyncio.CancelledError:
+                breaker._probing = False
+                raise
+            except Exception as e:
+                # Text already shown to the caller cannot be retried transparently.
+                if not yielded and await self._after_failure(model_name, breaker, e, retry, deadline):
+                    retry += 1
+                    continue
+                if yielded:
+                    self.stats["failures"] += 1
+                    if is_retryable(e) and breaker.record_failure():
+                        self.stats["breaker_opened"] += 1
+                raise
+            finally:
+                aclose = getattr(stream, "aclose", None)
+                if aclose:
+                    await aclose()
+            breaker.record_success()
+            self.stats["successes"] += 1
+            self._record_latency(model_name, self.clock() - started)
+            return
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "open_breakers": [m for m, b in self.breakers.items() if b.state != "closed"]}
+
 class ProviderFactory:
     """Factory to create LLM providers based on configuration."""
-    
+
     @staticmethod
     def get_provider(provider_name: str, **kwargs) -> LLMProvider:
         if provider_name.lower() == "gemini":
-            return GeminiProvider(api_key=kwargs.get("api_key"))
-        # Future: elif provider_name.lower() == "ollama": ...
+            return GeminiProvider(
+                api_key=kwargs.get("api_key"),
+                context_cache=kwargs.get("context_cache", False),
+                cache_ttl=kwargs.get("cache_ttl", 3600)
+            )
+        elif provider_name.lower() == "replay":
+            # Offline: serves responses captured with RecordingProvider
+            from .llm_replay import ReplayProvider
+            return ReplayProvider(
+                fixture_path=kwargs.get("replay_file"),
+                realtime=kwargs.get("replay_realtime", False),
+                strict=kwargs.get("replay_strict", True)
+            )
+        elif provider_name.lower() == "ollama":
+            from .ollama import OllamaProvider
+            return OllamaProvider(
+                host=kwargs.get("ollama_host") or "http://localhost:11434",
+                keep_alive=kwargs.get("ollama_keep_alive", "30m"),
+                max_concurrency=kwargs.get("ollama_max_concurrency", 2)
+            )
         else:
             raise ValueError(f"Unknown provider: {provider_name}")
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import json
+import os
+import pathlib
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from .llm import LLMProvider, ProviderWrapper
+from .messages import ChatMessage
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def contents_fingerprint(history: List[Any]) -> str:
+    """Stable hash of a history list (`ChatMessage`, plain strings or pydantic Content objects)."""
+    digest = hashlib.sha256()
+    for item in history:
+        if isinstance(item, ChatMessage):
+            item = item.convert("gemini")  # Same address as the equivalent Content
+        if isinstance(item, str):
+            text = item
+        elif hasattr(item, "model_dump_json"):
+            text = item.model_dump_json(exclude_none=True)
+        else:
+            text = repr(item)
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def cache_key(model_name: str, system_instruction: str, history: List[Any], temperature: float, max_output_tokens: Optional[int] = None) -> str:
+    """Content address of a generate call: model + instruction hash + contents hash + sampling settings."""
+    parts = [model_name, _sha256(system_instruction), contents_fingerprint(history), repr(float(temperature)), repr(max_output_tokens)]
+    return _sha256("\n".join(parts))
+
+class ResponseCache:
+    """
+    Two-tier response store.
+    Memory tier: LRU bounded to `max_entries`. Disk tier (optional): one JSON file per
+    key under `disk_dir`, bounded to `max_disk_entries` (oldest files pruned).
+    Entries older than `ttl_seconds` are treated as missing in both tiers (0 = no expiry).
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 21600, disk_dir: Optional[str] = None, max_disk_entries: int = 1000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = pathlib.Path(disk_dir) if disk_dir else None
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _expired(self, created: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - created > self.ttl_seconds
+
+    def _disk_path(self, key: str) -> pathlib.Path:
+        return self.disk_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry:
+            created, text = entry
+            if not self._expired(created):
+                self._entries.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return text
+            del self._entries[key]
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if not self._expired(data["created"]):
+                    self._remember(key, data["created"], data["text"])
+                    self.stats["disk_hits"] += 1
+                    return data["text"]
+                path.unlink(missing_ok=True)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Ignoring unreadable LLM cache entry {path.name}: {e}")
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, text: str):
+        created = time.time()
+        self._remember(key, created, text)
+        self.stats["stores"] += 1
+        if self.disk_dir:
+            try:
+                self.disk_dir.mkdir(parents=True, exist_ok=True)
+                self._disk_path(key).write_text(json.dumps({"created": created, "text": text}), encoding="utf-8")
+                self._prune_disk()
+            except OSError as e:
+                print(f"⚠️ Failed to write LLM cache entry: {e}")
+
+    def _remember(self, key: str, created: float, text: str):
+        self._entries[key] = (created, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _prune_disk(self):
+        files = [e for e in os.scandir(self.disk_dir) if e.name.endswith(".json")]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=lambda e: e.stat().st_mtime_ns)
+        for entry in files[:len(files) - self.max_disk_entries]:
+            os.remove(entry.path)
+
+    def clear(self):
+        """Drops both tiers."""
+        self._entries.clear()
+        if self.disk_dir and self.disk_dir.exists():
+            for path in self.disk_dir.glob("*.json"):
+                path.unlink(missing_ok=True)
+
+class _LeaderCancelled(Exception):
+    """The call a coalesced request was waiting on was cancelled; the waiter generates itself."""
+
+class CachingProvider(ProviderWrapper):
+    """
+    Serves repeated generate calls from a `ResponseCache`.
+    Caching is opt-in per call (`use_cache=True`); other calls pass straight through.
+    Identical requests that are in flight at the same time share one generation.
+    """
+
+    def __init__(self, inner: LLMProvider, cache: Optional[ResponseCache] = None):
+        super().__init__(inner)
+        self.cache = cache or ResponseCache()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {"bypassed": 0, "coalesced": 0}
+
+    def _key(self, model_name, system_instruction, history, kwargs) -> str:
+        return cache_key(model_name, system_instruction, history, kwargs.get("temperature", 0.7), kwargs.get("max_output_tokens"))
+
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], use_cache: bool = False, **kwargs) -> str:
+        if not use_cache:
+            self.stats["bypassed"] += 1
+            return await self.inner.generate(model_name, system_instruction, history, **kwargs)
+
+        key = self._key(model_name, system_instruction, history, kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        if key in self._in_flight:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(self._in_flight[key])
+            except _LeaderCancelled:
+                # Only the leader's caller was cancelled; this request still wants an answer
+                return await self.generate(model_name, system_instruction, history, use_cache=True, **kwargs)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            text = await self.inner.generate(model_name, system_instruction, history, **kwargs)
+            if text:
+                self.cache.put(key, text)
+            future.set_result(text)
+            return text
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], use_cache: bool = False, **kwargs) -> AsyncIterator[str]:
+        if not use_cache:
+            self.stats["bypassed"] += 1
+            async for delta in self.inner.generate_stream(model_name, system_instruction, history, **kwargs):
+                yield delta
+            return
+
+        key = self._key(model_name, system_instruction, history, kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        text = ""
+        async for delta in self.inner.generate_stream(model_name, system_instruction, history, **kwargs):
+            text += delta
+            yield delta
+        if text:
+            self.cache.put(key, text)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.cache.stats, **self.stats}
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import pathlib
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional
+from .llm import LLMProvider, ProviderWrapper
+from .llm_cache import cache_key
+
+class ReplayMissError(LookupError):
+    """Raised when a replayed request has no recording."""
+
+def request_fingerprint(model_name: str, system_instruction: str, history: List[Any], kwargs: Dict[str, Any]) -> str:
+    """Fingerprint shared by recording and replay (same content address as the response cache)."""
+    return cache_key(model_name, system_instruction, history, kwargs.get("temperature", 0.7), kwargs.get("max_output_tokens"))
+
+class RecordingProvider(ProviderWrapper):
+    """
+    Passes calls through and appends one JSON line per successful call to `fixture_path`:
+    `key` (request fingerprint), `model`, `stream`, `response`, `latency` (seconds) and,
+    for streams, `deltas` as `[offset_seconds, text]` pairs.
+    """
+
+    def __init__(self, inner: LLMProvider, fixture_path: str):
+        super().__init__(inner)
+        self.fixture_path = pathlib.Path(fixture_path)
+        self.recorded = 0
+
+    def _append(self, record: Dict[str, Any]):
+        try:
+            self.fixture_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.fixture_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            self.recorded += 1
+        except OSError as e:
+            print(f"⚠️ Failed to record LLM call: {e}")
+
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> str:
+        started = time.perf_counter()
+        text = await self.inner.generate(model_name, system_instruction, history, **kwargs)
+        self._append({
+            "key": request_fingerprint(model_name, system_instruction, history, kwargs),
+            "model": model_name,
+            "stream": False,
+            "response": text,
+            "latency": time.perf_counter() - started,
+        })
+        return text
+
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        deltas = []
+        async for delta in self.inner.generate_stream(model_name, system_instruction, history, **kwargs):
+            deltas.append([time.perf_counter() - started, delta])
+            yield delta
+        self._append({
+            "key": request_fingerprint(model_name, system_instruction, history, kwargs),
+            "model": model_name,
+            "stream": True,
+            "response": "".join(d for _, d in deltas),
+            "latency": time.perf_counter() - started,
+            "deltas": deltas,
+        })
+
+class ReplayProvider(LLMProvider):
+    """
+    Serves recorded responses offline.
+
+    Requests are matched by fingerprint; repeated requests get the recordings in the
+    order they were captured (the last one repeats). With `strict=False`, an unknown
+    request falls back to the next unused recording for the same model, which keeps
+    benchmarks running when prompts drift slightly (e.g. a changed ledger line).
+    `realtime=True` reproduces the recorded latency (scaled by `speed`); otherwise
+    responses return immediately.
+    """
+
+    def __init__(self, fixture_path: str, realtime: bool = False, speed: float = 1.0, strict: bool = True):
+        self.fixture_path = pathlib.Path(fixture_path)
+        self.realtime = realtime
+        self.speed = speed
+        self.strict = strict
+        self.records: List[Dict[str, Any]] = []
+        self._by_key: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._by_model: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._key_cursor: Dict[str, int] = defaultdict(int)
+        self._model_cursor: Dict[str, int] = defaultdict(int)
+        self.stats = {"hits": 0, "fallbacks": 0, "misses": 0}
+        self._load()
+
+    def _load(self):
+        if not self.fixture_path.exists():
+            raise FileNotFoundError(f"Replay fixture not found: {self.fixture_path}")
+        with open(self.fixture_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.records.append(record)
+                    self._by_key[record["key"]].append(record)
+                    self._by_model[record["model"]].append(record)
+        print(f"📼 Loaded {len(self.records)} recorded LLM calls from {self.fixture_path}.")
+
+    def lookup(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> Dict[str, Any]:
+        """Returns the recording that answers this request."""
+        key = request_fingerprint(model_name, system_instruction, history, kwargs)
+        matches = self._by_key.get(key)
+        if matches:
+            index = min(self._key_cursor[key], len(matches) - 1)
+            self._key_cursor[key] += 1
+            self.stats["hits"] += 1
+            return matches[index]
+
+        candidates = self._by_model.get(model_name, [])
+        if not self.strict and self._model_cursor[model_name] < len(candidates):
+            record = candidates[self._model_cursor[model_name]]
+            self._model_cursor[model_name] += 1
+            self.stats["fallbacks"] += 1
+            return record
+
+        self.stats["misses"] += 1
+        raise ReplayMissError(f"No recording for {model_name} request {key[:12]}")
+
+    async def _pause(self, seconds: float):
+        if self.realtime and seconds > 0:
+            await asyncio.sleep(seconds / self.speed)
+
+    async def replay(self, record: Dict[str, Any]) -> str:
+        """Serves a specific recording with this provider's timing mode."""
+        await self._pause(record.get("latency", 0.0))
+        return record["response"]
+
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> str:
+        return await self.replay(self.lookup(model_name, system_instruction, history, **kwargs))
+
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> AsyncIterator[str]:
+        record = self.lookup(model_name, system_instruction, history, **kwargs)
+        deltas = record.get("deltas") or [[record.get("latency", 0.0), record["response"]]]
+        elapsed = 0.0
+        for offset, text in deltas:
+            await self._pause(offset - elapsed)
+            elapsed = offset
+            yield text
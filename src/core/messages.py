@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from google.genai import types
+
+class ChatMessage:
+    """
+    Provider-neutral history entry.
+
+    `role` is "user" or "model"; `author` (players only) is rendered as an
+    "Author: text" prefix. Provider formats are produced lazily by `convert()`
+    and cached, on the instance and (for Discord messages) per `message_id`,
+    so rebuilding the history every turn does not rebuild provider objects.
+    Treat instances as immutable once converted.
+    """
+    __slots__ = ("role", "text", "author", "message_id", "_converted")
+
+    def __init__(self, role: str, text: str, author: Optional[str] = None, message_id: Optional[int] = None):
+        self.role = role
+        self.text = text
+        self.author = author
+        self.message_id = message_id
+        self._converted: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def user(cls, text: str, author: Optional[str] = None, message_id: Optional[int] = None) -> "ChatMessage":
+        return cls("user", text, author, message_id)
+
+    @classmethod
+    def model(cls, text: str, message_id: Optional[int] = None) -> "ChatMessage":
+        return cls("model", text, None, message_id)
+
+    @property
+    def content(self) -> str:
+        """The text as sent to the model (author prefix included)."""
+        return f"{self.author}: {self.text}" if self.author else self.text
+
+    def convert(self, fmt: str) -> Any:
+        """Returns this message in a provider format ("gemini" or "chat")."""
+        if self._converted is not None and fmt in self._converted:
+            return self._converted[fmt]
+        converted = conversion_cache.convert(self, fmt)
+        if self._converted is None:
+            self._converted = {}
+        self._converted[fmt] = converted
+        return converted
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ChatMessage) and (self.role, self.text, self.author, self.message_id) == (other.role, other.text, other.author, other.message_id)
+
+    def __repr__(self) -> str:
+        return f"ChatMessage(role={self.role!r}, author={self.author!r}, message_id={self.message_id!r}, text={self.text[:40]!r})"
+
+def _to_gemini(message: ChatMessage) -> types.Content:
+    return types.Content(role=message.role, parts=[types.Part.from_text(text=message.content)])
+
+def _to_chat(message: ChatMessage) -> Dict[str, str]:
+    return {"role": "assistant" if message.role == "model" else "user", "content": message.content}
+
+FORMATS: Dict[str, Callable[[ChatMessage], Any]] = {"gemini": _to_gemini, "chat": _to_chat}
+
+class ConversionCache:
+    """
+    LRU of converted messages keyed by (format, message_id). An entry is reused only
+    while the message content is unchanged, so edited Discord messages are reconverted.
+    Messages without an id are converted directly.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[str, str, Any]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def convert(self, message: ChatMessage, fmt: str) -> Any:
+        if message.message_id is None:
+            return FORMATS[fmt](message)
+        key = (fmt, message.message_id)
+        entry = self._entries.get(key)
+        if entry and entry[0] == message.role and entry[1] == message.content:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[2]
+        self.stats["misses"] += 1
+        converted = FORMATS[fmt](message)
+        self._entries[key] = (message.role, message.content, converted)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return converted
+
+conversion_cache = ConversionCache()
+
+def message_text(item: Any) -> str:
+    """Text of a history entry: `ChatMessage`, plain string or a Content-like object with parts."""
+    if isinstance(item, ChatMessage):
+        return item.content
+    if isinstance(item, str):
+        return item
+    parts = getattr(item, "parts", None) or []
+    return "".join(getattr(p, "text", None) or "" for p in parts)
+
+def to_gemini_contents(history: List[Any]) -> List[Any]:
+    """Gemini `contents` for a history; non-`ChatMessage` entries pass through unchanged."""
+    return [item.convert("gemini") if isinstance(item, ChatMessage) else item for item in history]
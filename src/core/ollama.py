@@ -0,0 +1,180 @@
+import asyncio
+import json
+from dataclasses import replace
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+import aiohttp
+from .llm import BatchJob, BatchRequest, LLMProvider, ProviderWrapper
+from .messages import ChatMessage, message_text
+from .telemetry import report_usage
+
+class OllamaError(RuntimeError):
+    """Error returned by an Ollama server. `code` is the HTTP status (used by the retry layer)."""
+
+    def __init__(self, message: str, code: int = 0):
+        super().__init__(message)
+        self.code = code
+
+def history_to_messages(system_instruction: str, history: List[Any]) -> List[Dict[str, str]]:
+    """Converts the app's history (`ChatMessage`, plain strings or `types.Content`) into Ollama chat messages."""
+    messages = []
+    if system_instruction:
+        messages.append({"role": "system", "content": system_instruction})
+    for item in history:
+        if isinstance(item, ChatMessage):
+            messages.append(item.convert("chat"))
+            continue
+        role = "assistant" if getattr(item, "role", "user") == "model" else "user"
+        messages.append({"role": role, "content": message_text(item)})
+    return messages
+
+class OllamaProvider(LLMProvider):
+    """
+    Provider for an Ollama-compatible `/api/chat` endpoint.
+
+    - At most `max_concurrency` requests run at once (local GPUs serve one or two well).
+    - `keep_alive` is sent with every request so the model stays loaded between turns;
+      `preload(model)` loads it ahead of the first call.
+    - Streaming reads the NDJSON response line by line.
+    """
+
+    def __init__(self, host: str = "http://localhost:11434", keep_alive: Union[str, int] = "30m", max_concurrency: int = 2, timeout: float = 300.0):
+        self.host = host.rstrip("/")
+        self.keep_alive = keep_alive
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.stats = {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    def _payload(self, model_name: str, system_instruction: str, history: List[Any], temperature: float, max_output_tokens: Optional[int], stream: bool) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"temperature": temperature}
+        if max_output_tokens:
+            options["num_predict"] = max_output_tokens
+        return {
+            "model": model_name,
+            "messages": history_to_messages(system_instruction, history),
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": options,
+        }
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> aiohttp.ClientResponse:
+        response = await self._get_session().post(f"{self.host}{path}", json=payload)
+        if response.status >= 400:
+            try:
+                detail = (await response.json(content_type=None)).get("error", "")
+            except (ValueError, aiohttp.ContentTypeError):
+                detail = await response.text()
+            response.release()
+            self.stats["errors"] += 1
+            raise OllamaError(f"Ollama {path} failed ({response.status}): {detail}", code=response.status)
+        return response
+
+    async def _acquire(self):
+        await self._semaphore.acquire()
+        self.stats["requests"] += 1
+        self.stats["in_flight"] += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def _release(self):
+        self.stats["in_flight"] -= 1
+        self._semaphore.release()
+
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], temperature: float = 0.7, static_prefix: Optional[str] = None, max_output_tokens: Optional[int] = None, **kwargs) -> str:
+        await self._acquire()
+        try:
+            payload = self._payload(model_name, system_instruction, history, temperature, max_output_tokens, stream=False)
+            response = await self._post("/api/chat", payload)
+            async with response:
+                data = await response.json(content_type=None)
+            if "error" in data:
+                self.stats["errors"] += 1
+                raise OllamaError(data["error"])
+            report_usage(data.get("prompt_eval_count"), data.get("eval_count"))
+            return data.get("message", {}).get("content", "")
+        finally:
+            self._release()
+
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], temperature: float = 0.7, static_prefix: Optional[str] = None, max_output_tokens: Optional[int] = None, **kwargs) -> AsyncIterator[str]:
+        await self._acquire()
+        try:
+            payload = self._payload(model_name, system_instruction, history, temperature, max_output_tokens, stream=True)
+            response = await self._post("/api/chat", payload)
+            async with response:
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        self.stats["errors"] += 1
+                        raise OllamaError(chunk["error"])
+                    text = chunk.get("message", {}).get("content")
+                    if text:
+                        yield text
+                    if chunk.get("done"):
+                        report_usage(chunk.get("prompt_eval_count"), chunk.get("eval_count"))
+                        break
+        finally:
+            self._release()
+
+    async def preload(self, model_name: str) -> bool:
+        """Loads a model into memory (pinned for `keep_alive`) without generating."""
+        try:
+            response = await self._post("/api/generate", {"model": model_name, "keep_alive": self.keep_alive})
+            response.release()
+        except (OllamaError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"⚠️ Failed to preload local model {model_name}: {e}")
+            return False
+        print(f"🦙 Preloaded local model {model_name} (keep_alive={self.keep_alive}).")
+        return True
+
+    async def aclose(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+class PrefixRouter(ProviderWrapper):
+    """
+    Sends calls whose model name starts with `<prefix>:` to another provider, e.g.
+    `MODEL_ARCHITECT=ollama:llama3.1` runs the architect locally while the GM stays on
+    the default provider. The prefix is stripped before forwarding.
+    """
+
+    def __init__(self, inner: LLMProvider, routes: Dict[str, LLMProvider]):
+        super().__init__(inner)
+        self.routes = routes
+        self._batch_owners: Dict[str, LLMProvider] = {}
+
+    def resolve(self, model_name: str):
+        prefix, sep, name = model_name.partition(":")
+        if sep and prefix in self.routes:
+            return self.routes[prefix], name
+        return self.inner, model_name
+
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> str:
+        provider, model_name = self.resolve(model_name)
+        return await provider.generate(model_name, system_instruction, history, **kwargs)
+
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> AsyncIterator[str]:
+        provider, model_name = self.resolve(model_name)
+        async for delta in provider.generate_stream(model_name, system_instruction, history, **kwargs):
+            yield delta
+
+    async def submit_batch(self, requests: List[BatchRequest]) -> BatchJob:
+        providers = {id(self.resolve(r.model_name)[0]) for r in requests}
+        if len(providers) > 1:
+            raise ValueError("A batch job cannot mix models served by different providers")
+        provider = self.resolve(requests[0].model_name)[0] if requests else self.inner
+        job = await provider.submit_batch([replace(r, model_name=self.resolve(r.model_name)[1]) for r in requests])
+        self._batch_owners[job.name] = provider
+        return job
+
+    async def get_batch(self, name: str) -> BatchJob:
+        job = await self._batch_owners.get(name, self.inner).get_batch(name)
+        if job.done:
+            self._batch_owners.pop(name, None)
+        return job
@@ -0,0 +1,173 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from .llm import LLMProvider, ProviderWrapper
+from .messages import message_text
+
+# Lower value = served first. Unlabeled calls queue with the background architect.
+PRIORITIES = {"gm": 0, "feedback": 1, "bard": 1, "architect": 2, "rebuild": 3}
+DEFAULT_CALLER = "architect"
+
+def estimate_tokens(system_instruction: str, history: List[Any], max_output_tokens: Optional[int] = None, output_guess: int = 1024) -> int:
+    """Rough request cost (~4 chars per token for the input plus the expected output)."""
+    chars = len(system_instruction or "") + sum(len(message_text(item)) for item in history)
+    return math.ceil(chars / 4) + (max_output_tokens or output_guess)
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most `capacity` units (refilled over `period` seconds)."""
+
+    def __init__(self, capacity: float, period: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.clock = clock
+        self.level = capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float, reserve: float = 0.0) -> float:
+        """Seconds until `amount` can be taken while leaving `reserve` in the bucket (0 = now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        reserve = max(0.0, min(reserve, self.capacity - amount))
+        missing = amount + reserve - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Returns (positive) or charges (negative) units after the real cost is known."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget shared by every LLM call.
+
+    Waiting calls are served strictly by priority class (then arrival order), so a
+    queued narration call always goes before queued architect or rebuild calls.
+    Classes below `gm` additionally leave `reserve` (a fraction of each bucket)
+    untouched, so a burst of background work cannot drain the quota right before
+    a player message arrives. `rpm`/`tpm` of 0 disable that dimension.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, reserve: float = 0.2, clock: Callable[[], float] = time.monotonic):
+        self.buckets = {
+            name: TokenBucket(limit, clock=clock)
+            for name, limit in (("requests", rpm), ("tokens", tpm)) if limit
+        }
+        self.reserve = reserve
+        self.clock = clock
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        self._changed: Optional[asyncio.Future] = None
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def _delay(self, tokens: int, priority: int) -> float:
+        cost = {"requests": 1, "tokens": tokens}
+        delays = [
+            bucket.delay(cost[name], self.reserve * bucket.capacity if priority > 0 else 0.0)
+            for name, bucket in self.buckets.items()
+        ]
+        return max(delays, default=0.0)
+
+    def _notify(self):
+        if self._changed is not None and not self._changed.done():
+            self._changed.set_result(None)
+        self._changed = None
+
+    async def acquire(self, tokens: int, caller: str = DEFAULT_CALLER) -> float:
+        """Waits for quota; returns the time spent queued (seconds)."""
+        priority = PRIORITIES.get(caller, PRIORITIES[DEFAULT_CALLER])
+        entry = (priority, next(self._seq))
+        started = self.clock()
+        heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                wait = None
+                if self._waiters[0] == entry:
+                    wait = self._delay(tokens, priority)
+                    if wait <= 0:
+                        break
+                if self._changed is None:
+                    self._changed = asyncio.get_running_loop().create_future()
+                # Sleep until the quota refills or the queue changes
+                await asyncio.wait([self._changed], timeout=wait)
+        finally:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+            self._notify()
+        for name, bucket in self.buckets.items():
+            bucket.take(1 if name == "requests" else tokens)
+
+        waited = self.clock() - started
+        self._record_wait(caller, waited)
+        return waited
+
+    def settle(self, estimated: int, actual: int):
+        """Corrects the token bucket once the real size of a call is known."""
+        if "tokens" in self.buckets:
+            self.buckets["tokens"].adjust(estimated - actual)
+
+    def _record_wait(self, caller: str, waited: float):
+        entry = self.stats.setdefault(caller, {"calls": 0, "total_wait": 0.0, "max_wait": 0.0})
+        entry["calls"] += 1
+        entry["total_wait"] += waited
+        entry["max_wait"] = max(entry["max_wait"], waited)
+        if waited >= 1.0:
+            print(f"⏳ {caller} LLM call waited {waited:.1f}s for quota.")
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue-wait per caller class (calls, avg/max wait in ms) plus the current queue depth."""
+        return {
+            "queue_depth": self.queue_depth,
+            "callers": {
+                caller: {
+                    "calls": s["calls"],
+                    "avg_wait_ms": s["total_wait"] / s["calls"] * 1000 if s["calls"] else 0.0,
+                    "max_wait_ms": s["max_wait"] * 1000,
+                }
+                for caller, s in self.stats.items()
+            },
+        }
+
+class RateLimitedProvider(ProviderWrapper):
+    """
+    Acquires quota from a `RateLimiter` before each call. Callers label their
+    priority class with `caller=` ("gm", "feedback", "bard", "architect", "rebuild").
+    """
+
+    def __init__(self, inner: LLMProvider, limiter: RateLimiter):
+        super().__init__(inner)
+        self.limiter = limiter
+
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], caller: str = DEFAULT_CALLER, **kwargs) -> str:
+        estimated = estimate_tokens(system_instruction, history, kwargs.get("max_output_tokens"))
+        await self.limiter.acquire(estimated, caller)
+        text = await self.inner.generate(model_name, system_instruction, history, **kwargs)
+        self.limiter.settle(estimated, estimate_tokens(system_instruction, history, output_guess=0) + math.ceil(len(text or "") / 4))
+        return text
+
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], caller: str = DEFAULT_CALLER, **kwargs) -> AsyncIterator[str]:
+        estimated = estimate_tokens(system_instruction, history, kwargs.get("max_output_tokens"))
+        await self.limiter.acquire(estimated, caller)
+        chars = 0
+        async for delta in self.inner.generate_stream(model_name, system_instruction, history, **kwargs):
+            chars += len(delta)
+            yield delta
+        self.limiter.settle(estimated, estimate_tokens(system_instruction, history, output_guess=0) + math.ceil(chars / 4))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.limiter.get_stats()
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+from .llm import LLMProvider, ProviderWrapper
+
+class ModelHealth:
+    """Rolling latency and error statistics for one model over the last `window` seconds."""
+
+    def __init__(self, window: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.samples: Deque[Tuple[float, float, bool]] = deque()  # (timestamp, seconds, ok)
+
+    def record(self, seconds: float, ok: bool):
+        self.samples.append((self.clock(), seconds, ok))
+        self._expire()
+
+    def _expire(self):
+        cutoff = self.clock() - self.window
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+
+    def snapshot(self) -> Dict[str, float]:
+        """`calls`, `p95` (seconds) and `error_rate` over the window."""
+        self._expire()
+        if not self.samples:
+            return {"calls": 0, "p95": 0.0, "error_rate": 0.0}
+        latencies = sorted(s for _, s, _ in self.samples)
+        errors = sum(1 for _, _, ok in self.samples if not ok)
+        return {
+            "calls": len(latencies),
+            "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "error_rate": errors / len(latencies),
+        }
+
+class ModelRouter(ProviderWrapper):
+    """
+    Latency/error SLO routing per persona.
+
+    `fallbacks` maps a caller ("gm", "architect", ...) to a faster or cheaper model.
+    While the requested model breaches `p95_slo` (seconds) or `error_budget` (error rate)
+    over the rolling window, that caller's calls go to its fallback instead; one call
+    every `probe_interval` seconds still goes to the primary so it can recover. A call
+    that fails on the primary (including an open circuit breaker) is retried once on
+    the fallback. Every decision is kept in `decisions`; switches are logged.
+    """
+
+    def __init__(self, inner: LLMProvider, fallbacks: Dict[str, str], p95_slo: float = 20.0, error_budget: float = 0.25,
+                 window: float = 300.0, min_samples: int = 5, probe_interval: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__(inner)
+        self.fallbacks = {caller: model for caller, model in fallbacks.items() if model}
+        self.p95_slo = p95_slo
+        self.error_budget = error_budget
+        self.window = window
+        self.min_samples = min_samples
+        self.probe_interval = probe_interval
+        self.clock = clock
+        self.health: Dict[str, ModelHealth] = {}
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=200)
+        self._degraded: Dict[str, str] = {}  # caller -> breach reason
+        self._last_probe: Dict[str, float] = {}
+        self.stats = {"primary": 0, "fallback": 0, "probes": 0, "rescued": 0}
+
+    def _health(self, model_name: str) -> ModelHealth:
+        if model_name not in self.health:
+            self.health[model_name] = ModelHealth(self.window, self.clock)
+        return self.health[model_name]
+
+    def breach(self, model_name: str) -> Optional[str]:
+        """Returns why `model_name` is outside its SLO, or None."""
+        snap = self._health(model_name).snapshot()
+        if snap["calls"] < self.min_samples:
+            return None
+        if self.p95_slo and snap["p95"] > self.p95_slo:
+            return f"p95 {snap['p95']:.1f}s > {self.p95_slo:.1f}s"
+        if snap["error_rate"] > self.error_budget:
+            return f"errors {snap['error_rate']:.0%} > {self.error_budget:.0%}"
+        return None
+
+    def _decide(self, model_name: str, caller: Optional[str]) -> Tuple[str, Optional[str]]:
+        """Picks the model for this call; returns (model, fallback still available)."""
+        fallback = self.fallbacks.get(caller)
+        if not fallback or fallback == model_name:
+            return model_name, None
+
+        now = self.clock()
+        reason = self.breach(model_name)
+        previous = self._degraded.get(caller)
+        if reason and not previous:
+            print(f"🔀 Routing {caller} from {model_name} to {fallback} ({reason}).")
+            self._last_probe[caller] = now
+        elif previous and not reason:
+            print(f"✅ Routing {caller} back to {model_name}.")
+        if reason:
+            self._degraded[caller] = reason
+        else:
+            self._degraded.pop(caller, None)
+
+        chosen, kind = model_name, "primary"
+        if reason:
+            if now - self._last_probe[caller] >= self.probe_interval:
+                self._last_probe[caller] = now
+                kind = "probes"
+            else:
+                chosen, kind = fallback, "fallback"
+        self.stats[kind] += 1
+        self.decisions.append({"caller": caller, "model": chosen, "kind": kind, "reason": reason})
+        return chosen, (fallback if chosen != fallback else None)
+
+    def _rescue(self, caller: Optional[str], model_name: str, fallback: str, error: Exception):
+        self.stats["rescued"] += 1
+        self.decisions.append({"caller": caller, "model": fallback, "kind": "rescue", "reason": type(error).__name__})
+        print(f"🔀 {caller} call on {model_name} failed ({type(error).__name__}); retrying on {fallback}.")
+
+    async def _timed(self, model_name: str, system_instruction: str, history: List[Any], kwargs: Dict[str, Any]) -> str:
+        started = self.clock()
+        try:
+            text = await self.inner.generate(model_name, system_instruction, history, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._health(model_name).record(self.clock() - started, ok=False)
+            raise
+        self._health(model_name).record(self.clock() - started, ok=True)
+        return text
+
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> str:
+        caller = kwargs.get("caller")
+        chosen, fallback = self._decide(model_name, caller)
+        try:
+            return await self._timed(chosen, system_instruction, history, kwargs)
+        except Exception as e:
+            if not fallback:
+                raise
+            self._rescue(caller, chosen, fallback, e)
+            return await self._timed(fallback, system_instruction, history, kwargs)
+
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> AsyncIterator[str]:
+        caller = kwargs.get("caller")
+        chosen, fallback = self._decide(model_name, caller)
+        while True:
+            started = self.clock()
+            yielded = False
+            try:
+                async for delta in self.inner.generate_stream(chosen, system_instruction, history, **kwargs):
+                    yielded = True
+                    yield delta
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._health(chosen).record(self.clock() - started, ok=False)
+                if yielded or not fallback:
+                    raise
+                self._rescue(caller, chosen, fallback, e)
+                chosen, fallback = fallback, None
+                continue
+            self._health(chosen).record(self.clock() - started, ok=True)
+            return
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Decision counters, degraded personas and the rolling snapshot per model."""
+        return {
+            **self.stats,
+            "degraded": dict(self._degraded),
+            "models": {name: health.snapshot() for name, health in self.health.items()},
+        }
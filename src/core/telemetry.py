@@ -0,0 +1,189 @@
+import contextvars
+import json
+import pathlib
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+from .llm import LLMProvider, ProviderWrapper
+
+@dataclass(slots=True)
+class CallRecord:
+    """
+    One LLM call as seen by the caller.
+
+    Attributes:
+        timestamp: Unix time the call started.
+        caller: Priority/persona label ("gm", "architect", "feedback", "bard", "rebuild").
+        model: Requested model name.
+        stream: True for streamed calls.
+        latency: Wall time in seconds (retries and queueing included).
+        first_token: Seconds until the first streamed delta (streams only).
+        prompt_tokens / output_tokens / cached_tokens: From the provider's usage report
+            (summed across retries; 0 when the provider reports nothing, e.g. a response-cache hit).
+        ok: False if the call raised.
+        error: Exception type name when `ok` is False.
+    """
+    timestamp: float
+    caller: str
+    model: str
+    stream: bool = False
+    latency: float = 0.0
+    first_token: Optional[float] = None
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    ok: bool = True
+    error: str = ""
+
+_current_record: contextvars.ContextVar[Optional[CallRecord]] = contextvars.ContextVar("llm_call_record", default=None)
+
+def report_usage(prompt_tokens: Optional[int] = 0, output_tokens: Optional[int] = 0, cached_tokens: Optional[int] = 0):
+    """Adds token counts to the call being recorded (no-op outside a recorded call)."""
+    record = _current_record.get()
+    if record is not None:
+        record.prompt_tokens += prompt_tokens or 0
+        record.output_tokens += output_tokens or 0
+        record.cached_tokens += cached_tokens or 0
+
+def report_usage_metadata(usage_metadata: Any):
+    """Reports a Gemini `usage_metadata` object (missing fields count as 0)."""
+    if usage_metadata is not None:
+        report_usage(
+            getattr(usage_metadata, "prompt_token_count", 0),
+            getattr(usage_metadata, "candidates_token_count", 0),
+            getattr(usage_metadata, "cached_content_token_count", 0),
+        )
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+class Telemetry:
+    """
+    Keeps the last `max_records` call records in memory and, when `dump_path` is set,
+    appends each one to that JSONL file as it completes.
+    """
+
+    def __init__(self, max_records: int = 2000, dump_path: Optional[str] = None):
+        self.records: Deque[CallRecord] = deque(maxlen=max_records)
+        self.dump_path = pathlib.Path(dump_path) if dump_path else None
+
+    def add(self, record: CallRecord):
+        self.records.append(record)
+        if self.dump_path:
+            try:
+                self.dump_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.dump_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(asdict(record)) + "\n")
+            except OSError as e:
+                print(f"⚠️ Failed to write LLM telemetry: {e}")
+
+    def recent(self, window: Optional[float] = None) -> List[CallRecord]:
+        if not window:
+            return list(self.records)
+        cutoff = time.time() - window
+        return [r for r in self.records if r.timestamp >= cutoff]
+
+    def aggregates(self, window: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Per-caller totals over the last `window` seconds (None = everything kept)."""
+        groups: Dict[str, List[CallRecord]] = {}
+        for record in self.recent(window):
+            groups.setdefault(record.caller, []).append(record)
+
+        result = {}
+        for caller, records in sorted(groups.items()):
+            latencies = [r.latency for r in records]
+            first_tokens = [r.first_token for r in records if r.first_token is not None]
+            result[caller] = {
+                "calls": len(records),
+                "errors": sum(1 for r in records if not r.ok),
+                "prompt_tokens": sum(r.prompt_tokens for r in records),
+                "output_tokens": sum(r.output_tokens for r in records),
+                "cached_tokens": sum(r.cached_tokens for r in records),
+                "p50_latency": _percentile(latencies, 0.5),
+                "p95_latency": _percentile(latencies, 0.95),
+                "p50_first_token": _percentile(first_tokens, 0.5) if first_tokens else None,
+            }
+        return result
+
+    def to_jsonl(self, window: Optional[float] = None) -> str:
+        """The kept records as JSON lines."""
+        return "".join(json.dumps(asdict(r)) + "\n" for r in self.recent(window))
+
+def format_aggregates(aggregates: Dict[str, Dict[str, Any]]) -> str:
+    """Fixed-width summary table of `Telemetry.aggregates()` for Discord code blocks."""
+    if not aggregates:
+        return "No LLM calls recorded."
+    lines = [f"{'caller':<10} {'calls':>5} {'err':>4} {'prompt':>9} {'output':>8} {'cached':>9} {'p50 s':>6} {'p95 s':>6}"]
+    for caller, a in aggregates.items():
+        lines.append(
+            f"{caller:<10} {a['calls']:>5} {a['errors']:>4} {a['prompt_tokens']:>9} {a['output_tokens']:>8} "
+            f"{a['cached_tokens']:>9} {a['p50_latency']:>6.1f} {a['p95_latency']:>6.1f}"
+        )
+    return "\n".join(lines)
+
+class TelemetryProvider(ProviderWrapper):
+    """
+    Produces a `CallRecord` for every call. Providers report token usage into the
+    current record with `report_usage*()`; the record travels in a context variable,
+    so it also reaches retries and hedged attempts started as separate tasks.
+    """
+
+    def __init__(self, inner: LLMProvider, telemetry: Telemetry):
+        super().__init__(inner)
+        self.telemetry = telemetry
+
+    def _start(self, model_name: str, kwargs: Dict[str, Any], stream: bool) -> CallRecord:
+        return CallRecord(timestamp=time.time(), caller=kwargs.get("caller") or "unlabeled", model=model_name, stream=stream)
+
+    def _finish(self, record: CallRecord, started: float, error: Optional[BaseException] = None):
+        record.latency = time.perf_counter() - started
+        if error is not None:
+            record.ok = False
+            record.error = type(error).__name__
+        self.telemetry.add(record)
+
+    async def generate(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> str:
+        record = self._start(model_name, kwargs, stream=False)
+        token = _current_record.set(record)
+        started = time.perf_counter()
+        try:
+            text = await self.inner.generate(model_name, system_instruction, history, **kwargs)
+        except BaseException as e:
+            self._finish(record, started, e)
+            raise
+        finally:
+            _current_record.reset(token)
+        self._finish(record, started)
+        return text
+
+    async def generate_stream(self, model_name: str, system_instruction: str, history: List[Any], **kwargs) -> AsyncIterator[str]:
+        record = self._start(model_name, kwargs, stream=True)
+        started = time.perf_counter()
+        stream = self.inner.generate_stream(model_name, system_instruction, history, **kwargs)
+        try:
+            while True:
+                # The consumer runs between deltas, so the record is only current while the inner stream runs
+                token = _current_record.set(record)
+                try:
+                    delta = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _current_record.reset(token)
+                if record.first_token is None:
+                    record.first_token = time.perf_counter() - started
+                yield delta
+        except GeneratorExit:
+            # The consumer stopped reading early; that is not a failed call
+            self._finish(record, started)
+            raise
+        except BaseException as e:
+            self._finish(record, started, e)
+            raise
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose:
+                await aclose()
+        self._finish(record, started)
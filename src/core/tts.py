@@ -1,8 +1,8 @@
 from abc import ABC, abstractmethod
 import io
 import wave
-import google.genai as genai
 from google.genai import types
+from .genai_clients import get_genai_client
 
 class TTSProvider(ABC):
     """Abstract base class for Text-to-Speech providers."""
@@ -23,10 +23,18 @@ class GeminiTTSProvider(TTSProvider):
     Note: Requires a model that supports audio output modality.
     """
     
-    def __init__(self, api_key: str, model_name: str):
-        self.client = genai.Client(api_key=api_key, http_options={'api_version': 'v1beta'})
+    def __init__(self, api_key: str, model_name: str, client=None):
+        self.api_key = api_key
+        self._client = client
         self.model_name = model_name
 
+    @property
+    def client(self):
+        """The genai client, created on first use (replay and Ollama runs may have no Gemini key)."""
+        if self._client is None:
+            self._client = get_genai_client(self.api_key)
+        return self._client
+
     async def generate_audio(self, text: str, voice_id: str) -> io.BytesIO:
         """
         Generates audio using Gemini's native narration capabilities.
@@ -13,12 +13,20 @@ from google.genai import types
 # Add the project root to sys.path so we can import src modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from src.core.config import validate_config, DISCORD_TOKEN, AI_MODEL, MODEL_GM, TARGET_CHANNEL_ID, GEMINI_API_KEY, GEMINI_AUDIO_MODEL
-from src.core.client import client_discord, tree, client_genai, llm_provider
+from src.core.config import (
+    validate_config, DISCORD_TOKEN, AI_MODEL, MODEL_GM, MODEL_ARCHITECT, MODEL_FEEDBACK, TARGET_CHANNEL_ID, GEMINI_API_KEY, GEMINI_AUDIO_MODEL,
+    CONTEXT_TOKEN_BUDGET, CONTEXT_HISTORY_LIMIT, CONTEXT_MIN_HISTORY, CONTEXT_PINNED_LEDGERS,
+    HISTORY_BUFFER_SIZE, TURN_COALESCE_WINDOW, TURN_COALESCE_MAX_DELAY, TURN_QUEUE_LIMIT, TURN_MAX_RESTARTS,
+    LEDGER_BATCH_WINDOW, LLM_BATCH_REBUILD, STREAM_RESPONSES, STREAM_EDIT_INTERVAL, GM_MAX_OUTPUT_TOKENS, LENGTH_CONDENSE_MIN_KEEP
+)
+from src.core.client import client_discord, tree, client_genai, get_gemini_client, llm_provider, ollama_provider, llm_telemetry
+from src.core.telemetry import format_aggregates
+from src.core.messages import ChatMessage, to_gemini_contents
+from src.core.genai_clients import genai_registry
 
 # Import Modules
 from src.modules.dice.rolling import roll
-from src.modules.presence.manager import AwayManager
+from src.modules.presence.manager import away_manager
 from src.modules.memory.service import (
     update_ledgers_logic, 
     reverse_ledgers_logic, 
@@ -28,16 +36,26 @@ from src.modules.memory.service import (
     get_feedback_interpretation,
     record_feedback,
     save_ledger_files,
-    rebuild_memory_from_history
+    rebuild_memory_from_history,
+    ledger_store
 )
+from src.modules.memory.worker import LedgerUpdateWorker
 from src.modules.narrative.parser import (
     process_response_formatting, 
     pending_rolls, 
+    register_roll_calls,
     filter_away_mentions,
     check_length_violation,
-    smart_chunk_text
+    apply_length_guard,
+    smart_chunk_text,
+    StreamingProtocolParser,
+    NARRATIVE_CHAR_LIMIT
 )
-from src.modules.narrative.loader import load_system_instruction
+from src.modules.narrative.loader import load_system_instruction, get_system_instruction
+from src.modules.narrative.context import ContextAssembler, output_token_limit
+from src.modules.narrative.history import ChannelHistoryBuffer
+from src.modules.narrative.turns import TurnScheduler
+from src.modules.narrative.streaming import NarrativePreview, StreamingMessage
 from src.modules.commands.registry import get_help_text
 
 from src.modules.table.state import TableManager, TableState
@@ -51,13 +69,54 @@ from src.core.tts import GeminiTTSProvider
 from src.core.views import ConfirmView, FeedbackConfirmView
 
 # Initialize Managers
-away_manager = AwayManager() 
 table_manager = TableManager()
 register_table_commands(tree, table_manager)
 
+history_buffer = ChannelHistoryBuffer(capacity=HISTORY_BUFFER_SIZE, channel_id=TARGET_CHANNEL_ID)
+
+# Hard cap on GM output, derived from the narrative character limit unless configured
+gm_max_output_tokens = GM_MAX_OUTPUT_TOKENS or output_token_limit(NARRATIVE_CHAR_LIMIT)
+
+ledger_worker = LedgerUpdateWorker(update_ledgers_logic, batch_window=LEDGER_BATCH_WINDOW)
+
+def flush_ledgers_on_break(old_state: TableState, new_state: TableState):
+    """Applies queued MEMORY_UPDATE facts as soon as the session pauses or ends."""
+    if new_state in (TableState.PAUSED, TableState.DEBRIEF, TableState.IDLE) and ledger_worker.queue_depth:
+        try:
+            asyncio.get_running_loop().create_task(ledger_worker.flush())
+        except RuntimeError:
+            pass  # No running loop (terminal mode); nothing is queued there.
+
+table_manager.add_listener(flush_ledgers_on_break)
+
 bard_manager = BardManager()
-tts_provider = GeminiTTSProvider(api_key=GEMINI_API_KEY, model_name=GEMINI_AUDIO_MODEL)
-register_bard_commands(tree, bard_manager, tts_provider)
+tts_provider = GeminiTTSProvider(api_key=GEMINI_API_KEY, model_name=GEMINI_AUDIO_MODEL, client=client_genai)
+register_bard_commands(tree, bard_manager, tts_provider, history_buffer)
+
+context_assembler = ContextAssembler(
+    token_budget=CONTEXT_TOKEN_BUDGET,
+    min_history=CONTEXT_MIN_HISTORY,
+    pinned_ledgers=CONTEXT_PINNED_LEDGERS
+)
+
+def build_state_context() -> str:
+    """Returns the table state section injected after the persona."""
+    current_state_str = table_manager.get_state().value
+    state_context = f"\n\n# CURRENT TABLE STATE: {current_state_str}\n"
+    if current_state_str == "SESSION_ZERO":
+        state_context += "Focus on world-building, character creation, and establishing facts. Be less of a narrator and more of a facilitator."
+    return state_context
+
+def assemble_context(full_context: str, history: list):
+    """Fits persona, table state, ledgers and history into the context token budget."""
+    ledgers = ledger_store.get_ledgers()
+    return context_assembler.assemble(
+        full_context,
+        build_state_context(),
+        ledgers,
+        history,
+        ledger_mtimes={name: ledger_store.get_mtime(name) for name in ledgers}
+    )
 
 # ------------------------------------------------------------------
 # EVENT HANDLERS
@@ -75,20 +134,56 @@ async def on_ready():
     except Exception as e:
         print(f"❌ Failed to sync slash commands: {e}")
 
+    # Open a pooled Gemini connection now so the first player message skips TLS setup
+    asyncio.create_task(genai_registry.warm_up(MODEL_GM))
+    # Load local models now; keep_alive pins them between turns
+    for model in {MODEL_GM, MODEL_ARCHITECT, MODEL_FEEDBACK}:
+        if model.startswith("ollama:"):
+            asyncio.create_task(ollama_provider.preload(model.split(":", 1)[1]))
+
     # Load Context
     print("🧠 Loading Campaign Context...")
-    full_context = load_system_instruction()
+    full_context = get_system_instruction()
     print(f"✨ System Instruction Loaded ({len(full_context)} chars).")
 
+    # Backfill the message ring buffer once; events keep it current afterwards
+    if TARGET_CHANNEL_ID:
+        channel = client_discord.get_channel(TARGET_CHANNEL_ID)
+        if channel:
+            try:
+                count = await history_buffer.backfill(channel)
+                print(f"📜 History buffer backfilled ({count} messages).")
+            except Exception as e:
+                print(f"⚠️ Failed to backfill history buffer: {e}")
+
 @client_discord.event
-async def on_message(message):
-    if message.author == client_discord.user:
-        return
+async def on_raw_message_edit(payload):
+    message = getattr(payload, "message", None)
+    content = message.content if message else payload.data.get("content")
+    if content is not None:
+        history_buffer.update_content(payload.channel_id, payload.message_id, content)
+
+@client_discord.event
+async def on_raw_message_delete(payload):
+    history_buffer.remove(payload.channel_id, payload.message_id)
+
+@client_discord.event
+async def on_raw_bulk_message_delete(payload):
+    for message_id in payload.message_ids:
+        history_buffer.remove(payload.channel_id, message_id)
 
+@client_discord.event
+async def on_message(message):
     # Only process target channel
     if TARGET_CHANNEL_ID and message.channel.id != TARGET_CHANNEL_ID:
         return
 
+    # The GM's own replies are history too
+    history_buffer.record(message)
+
+    if message.author == client_discord.user:
+        return
+
     # Ignore generic "commands" (legacy text commands)
     if message.content.startswith('/'):
         return
@@ -102,72 +197,124 @@ async def on_message(message):
     if message.content.strip().startswith("(") or message.content.strip().startswith("[OOC]"):
         return 
 
-    async with message.channel.typing():
+    # Bursts of player messages are folded into a single, serialized GM turn
+    turn_scheduler.submit(message)
+
+async def run_narrative_turn(channel, messages, turn):
+    """
+    Generates one GM turn answering every message coalesced into `messages`.
+    Until `turn.commit()` is called the scheduler may cancel this turn in favour of newer input.
+    """
+    # The table may have been paused while the turn was debouncing
+    if not table_manager.is_narrative_active():
+        return
+
+    message = messages[-1]
+    async with channel.typing():
         try:
-            full_context = load_system_instruction()
-            ledger_content = load_memory()
+            full_context = get_system_instruction()
             
+            await history_buffer.ensure(channel)
             history = []
-            async for msg in message.channel.history(limit=15):
-                role = "model" if msg.author == client_discord.user else "user"
-                content = msg.content
-                if role == "user":
-                    content = f"{msg.author.display_name}: {content}"
-                history.append(types.Content(role=role, parts=[types.Part.from_text(text=content)]))
-            
-            history.reverse()
-            
-            # Inject Table State for context-aware responses
-            current_state_str = table_manager.get_state().value
-            state_context = f"\n\n# CURRENT TABLE STATE: {current_state_str}\n"
-            if current_state_str == "SESSION_ZERO":
-                state_context += "Focus on world-building, character creation, and establishing facts. Be less of a narrator and more of a facilitator."
+            for record in history_buffer.recent(channel.id, CONTEXT_HISTORY_LIMIT):
+                if record.author_id == client_discord.user.id:
+                    history.append(ChatMessage.model(record.content, message_id=record.id))
+                else:
+                    history.append(ChatMessage.user(record.content, author=record.display_name, message_id=record.id))
             
-            final_system_instruction = f"{full_context}{state_context}\n\n# CURRENT CAMPAIGN STATE (READ-ONLY)\n{ledger_content}"
+            # Inject Table State + Ledgers, trimmed to the context budget
+            context = assemble_context(full_context, history)
+            history = context.history
+            final_system_instruction = context.system_instruction
             
-            response_text = await llm_provider.generate(
-                model_name=MODEL_GM,
-                system_instruction=final_system_instruction,
-                history=history,
-                temperature=0.7
-            )
+            stream = None
+            parsed = None
+            if STREAM_RESPONSES:
+                # Post the narrative as it arrives; posting commits the turn
+                stream = StreamingMessage(channel, edit_interval=STREAM_EDIT_INTERVAL, on_first_post=turn.commit)
+                protocol_parser = StreamingProtocolParser()
+                preview = NarrativePreview()
+                response_text = ""
+                async for delta in llm_provider.generate_stream(
+                    model_name=MODEL_GM,
+                    system_instruction=final_system_instruction,
+                    history=history,
+                    temperature=0.7,
+                    static_prefix=context.static_prefix,
+                    max_output_tokens=gm_max_output_tokens,
+                    caller="gm"
+                ):
+                    response_text += delta
+                    # Protocol blocks never reach players; their handlers run as each block closes.
+                    # Only the newly released text is filtered; the guard stops the preview at the last paragraph that fits.
+                    await stream.update(preview.append(protocol_parser.feed(delta)))
+                parsed = protocol_parser.close()
+            else:
+                response_text = await llm_provider.generate(
+                    model_name=MODEL_GM,
+                    system_instruction=final_system_instruction,
+                    history=history,
+                    temperature=0.7,
+                    static_prefix=context.static_prefix,
+                    max_output_tokens=gm_max_output_tokens,
+                    caller="gm"
+                )
             
             if response_text:
-                final_text, facts, visual_prompt, detected_feedback, detected_state_change = process_response_formatting(response_text)
+                # Full DATA_TABLEs too long to show inline, sent as files after the reply
+                table_files = []
+                # ROLL_CALLs become pending rolls only once the turn commits (a superseded turn leaves none behind)
+                roll_calls = []
+                final_text, facts, visual_prompt, detected_feedback, detected_state_change = process_response_formatting(response_text, parsed=parsed, attachments=table_files, roll_calls=roll_calls)
                 
-                # RETRY LOGIC (Force Narrative Limit)
-                if check_length_violation(final_text):
-                    print(f"⚠️ Output too long ({len(final_text)} chars). Attempting condensed retry...")
-                    correction = f"SYSTEM ERROR: Your last response was {len(final_text)} characters long, exceeding the 1900 limit. REWRITE the response to be under 1900 characters immediately. Do not lose narrative progress, just summarize."
+                # LENGTH GUARD (Force Narrative Limit): condense locally, regenerate only as a last resort.
+                # Once a preview is on screen we always condense rather than replace what players read.
+                min_keep = 0.0 if stream and stream.posted else LENGTH_CONDENSE_MIN_KEEP
+                final_text, needs_retry = apply_length_guard(final_text, min_keep=min_keep)
+                if needs_retry:
+                    correction = f"SYSTEM ERROR: Your last response was {len(final_text)} characters long, exceeding the {NARRATIVE_CHAR_LIMIT} limit. REWRITE the response to be under {NARRATIVE_CHAR_LIMIT} characters immediately. Do not lose narrative progress, just summarize."
                     
                     # Append bad context + correction
-                    history.append(types.Content(role="model", parts=[types.Part.from_text(text=response_text)]))
-                    history.append(types.Content(role="user", parts=[types.Part.from_text(text=correction)]))
+                    history.append(ChatMessage.model(response_text))
+                    history.append(ChatMessage.user(correction))
                     
                     try:
                         response_text = await llm_provider.generate(
                             model_name=MODEL_GM,
                             system_instruction=final_system_instruction,
                             history=history,
-                            temperature=0.7
+                            temperature=0.7,
+                            static_prefix=context.static_prefix,
+                            max_output_tokens=gm_max_output_tokens,
+                            caller="gm"
                         )
                         if response_text:
-                            final_text, facts, visual_prompt, detected_feedback, detected_state_change = process_response_formatting(response_text)
+                            table_files, roll_calls = [], []
+                            final_text, facts, visual_prompt, detected_feedback, detected_state_change = process_response_formatting(response_text, attachments=table_files, roll_calls=roll_calls)
                             print(f"✅ Retry received ({len(final_text)} chars).")
                     except Exception as retry_err:
                         print(f"❌ Retry failed: {retry_err}")
 
                 # Smart Chunking (Fallback)
-                chunks = smart_chunk_text(final_text)
-                for chunk in chunks:
-                    if chunk.strip():
-                        await message.channel.send(chunk)
+                turn.commit()
+                register_roll_calls(roll_calls)
+                if stream:
+                    # Replace the streamed preview with the processed text (rolls, tables, condensed narrative)
+                    await stream.finalize(final_text)
+                else:
+                    chunks = smart_chunk_text(final_text)
+                    for chunk in chunks:
+                        if chunk.strip():
+                            await channel.send(chunk)
+                for filename, content in table_files:
+                    f = io.BytesIO(content.encode("utf-8"))
+                    await channel.send(file=discord.File(f, filename))
 
                 if facts:
-                    await update_ledgers_logic(facts)
+                    ledger_worker.enqueue(facts)
                 if visual_prompt:
                     # Logic for visual prompt system event
-                    await message.channel.send(f"[System Event: Visual Prompt triggered: {visual_prompt}]")
+                    await channel.send(f"[System Event: Visual Prompt triggered: {visual_prompt}]")
 
                 # Handle Implicit Feedback
                 if detected_feedback:
@@ -185,8 +332,8 @@ async def on_message(message):
                         if target_user:
                             # We found the user, we can initiate the confirmation
                             interpretation = await get_feedback_interpretation(fb_type, fb_content)
-                            view = FeedbackConfirmView(target_user, fb_type, fb_content, interpretation, message.channel, record_feedback)
-                            await message.channel.send(f"💡 {target_user.mention}, I detected a possible **{fb_type.capitalize()}** from you:\n> \"{fb_content}\"\n\n**Interpretation:**\n{interpretation}\n\nDo you want to record this?", view=view)
+                            view = FeedbackConfirmView(target_user, fb_type, fb_content, interpretation, channel, record_feedback)
+                            await channel.send(f"💡 {target_user.mention}, I detected a possible **{fb_type.capitalize()}** from you:\n> \"{fb_content}\"\n\n**Interpretation:**\n{interpretation}\n\nDo you want to record this?", view=view)
                         else:
                             print(f"⚠️ Could not find user {fb_user_name} for implicit feedback.")
 
@@ -197,10 +344,21 @@ async def on_message(message):
                     
                     if new_state_str:
                         view = StateChangeView(new_state_str, reason, table_manager, message.author)
-                        await message.channel.send(f"🛑 **Table State Change Suggested**\n> The GM suggests moving to `{new_state_str}`.\n> **Reason:** {reason}", view=view)
+                        await channel.send(f"🛑 **Table State Change Suggested**\n> The GM suggests moving to `{new_state_str}`.\n> **Reason:** {reason}", view=view)
 
         except Exception as e:
             print(f"❌ Error in message loop: {e}")
+            if not turn.committed:
+                # Don't drop the turn silently: tell the table the GM could not answer
+                await channel.send("⚠️ *The GM is struggling to reach the oracle right now. Please repeat your last action in a moment.*")
+
+turn_scheduler = TurnScheduler(
+    run_narrative_turn,
+    window=TURN_COALESCE_WINDOW,
+    max_delay=TURN_COALESCE_MAX_DELAY,
+    max_pending=TURN_QUEUE_LIMIT,
+    max_restarts=TURN_MAX_RESTARTS
+)
 
 
 # ------------------------------------------------------------------
@@ -300,8 +458,8 @@ async def visual_command(interaction: discord.Interaction, prompt: Optional[str]
 async def rewind_command(interaction: discord.Interaction, new_direction: str):
     await interaction.response.defer(ephemeral=True)
     last_bot_msg = None
-    async for msg in interaction.channel.history(limit=50):
-        if msg.author == client_discord.user and not msg.content.startswith("[System Event:"):
+    for msg in reversed(await history_buffer.fetch(interaction.channel, 50)):
+        if msg.author_id == client_discord.user.id and not msg.content.startswith("[System Event:"):
             last_bot_msg = msg
             break
     if not last_bot_msg:
@@ -310,6 +468,8 @@ async def rewind_command(interaction: discord.Interaction, new_direction: str):
     
     memory_match = re.search(r"```MEMORY_UPDATE\s*(.*?)", last_bot_msg.content, re.DOTALL | re.IGNORECASE)
     if memory_match and memory_match.group(1).strip():
+        # Apply queued updates first so the reversal sees them
+        await ledger_worker.flush()
         await reverse_ledgers_logic(memory_match.group(1).strip())
     
     await interaction.channel.send(f"[System Event: Rewind requested by {interaction.user.display_name}. New direction: \"{new_direction}\"]")
@@ -344,16 +504,32 @@ async def reset_memory_command(interaction: discord.Interaction):
     await view.wait()
     if view.value:
         await interaction.edit_original_response(content="🔄 Rebuilding...", view=None)
+        await ledger_worker.flush()
         # Simplified reconstruction logic
         history_messages = [msg async for msg in interaction.channel.history(limit=500)]
         history_messages.reverse()
         history_text = "\n".join([f"{m.author.name}: {m.content}" for m in history_messages])
         
-        count = await rebuild_memory_from_history(history_text)
+        if LLM_BATCH_REBUILD:
+            await interaction.edit_original_response(content="🔄 Rebuilding as a batch job (this can take a while)...")
+        count = await rebuild_memory_from_history(history_text, use_batch=LLM_BATCH_REBUILD)
         await interaction.channel.send(f"✅ Memory Rebuilt ({count} files).")
     else:
         await interaction.edit_original_response(content="Cancelled.", view=None)
 
+@tree.command(name="llm_stats", description="[Admin] LLM token usage and latency per caller.")
+@discord.app_commands.describe(minutes="Look-back window in minutes (0 = everything kept)", dump="Attach the raw call records as JSON lines")
+@discord.app_commands.checks.has_permissions(administrator=True)
+async def llm_stats_command(interaction: discord.Interaction, minutes: int = 60, dump: bool = False):
+    window = minutes * 60 if minutes > 0 else None
+    table = format_aggregates(llm_telemetry.aggregates(window))
+    content = f"**LLM calls ({f'last {minutes} min' if window else 'all kept'})**\n```\n{table}\n```"
+    if dump:
+        f = io.BytesIO(llm_telemetry.to_jsonl(window).encode("utf-8"))
+        await interaction.response.send_message(content, file=discord.File(f, "llm_calls.jsonl"), ephemeral=True)
+    else:
+        await interaction.response.send_message(content, ephemeral=True)
+
 
 # ------------------------------------------------------------------
 # TERMINAL MODE
@@ -424,31 +600,25 @@ def run_terminal_mode():
 
         try:
             # 1. Format history
-            gemini_history = []
+            merged = []
             for role, text in local_history:
-                if gemini_history and gemini_history[-1].role == role:
-                     gemini_history[-1].parts[0].text += "\n" + text
+                if merged and merged[-1][0] == role:
+                    merged[-1][1] += "\n" + text
                 else:
-                    gemini_history.append(types.Content(role=role, parts=[types.Part.from_text(text=text)]))
+                    merged.append([role, text])
+            chat_history = [ChatMessage(role, text) for role, text in merged]
 
             # Maintain alternation
-            if gemini_history and gemini_history[-1].role == "user":
-                 gemini_history.append(types.Content(
-                    role="model",
-                    parts=[types.Part.from_text(text="*(Acknowledging history context...)*")]
-                ))
-
-            # 2. Inject Context with State
-            current_state_str = table_manager.get_state().value
-            ledger_content = load_memory()
-            state_context = f"\n\n# CURRENT TABLE STATE: {current_state_str}\n"
-            if current_state_str == "SESSION_ZERO":
-                state_context += "Focus on world-building, character creation, and establishing facts. Be less of a narrator and more of a facilitator."
-            
-            final_instruction = f"{full_instruction}{state_context}\n\n# CURRENT CAMPAIGN STATE (READ-ONLY)\n{ledger_content}"
+            if chat_history and chat_history[-1].role == "user":
+                chat_history.append(ChatMessage.model("*(Acknowledging history context...)*"))
+
+            # 2. Inject Context with State (trimmed to the context budget)
+            context = assemble_context(full_instruction, chat_history)
+            gemini_history = to_gemini_contents(context.history)
+            final_instruction = context.system_instruction
 
             # 3. Create Chat Session
-            chat = client_genai.aio.chats.create(
+            chat = get_gemini_client().aio.chats.create(
                 model=AI_MODEL,
                 config=types.GenerateContentConfig(
                     system_instruction=final_instruction,
@@ -2,22 +2,34 @@ import discord
 from discord import app_commands
 import io
 import pathlib
+from typing import Optional
 from .manager import BardManager
 from .scriptwriter import Scriptwriter
 from src.core.tts import TTSProvider
 from src.modules.memory.service import load_memory
+from src.modules.narrative.history import ChannelHistoryBuffer
 from prettytable import PrettyTable
 
 class BardCommands:
-    def __init__(self, tree: app_commands.CommandTree, bard_manager: BardManager, tts_provider: TTSProvider):
+    def __init__(self, tree: app_commands.CommandTree, bard_manager: BardManager, tts_provider: TTSProvider, history_buffer: Optional[ChannelHistoryBuffer] = None):
         self.tree = tree
         self.bard_manager = bard_manager
         self.scriptwriter = Scriptwriter()
         self.tts_provider = tts_provider
+        self.history_buffer = history_buffer
         
         if self.bard_manager.is_configured():
             self._register_commands()
 
+    async def _recent_messages(self, channel, limit: int):
+        """Returns (author_is_bot, display_name, content) tuples, oldest first."""
+        if self.history_buffer is not None:
+            return [(r.author_is_bot, r.display_name, r.content) for r in await self.history_buffer.fetch(channel, limit)]
+
+        messages = [(msg.author.bot, msg.author.display_name, msg.content) async for msg in channel.history(limit=limit)]
+        messages.reverse()
+        return messages
+
     def _register_commands(self):
         @self.tree.command(name="summary", description="Generate a cinematic recap of the story.")
         @app_commands.choices(scope=[
@@ -31,14 +43,13 @@ class BardCommands:
                 # 1. Gather History/Context
                 # Simplified: fetch last 25 messages for session summary
                 history_msgs = []
-                async for msg in interaction.channel.history(limit=25):
-                    if msg.author.bot and not msg.content.startswith("🎲"):
+                for author_is_bot, display_name, content in await self._recent_messages(interaction.channel, 25):
+                    if author_is_bot and not content.startswith("🎲"):
                         # Keep bot narrative, ignore dice blocks/commands
-                        history_msgs.append(f"GM: {msg.content}")
-                    elif not msg.author.bot:
-                        history_msgs.append(f"{msg.author.display_name}: {msg.content}")
+                        history_msgs.append(f"GM: {content}")
+                    elif not author_is_bot:
+                        history_msgs.append(f"{display_name}: {content}")
                 
-                history_msgs.reverse()
                 history_text = "\n".join(history_msgs)
                 ledger_context = load_memory()
                 
@@ -106,5 +117,5 @@ class BardCommands:
             else:
                 await interaction.response.send_message(f"❌ Unknown voice key: `{key}`", ephemeral=True)
 
-def register_bard_commands(tree: app_commands.CommandTree, bard_manager: BardManager, tts_provider: TTSProvider):
-    return BardCommands(tree, bard_manager, tts_provider)
+def register_bard_commands(tree: app_commands.CommandTree, bard_manager: BardManager, tts_provider: TTSProvider, history_buffer: Optional[ChannelHistoryBuffer] = None):
+    return BardCommands(tree, bard_manager, tts_provider, history_buffer)
@@ -1,7 +1,7 @@
 import pathlib
-from google.genai import types
 from src.core.client import llm_provider
 from src.core.config import MODEL_GM
+from src.core.messages import ChatMessage
 
 class Scriptwriter:
     def __init__(self):
@@ -51,12 +51,13 @@ class Scriptwriter:
         Start immediately with the narration.
         """
 
-        # Pass user_content as a single-item list to 'history' (which maps to 'contents' in Gemini)
         response = await llm_provider.generate(
             model_name=MODEL_GM,
             system_instruction=system_instruction,
-            history=[user_content], 
-            temperature=0.8
+            history=[ChatMessage.user(user_content)],
+            temperature=0.8,
+            caller="bard",
+            use_cache=True  # /summary twice with no new messages reuses the script
         )
         
         return response.strip() if response else "The chronicles are silent..."
@@ -4,9 +4,13 @@ import pathlib
 import argparse
 import sys
 from dotenv import load_dotenv
-from google import genai
 from google.genai import types
 
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from src.core.genai_clients import get_genai_client
+
 # 1. Configuration
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -17,7 +21,7 @@ if not GEMINI_API_KEY:
     print("❌ Error: GEMINI_API_KEY not found in .env")
     exit(1)
 
-client = genai.Client(api_key=GEMINI_API_KEY)
+client = get_genai_client(GEMINI_API_KEY)
 
 def upload_to_gemini(file_path: pathlib.Path):
     """Uploads a file to Gemini and waits for it to be active."""
@@ -4,30 +4,38 @@ import pathlib
 import sys
 import re
 import time
+import asyncio
+import functools
 from typing import Optional, List
-from google.genai import types
 
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 
-from src.core.config import AI_MODEL, MODEL_ARCHITECT, MODEL_FEEDBACK
+from src.core.config import AI_MODEL, MODEL_ARCHITECT, MODEL_FEEDBACK, LLM_BATCH_POLL_INTERVAL, LLM_BATCH_TIMEOUT
+from src.core.llm import BatchRequest
+from src.core.messages import ChatMessage
 from src.core.client import client_genai, llm_provider
+from src.modules.memory.store import LedgerStore
 
-# Load Persona (Dynamic Load)
+# Shared in-memory view of ./memory/*.ledger.
+# Every writer in this module invalidates the files it touches.
+ledger_store = LedgerStore("./memory")
+
+# Architect read-modify-write cycles must not interleave (concurrent turns, rewinds, rebuilds).
+ledger_lock = asyncio.Lock()
+
+def with_ledger_lock(func):
+    """Serializes an async ledger mutation behind `ledger_lock`."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        async with ledger_lock:
+            return await func(*args, **kwargs)
+    return wrapper
 
 
 def load_memory():
-    """Loads all .ledger files from ./memory."""
-    memory_parts = []
-    memory_dir = pathlib.Path("./memory")
-    if memory_dir.exists():
-        for l_file in memory_dir.glob("*.ledger"):
-            try:
-                content = l_file.read_text(encoding="utf-8")
-                memory_parts.append(f"\n--- CAMPAIGN LEDGER: {l_file.name} ---\n{content}")
-            except Exception as e:
-                print(f"❌ Failed to load ledger {l_file.name}: {e}")
-    return "\n".join(memory_parts)
+    """Returns all .ledger files from ./memory (served from the in-memory LedgerStore)."""
+    return ledger_store.get_all()
 
 def save_ledger_files(response_text):
     """Parses FILE: blocks from AI response and saves them to ./memory."""
@@ -50,12 +58,14 @@ def save_ledger_files(response_text):
             filepath = pathlib.Path("./memory") / filename
             filepath.parent.mkdir(parents=True, exist_ok=True)
             filepath.write_text(content.strip(), encoding="utf-8")
+            ledger_store.invalidate(filename)
             print(f"💾 Ledger Saved: {filename}")
             count += 1
     except Exception as e:
         print(f"❌ Error saving ledgers: {e}")
     return count
 
+@with_ledger_lock
 async def update_ledgers_logic(update_facts):
     """Uses the Memory Architect to update physical ledger files asynchronously."""
     try:
@@ -76,14 +86,16 @@ async def update_ledgers_logic(update_facts):
         response_text = await llm_provider.generate(
             model_name=MODEL_ARCHITECT,
             system_instruction=persona_content,
-            history=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])],
-            temperature=0.1
+            history=[ChatMessage.user(prompt)],
+            temperature=0.1,
+            caller="architect"
         )
         if response_text:
             save_ledger_files(response_text)
     except Exception as e:
         print(f"❌ Ledger Update Error: {e}")
 
+@with_ledger_lock
 async def reverse_ledgers_logic(facts_to_reverse):
     """Uses the Memory Architect to reverse facts in physical ledger files."""
     try:
@@ -106,8 +118,9 @@ async def reverse_ledgers_logic(facts_to_reverse):
         response_text = await llm_provider.generate(
             model_name=MODEL_ARCHITECT,
             system_instruction=persona_content,
-            history=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])],
-            temperature=0.1
+            history=[ChatMessage.user(prompt)],
+            temperature=0.1,
+            caller="architect"
         )
         if response_text:
             save_ledger_files(response_text)
@@ -120,12 +133,11 @@ def get_character_name(user_id: str, user_name: str) -> Optional[str]:
     Finds a character's name by searching the party.ledger for a matching
     Discord User ID or username.
     """
-    party_ledger_path = pathlib.Path("./memory/party.ledger")
-    if not party_ledger_path.exists():
+    content = ledger_store.get("party.ledger")
+    if content is None:
         return None
 
     try:
-        content = party_ledger_path.read_text(encoding="utf-8")
         lines = content.split('\n')
         
         # Simple table parsing, assuming Name is the first column and User is the second
@@ -152,12 +164,10 @@ async def fetch_character_sheet(character_name: str) -> Optional[str]:
     """
     Retrieves a character's sheet from party.ledger by parsing for the character_sheet block.
     """
-    party_ledger_path = pathlib.Path("./memory/party.ledger")
-    if not party_ledger_path.exists():
+    all_ledger_content = ledger_store.get("party.ledger")
+    if all_ledger_content is None:
         return None
 
-    all_ledger_content = party_ledger_path.read_text(encoding="utf-8")
-
     # Regex to find the specific character_sheet block
     # It looks for ```character_sheet[char_name=CHARACTER_NAME]...```
     # re.escape is used for character_name to handle special characters correctly
@@ -175,9 +185,9 @@ async def get_feedback_interpretation(feedback_type: str, message: str) -> str:
     try:
         from src.core.config import MODEL_FEEDBACK
         from src.core.client import llm_provider
-        from src.modules.narrative.loader import load_system_instruction
+        from src.modules.narrative.loader import get_system_instruction
         
-        persona_content = load_system_instruction()
+        persona_content = get_system_instruction()
         
         prompt = (
             f"A player has provided feedback. As the GM, your task is to understand their input and explain what you will do with it.\n\n"
@@ -189,8 +199,11 @@ async def get_feedback_interpretation(feedback_type: str, message: str) -> str:
         response_text = await llm_provider.generate(
             model_name=MODEL_FEEDBACK,
             system_instruction=persona_content,
-            history=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])],
-            temperature=0.7
+            history=[ChatMessage.user(prompt)],
+            temperature=0.7,
+            static_prefix=persona_content,
+            use_cache=True,
+            caller="feedback"
         )
         return response_text.strip()
     except Exception as e:
@@ -215,12 +228,16 @@ async def record_feedback(feedback_type: str, user: str, message: str, interpret
     try:
         with open(feedback_ledger_path, "a", encoding="utf-8") as f:
             f.write(entry)
+        ledger_store.invalidate(feedback_ledger_path.name)
     except Exception as e:
         print(f"❌ Failed to write to feedback.ledger: {e}")
 
-async def rebuild_memory_from_history(history_text: str) -> int:
+async def rebuild_memory_from_history(history_text: str, use_batch: bool = False) -> int:
     """
     Rebuilds the ledgers based on the provided history text using the Memory Architect.
+    With `use_batch`, the prompt runs as a provider batch job (cheaper, slower) that is polled until done.
+    The ledgers are not read, so `ledger_lock` is only taken to write the result; ledger
+    updates and rewinds keep running while a batch job is pending.
     """
     try:
         current_dir = pathlib.Path(__file__).parent
@@ -232,14 +249,27 @@ async def rebuild_memory_from_history(history_text: str) -> int:
             
         persona_content = architect_persona_path.read_text(encoding="utf-8")
         
-        response_text = await llm_provider.generate(
-            model_name=MODEL_ARCHITECT,
-            system_instruction=persona_content,
-            history=[types.Content(role="user", parts=[types.Part.from_text(text=f"# HISTORY\n{history_text}\n\nBuild fresh ledgers.")])],
-            temperature=0.1
-        )
+        history = [ChatMessage.user(f"# HISTORY\n{history_text}\n\nBuild fresh ledgers.")]
+        if use_batch:
+            job = await llm_provider.run_batch(
+                [BatchRequest(key="rebuild", model_name=MODEL_ARCHITECT, system_instruction=persona_content, history=history, temperature=0.1)],
+                poll_interval=LLM_BATCH_POLL_INTERVAL,
+                timeout=LLM_BATCH_TIMEOUT or None
+            )
+            if "rebuild" in job.errors:
+                print(f"❌ Batch rebuild failed: {job.errors['rebuild']}")
+            response_text = job.results.get("rebuild", "")
+        else:
+            response_text = await llm_provider.generate(
+                model_name=MODEL_ARCHITECT,
+                system_instruction=persona_content,
+                history=history,
+                temperature=0.1,
+                caller="rebuild"
+            )
         if response_text:
-            return save_ledger_files(response_text)
+            async with ledger_lock:
+                return save_ledger_files(response_text)
     except Exception as e:
         print(f"❌ Memory Rebuild Error: {e}")
     return 0
@@ -0,0 +1,93 @@
+import pathlib
+from typing import Dict, List, Optional, Set
+
+def format_ledger(name: str, content: str) -> str:
+    """Formats a single ledger the way it is injected into the system instruction."""
+    return f"\n--- CAMPAIGN LEDGER: {name} ---\n{content}"
+
+class LedgerStore:
+    """
+    In-memory view of the ./memory/*.ledger files.
+    Ledgers are read from disk once; writers call invalidate() so only the
+    touched file is re-read on the next access. `version` increases on every
+    change so consumers can cheaply detect that the ledgers moved on.
+    """
+
+    def __init__(self, memory_dir: str = "./memory"):
+        self.memory_dir = pathlib.Path(memory_dir)
+        self.version = 0
+        self._ledgers: Optional[Dict[str, str]] = None
+        self._mtimes: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._joined: Optional[str] = None
+
+    def _read(self, path: pathlib.Path) -> Optional[str]:
+        try:
+            content = path.read_text(encoding="utf-8")
+            self._mtimes[path.name] = path.stat().st_mtime
+            return content
+        except Exception as e:
+            print(f"❌ Failed to load ledger {path.name}: {e}")
+            return None
+
+    def _ensure_loaded(self) -> Dict[str, str]:
+        if self._ledgers is None:
+            self._ledgers = {}
+            self._mtimes = {}
+            if self.memory_dir.exists():
+                for l_file in sorted(self.memory_dir.glob("*.ledger")):
+                    content = self._read(l_file)
+                    if content is not None:
+                        self._ledgers[l_file.name] = content
+            self._dirty.clear()
+            self._joined = None
+        elif self._dirty:
+            for name in sorted(self._dirty):
+                path = self.memory_dir / name
+                content = self._read(path) if path.exists() else None
+                if content is None:
+                    self._ledgers.pop(name, None)
+                    self._mtimes.pop(name, None)
+                else:
+                    self._ledgers[name] = content
+            self._ledgers = dict(sorted(self._ledgers.items()))
+            self._dirty.clear()
+            self._joined = None
+        return self._ledgers
+
+    def invalidate(self, name: Optional[str] = None):
+        """
+        Marks a ledger (or, with no name, every ledger) as stale.
+        The file is re-read lazily on the next access.
+        """
+        if name is None:
+            self._ledgers = None
+            self._dirty.clear()
+        else:
+            self._dirty.add(pathlib.Path(name).name)
+        self._joined = None
+        self.version += 1
+
+    def get_all(self) -> str:
+        """Returns every ledger concatenated with `--- CAMPAIGN LEDGER ---` headers."""
+        ledgers = self._ensure_loaded()
+        if self._joined is None:
+            self._joined = "\n".join(format_ledger(name, content) for name, content in ledgers.items())
+        return self._joined
+
+    def get(self, name: str) -> Optional[str]:
+        """Returns the content of a single ledger, or None if it does not exist."""
+        return self._ensure_loaded().get(name)
+
+    def get_ledgers(self) -> Dict[str, str]:
+        """Returns a copy of the {filename: content} mapping."""
+        return dict(self._ensure_loaded())
+
+    def names(self) -> List[str]:
+        """Returns the loaded ledger filenames."""
+        return list(self._ensure_loaded().keys())
+
+    def get_mtime(self, name: str) -> float:
+        """Returns the last known modification time of a ledger (0.0 if unknown)."""
+        self._ensure_loaded()
+        return self._mtimes.get(name, 0.0)
@@ -0,0 +1,97 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+class LedgerUpdateWorker:
+    """
+    Runs Memory Architect updates in the background.
+
+    MEMORY_UPDATE facts are queued with `enqueue()` instead of being awaited inside
+    the narrative turn. Facts that arrive within `batch_window` seconds of each other
+    are merged into a single architect call. `flush()`
+    applies everything queued immediately, e.g. when the session is paused or ended.
+    """
+
+    def __init__(self, update_func: Callable[[str], Awaitable[Any]], batch_window: float = 5.0, max_batch: int = 10):
+        self.update_func = update_func
+        self.batch_window = batch_window
+        self.max_batch = max(1, max_batch)
+        self._queue: List[str] = []
+        self._in_flight = 0
+        self._last_enqueued = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._flush_requested: Optional[asyncio.Event] = None
+        self.stats = {"enqueued": 0, "batches": 0, "merged": 0, "errors": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        """Fact blocks waiting for, or currently in, an architect call."""
+        return len(self._queue) + self._in_flight
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"queue_depth": self.queue_depth, **self.stats}
+
+    def enqueue(self, facts: str):
+        """Queues a MEMORY_UPDATE block for the next batch."""
+        facts = facts.strip()
+        if not facts:
+            return
+        loop = asyncio.get_running_loop()
+        self._queue.append(facts)
+        self._last_enqueued = loop.time()
+        self.stats["enqueued"] += 1
+        if self._task is None or self._task.done():
+            self._flush_requested = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    async def flush(self):
+        """Applies every queued fact now and waits until the architect is done."""
+        if self._task is None or self._task.done():
+            return
+        self._flush_requested.set()
+        await asyncio.shield(self._task)
+
+    @staticmethod
+    def merge_facts(batch: List[str]) -> str:
+        """
+        Joins fact blocks in order. Exact duplicate lines are only dropped within a block:
+        the same fact in two turns (another potion drunk) is a separate event.
+        """
+        lines = []
+        for block in batch:
+            seen = set()
+            for line in block.splitlines():
+                key = line.strip()
+                if key and key in seen:
+                    continue
+                seen.add(key)
+                lines.append(line)
+        return "\n".join(lines)
+
+    async def _wait_for_batch(self):
+        loop = asyncio.get_running_loop()
+        while not self._flush_requested.is_set() and len(self._queue) < self.max_batch:
+            remaining = self._last_enqueued + self.batch_window - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self):
+        while self._queue:
+            await self._wait_for_batch()
+            batch = self._queue[:self.max_batch]
+            del self._queue[:len(batch)]
+            self._in_flight = len(batch)
+            self.stats["batches"] += 1
+            self.stats["merged"] += len(batch) - 1
+            if len(batch) > 1:
+                print(f"🧮 Merged {len(batch)} MEMORY_UPDATE blocks into one architect call.")
+            try:
+                await self.update_func(self.merge_facts(batch))
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"❌ Background ledger update failed: {e}")
+            finally:
+                self._in_flight = 0
@@ -0,0 +1,151 @@
+import sys
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from src.core.messages import message_text
+from src.modules.memory.store import format_ledger
+
+CAMPAIGN_STATE_HEADER = "\n\n# CURRENT CAMPAIGN STATE (READ-ONLY)\n"
+TRUNCATION_MARKER = "[... older entries truncated to fit the context budget ...]\n"
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English prose)."""
+    return (len(text) + 3) // 4
+
+def output_token_limit(char_limit: int, protocol_tokens: int = 768) -> int:
+    """
+    Output token cap for a reply whose narrative must fit in `char_limit` characters.
+    Allows twice the narrative budget (the length guard trims the excess) plus room
+    for the protocol blocks that follow it.
+    """
+    return 2 * ((char_limit + 3) // 4) + protocol_tokens
+
+def keep_newest(ledger: str, max_chars: int) -> str:
+    """The newest entries of a ledger that fit in `max_chars`, cut at a line boundary, behind `TRUNCATION_MARKER`."""
+    tail = ledger[-max_chars:]
+    newline = tail.find("\n")
+    if 0 <= newline < len(tail) - 1:
+        tail = tail[newline + 1:]
+    return TRUNCATION_MARKER + tail
+
+@dataclass
+class AssembledContext:
+    """
+    Result of a context assembly pass.
+
+    Attributes:
+        system_instruction: Final system instruction (persona + state + ledgers).
+        static_prefix: Leading part of `system_instruction` that only changes with the
+            persona/knowledge files (eligible for provider-side prompt caching).
+        history: History entries that survived the budget (oldest first).
+        tokens: Estimated tokens per component (persona, state, ledgers, history).
+        total_tokens: Sum of `tokens`.
+        dropped: Human-readable notes about everything trimmed or removed.
+        over_budget: True if pinned content alone exceeds the budget.
+    """
+    system_instruction: str
+    history: List[Any]
+    static_prefix: str = ""
+    tokens: Dict[str, int] = field(default_factory=dict)
+    total_tokens: int = 0
+    dropped: List[str] = field(default_factory=list)
+    over_budget: bool = False
+
+class ContextAssembler:
+    """
+    Builds the narrative system instruction and history under a token budget.
+
+    Priority (highest first):
+        1. Persona + knowledge, table state, pinned ledgers (e.g. party.ledger) and
+           the newest history message are always kept.
+        2. History down to `min_history` messages.
+        3. Ledgers, hottest (most recently written) first.
+        4. Older history.
+
+    When over budget the assembler sheds in the reverse order: old history down to
+    `min_history`, then truncates cold ledgers to `cold_ledger_tokens`, then drops
+    cold ledgers, then trims history down to the newest message.
+    """
+
+    def __init__(self, token_budget: int, min_history: int = 4, pinned_ledgers: Sequence[str] = ("party.ledger",), cold_ledger_tokens: int = 500):
+        self.token_budget = token_budget
+        self.min_history = max(1, min_history)
+        self.pinned_ledgers = list(pinned_ledgers)
+        self.cold_ledger_tokens = cold_ledger_tokens
+
+    def assemble(self, persona: str, state_context: str, ledgers: Dict[str, str], history: List[Any], ledger_mtimes: Optional[Dict[str, float]] = None) -> AssembledContext:
+        ledgers = dict(ledgers)
+        history = list(history)
+        ledger_mtimes = ledger_mtimes or {}
+        dropped: List[str] = []
+
+        history_tokens = [estimate_tokens(message_text(h)) for h in history]
+        ledger_tokens = {name: estimate_tokens(format_ledger(name, content)) for name, content in ledgers.items()}
+        fixed_tokens = estimate_tokens(persona) + estimate_tokens(state_context) + estimate_tokens(CAMPAIGN_STATE_HEADER)
+
+        def total() -> int:
+            return fixed_tokens + sum(ledger_tokens.values()) + sum(history_tokens)
+
+        def trim_history(floor: int):
+            removed = 0
+            while len(history) > floor and total() > self.token_budget:
+                history.pop(0)
+                history_tokens.pop(0)
+                removed += 1
+            if removed:
+                dropped.append(f"history: dropped {removed} oldest message(s)")
+
+        # Coldest first: least recently modified, pinned ledgers never shed.
+        cold = sorted(
+            (name for name in ledgers if name not in self.pinned_ledgers),
+            key=lambda name: ledger_mtimes.get(name, 0.0)
+        )
+
+        if self.token_budget > 0 and total() > self.token_budget:
+            trim_history(self.min_history)
+
+            for name in cold:
+                if total() <= self.token_budget:
+                    break
+                if ledger_tokens[name] > self.cold_ledger_tokens:
+                    before = ledger_tokens[name]
+                    ledgers[name] = keep_newest(ledgers[name], self.cold_ledger_tokens * 4)
+                    ledger_tokens[name] = estimate_tokens(format_ledger(name, ledgers[name]))
+                    dropped.append(f"ledger {name}: truncated ~{before} -> ~{ledger_tokens[name]} tokens")
+
+            for name in cold:
+                if total() <= self.token_budget:
+                    break
+                dropped.append(f"ledger {name}: dropped (~{ledger_tokens.pop(name)} tokens)")
+                del ledgers[name]
+
+            trim_history(1)
+
+        ledger_content = "\n".join(format_ledger(name, content) for name, content in ledgers.items())
+        system_instruction = f"{persona}{state_context}{CAMPAIGN_STATE_HEADER}{ledger_content}"
+
+        tokens = {
+            "persona": estimate_tokens(persona),
+            "state": estimate_tokens(state_context),
+            "ledgers": sum(ledger_tokens.values()),
+            "history": sum(history_tokens),
+        }
+        context = AssembledContext(
+            system_instruction=system_instruction,
+            history=history,
+            static_prefix=persona,
+            tokens=tokens,
+            total_tokens=total(),
+            dropped=dropped,
+            over_budget=self.token_budget > 0 and total() > self.token_budget,
+        )
+
+        if dropped:
+            print(f"✂️ Context trimmed to ~{context.total_tokens}/{self.token_budget} tokens: {'; '.join(dropped)}")
+        if context.over_budget:
+            print(f"⚠️ Pinned context alone (~{context.total_tokens} tokens) exceeds the budget of {self.token_budget}.")
+        return context
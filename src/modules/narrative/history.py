@@ -0,0 +1,139 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, List, Optional, Set
+
+@dataclass(slots=True)
+class MessageRecord:
+    """
+    Compact snapshot of a Discord message, kept in the channel ring buffer.
+
+    Attributes:
+        id: Discord message ID.
+        channel_id: Channel the message belongs to.
+        author_id: Discord user ID of the author.
+        author_name: Username of the author.
+        display_name: Display name of the author at the time of posting.
+        author_is_bot: True if the author is a bot account.
+        content: Message text (updated on edits).
+        created_at: Unix timestamp of the message.
+    """
+    id: int
+    channel_id: int
+    author_id: int
+    author_name: str
+    display_name: str
+    author_is_bot: bool
+    content: str
+    created_at: float
+
+    @classmethod
+    def from_message(cls, message) -> "MessageRecord":
+        created_at = getattr(message, "created_at", None)
+        return cls(
+            id=message.id,
+            channel_id=message.channel.id,
+            author_id=message.author.id,
+            author_name=message.author.name,
+            display_name=message.author.display_name,
+            author_is_bot=bool(getattr(message.author, "bot", False)),
+            content=message.content or "",
+            created_at=created_at.timestamp() if created_at else 0.0,
+        )
+
+class ChannelHistoryBuffer:
+    """
+    Bounded per-channel ring buffer of recent messages.
+    Fed by on_message / edit / delete events and backfilled once per channel
+    from the Discord API, so the narrative loop, /rewind and /summary read
+    history from memory instead of calling `channel.history()` every time.
+    Only `channel_id` is buffered (0 = every channel): other channels receive
+    no events, so `fetch()` reads them from the API instead of a stale snapshot.
+    """
+
+    def __init__(self, capacity: int = 100, channel_id: int = 0):
+        self.capacity = capacity
+        self.channel_id = channel_id
+        self._channels: Dict[int, Deque[MessageRecord]] = {}
+        self._backfilled: Set[int] = set()
+
+    def tracks(self, channel_id: int) -> bool:
+        """True if the channel is kept current by message events."""
+        return not self.channel_id or channel_id == self.channel_id
+
+    def _buffer(self, channel_id: int) -> Deque[MessageRecord]:
+        if channel_id not in self._channels:
+            self._channels[channel_id] = deque(maxlen=self.capacity)
+        return self._channels[channel_id]
+
+    def record(self, message) -> MessageRecord:
+        """Appends a new message (from on_message) to its channel buffer, if the channel is tracked."""
+        record = MessageRecord.from_message(message)
+        if not self.tracks(record.channel_id):
+            return record
+        buffer = self._buffer(record.channel_id)
+        if buffer and buffer[-1].id >= record.id:
+            # Out-of-order or duplicate delivery: fall back to a sorted merge.
+            self._merge(record.channel_id, [record])
+        else:
+            buffer.append(record)
+        return record
+
+    def update_content(self, channel_id: int, message_id: int, content: str) -> bool:
+        """Applies an edit. Returns True if the message was buffered."""
+        for record in self._channels.get(channel_id, ()):
+            if record.id == message_id:
+                record.content = content
+                return True
+        return False
+
+    def remove(self, channel_id: int, message_id: int) -> bool:
+        """Drops a deleted message. Returns True if it was buffered."""
+        buffer = self._channels.get(channel_id)
+        if not buffer:
+            return False
+        for record in buffer:
+            if record.id == message_id:
+                buffer.remove(record)
+                return True
+        return False
+
+    def recent(self, channel_id: int, limit: Optional[int] = None) -> List[MessageRecord]:
+        """Returns up to `limit` most recent records, oldest first."""
+        buffer = self._channels.get(channel_id)
+        if not buffer:
+            return []
+        records = list(buffer)
+        return records[-limit:] if limit else records
+
+    def is_backfilled(self, channel_id: int) -> bool:
+        return channel_id in self._backfilled
+
+    def _merge(self, channel_id: int, records: Iterable[MessageRecord]):
+        merged = {r.id: r for r in records}
+        # Live records win over backfilled copies (they carry the latest edits).
+        for r in self._channels.get(channel_id, ()):
+            merged[r.id] = r
+        self._channels[channel_id] = deque(
+            (merged[i] for i in sorted(merged)), maxlen=self.capacity
+        )
+
+    async def backfill(self, channel) -> int:
+        """Fetches the last `capacity` messages of a channel once and merges them in."""
+        records = [MessageRecord.from_message(msg) async for msg in channel.history(limit=self.capacity)]
+        self._merge(channel.id, records)
+        self._backfilled.add(channel.id)
+        return len(records)
+
+    async def ensure(self, channel):
+        """Backfills a tracked channel if this has not happened yet."""
+        if self.tracks(channel.id) and channel.id not in self._backfilled:
+            await self.backfill(channel)
+
+    async def fetch(self, channel, limit: int) -> List[MessageRecord]:
+        """Up to `limit` most recent messages, oldest first: from the buffer if tracked, else from the API."""
+        if self.tracks(channel.id):
+            await self.ensure(channel)
+            return self.recent(channel.id, limit)
+        records = [MessageRecord.from_message(msg) async for msg in channel.history(limit=limit)]
+        records.reverse()
+        return records
@@ -1,17 +1,16 @@
 
 import os
 import pathlib
+from typing import Dict, Optional, Tuple
 
-def load_system_instruction() -> str:
-    """
-    Loads the GM persona and injects any markdown files from ./knowledge.
-    """
+PERSONA_PATH = pathlib.Path(__file__).parent / "gm_persona.md"
+KNOWLEDGE_DIR = pathlib.Path("./knowledge")
+
+def _build_system_instruction(persona_path: pathlib.Path, knowledge_dir: pathlib.Path) -> str:
+    """Reads the persona and every knowledge file and joins them into one instruction."""
     context_parts = []
-    
+
     # 1. Load Base Persona (Relative to this file)
-    current_dir = pathlib.Path(__file__).parent
-    persona_path = current_dir / "gm_persona.md"
-    
     if persona_path.exists():
         context_parts.append(persona_path.read_text(encoding="utf-8").strip())
     else:
@@ -20,11 +19,10 @@ def load_system_instruction() -> str:
 
     # 2. Inject Knowledge Files (.md) - Assumes running from Project Root
     # We could also look for knowledge dir relative to project root if we wanted to be safer
-    knowledge_dir = pathlib.Path("./knowledge")
     injected_files = []
-    
+
     if knowledge_dir.exists():
-        for md_file in knowledge_dir.glob("*.md"):
+        for md_file in sorted(knowledge_dir.glob("*.md")):
             try:
                 content = md_file.read_text(encoding="utf-8")
                 context_parts.append(f"\n\n--- FILE: {md_file.name} ---\n\n{content}")
@@ -38,3 +36,76 @@ def load_system_instruction() -> str:
         print("ℹ️ No extra markdown knowledge found in ./knowledge")
 
     return "\n".join(context_parts)
+
+def load_system_instruction() -> str:
+    """
+    Loads the GM persona and injects any markdown files from ./knowledge.
+    Always reads from disk; use get_system_instruction() on hot paths.
+    """
+    return _build_system_instruction(PERSONA_PATH, KNOWLEDGE_DIR)
+
+
+class SystemInstructionCache:
+    """
+    Caches the built GM system instruction.
+    The instruction is rebuilt only when the persona or a knowledge file is
+    added, removed, or changes its mtime/size.
+    """
+
+    def __init__(self, persona_path: pathlib.Path = PERSONA_PATH, knowledge_dir: pathlib.Path = KNOWLEDGE_DIR):
+        self.persona_path = pathlib.Path(persona_path)
+        self.knowledge_dir = pathlib.Path(knowledge_dir)
+        self.hits = 0
+        self.misses = 0
+        self._signature: Optional[Tuple] = None
+        self._instruction: Optional[str] = None
+
+    def _file_signature(self, path: pathlib.Path) -> Optional[Tuple[str, int, int]]:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return (path.name, st.st_mtime_ns, st.st_size)
+
+    def _signature_now(self) -> Tuple:
+        """Stats (but does not read) every file that feeds the instruction."""
+        knowledge = []
+        if self.knowledge_dir.exists():
+            for md_file in sorted(self.knowledge_dir.glob("*.md")):
+                sig = self._file_signature(md_file)
+                if sig:
+                    knowledge.append(sig)
+        return (self._file_signature(self.persona_path), tuple(knowledge))
+
+    def get(self) -> str:
+        """Returns the system instruction, rebuilding it only if a source file changed."""
+        signature = self._signature_now()
+        if self._instruction is not None and signature == self._signature:
+            self.hits += 1
+            return self._instruction
+
+        self.misses += 1
+        self._instruction = _build_system_instruction(self.persona_path, self.knowledge_dir)
+        self._signature = signature
+        print(f"🔄 System instruction rebuilt ({len(self._instruction)} chars, hits={self.hits}, misses={self.misses}).")
+        return self._instruction
+
+    def invalidate(self):
+        """Forces a rebuild on the next get()."""
+        self._instruction = None
+        self._signature = None
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns cache hit/miss counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "chars": len(self._instruction) if self._instruction else 0,
+        }
+
+
+instruction_cache = SystemInstructionCache()
+
+def get_system_instruction() -> str:
+    """Returns the cached GM system instruction (see SystemInstructionCache)."""
+    return instruction_cache.get()
@@ -1,7 +1,9 @@
 
+import bisect
 import re
 import time
-from prettytable import PrettyTable
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 import sys
 import os
 
@@ -9,7 +11,8 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 
 from src.modules.dice.rolling import roll
-from src.modules.presence.manager import AwayManager
+from src.modules.presence.manager import away_manager
+from src.modules.narrative.tables import render_table_block
 
 # Global logic needs to be careful about state.
 # pending_rolls was global in bot.py. 
@@ -17,57 +20,348 @@ from src.modules.presence.manager import AwayManager
 # Since process_roll_calls writes to it, let's keep it here.
 pending_rolls = {}
 
-# AwayManager is stateful but backed by file, so instantiating here is okay 
-# provided we don't need to share in-memory cache with other modules excessively.
-# ideally we'd pass it in, but for now specific instantiation is fine.
-away_manager = AwayManager() 
+# Discord allows 2000 characters per message; the GM narrative must fit in one.
+NARRATIVE_CHAR_LIMIT = 1900
 
-def process_dice_rolls(text):
-    """Intercepts DICE_ROLL protocol blocks and executes actual dice rolls."""
-    # Pattern: ```DICE_ROLL\n[Character Name] rolls [dice notation] for [reason]\n```
-    dice_pattern = r'```DICE_ROLL\s*(.+?)\s+rolls?\s+([^\s]+)(?:\s+for\s+(.+?))?\s*```'
-    
-    def replace_with_roll(match):
-        character_name = match.group(1).strip()
-        notation = match.group(2).strip()
-        reason = match.group(3).strip() if match.group(3) else "unknown reason"
-        
-        result = roll(notation)
-        
-        if result.error:
-            return f"❌ **{character_name}** attempted to roll {notation} but: {result.error}"
-        
-        return f"🎲 **{character_name}** rolls {notation} for {reason}: {result.formatted}"
-    
-    processed = re.sub(dice_pattern, replace_with_roll, text, flags=re.DOTALL | re.IGNORECASE)
-    
-    # Debug logging
-    if "DICE_ROLL" in text.upper() and processed != text:
-        print("🎲 Intercepted and executed DICE_ROLL block")
-    
-    return processed
+# How often the narrative overflowed, was condensed locally, or still needed a full retry.
+length_stats = {"checked": 0, "overflows": 0, "condensed": 0, "retries": 0}
+
+# Fenced blocks the GM persona emits; everything else is narrative.
+PROTOCOL_TAGS = (
+    "DATA_TABLE", "MEMORY_UPDATE", "VISUAL_PROMPT", "DICE_ROLL",
+    "ROLL_CALL", "FEEDBACK_DETECTED", "TABLE_STATE",
+)
+FENCE = "```"
+
+# Compiled once: the opener of any protocol block, and the per-block grammars.
+_BLOCK_OPENER = re.compile(re.escape(FENCE) + "(" + "|".join(PROTOCOL_TAGS) + ")", re.IGNORECASE)
+_OPENER_PREFIXES = tuple(FENCE + tag for tag in PROTOCOL_TAGS)
+_MAX_OPENER = max(map(len, _OPENER_PREFIXES))
+_DICE_BODY = re.compile(r"\s*(.+?)\s+rolls?\s+([^\s]+)(?:\s+for\s+(.+?))?\s*", re.DOTALL | re.IGNORECASE)
+_ROLL_CALL_LINE = re.compile(r"@?(\w+):\s*([^\s]+)(?:\s+for\s+(.+))?", re.IGNORECASE)
+# Fallback: Header + the Structure brackets (for when AI forgets backticks or uses bolding)
+_VISUAL_FALLBACK = re.compile(r"(?!\*+|#+)?\s*VISUAL_PROMPT\s*(?!\*+|#+)?(?:[:-])?\s*((?:\\\\[.*?\\\\]\s*)+)", re.DOTALL | re.IGNORECASE)
+
+# Handler time per protocol, plus the scan itself, across all processed responses.
+protocol_stats = {}
+
+@dataclass(slots=True)
+class ProtocolBlock:
+    """
+    A protocol block: upper-cased `kind`, `body` between tag and closing fence, and the `raw` source.
+    `closed` is False for a block the response ended inside (e.g. cut off at the output token cap).
+    """
+    kind: str
+    body: str
+    raw: str
+    closed: bool = True
+
+@dataclass
+class ProtocolResult:
+    """What the protocol blocks of one response produced."""
+    text: str = ""
+    facts: Optional[str] = None
+    visual_prompt: Optional[str] = None
+    feedback: List[Dict] = field(default_factory=list)
+    state_change: Optional[Dict] = None
+    attachments: List[Tuple[str, str]] = field(default_factory=list)
+    roll_calls: List[Dict] = field(default_factory=list)
+    timings: List[Tuple[str, float]] = field(default_factory=list)
+
+def scan_protocol_blocks(text, kinds=PROTOCOL_TAGS):
+    """
+    Splits `text` in one pass into narrative strings and `ProtocolBlock`s of the given kinds.
+    A block runs from ```TAG to the next fence; an unclosed one runs to the end of the text.
+    A truncated tag (e.g. "```MEMORY_UP") ending the text is dropped.
+    """
+    tokens = []
+    pos = search_from = 0
+    while True:
+        opener = _BLOCK_OPENER.search(text, search_from)
+        if not opener:
+            break
+        kind = opener.group(1).upper()
+        if kind not in kinds:
+            search_from = opener.end()
+            continue
+        close = text.find(FENCE, opener.end())
+        if close == -1:
+            if opener.start() > pos:
+                tokens.append(text[pos:opener.start()])
+            tokens.append(ProtocolBlock(kind, text[opener.end():], text[opener.start():], closed=False))
+            return tokens
+        if opener.start() > pos:
+            tokens.append(text[pos:opener.start()])
+        tokens.append(ProtocolBlock(kind, text[opener.end():close], text[opener.start():close + len(FENCE)]))
+        pos = search_from = close + len(FENCE)
+    end = len(text) - _partial_opener(text, kinds)
+    if pos < end:
+        tokens.append(text[pos:end])
+    return tokens
+
+def _partial_opener(text, kinds):
+    """Length of a truncated opener of the given kinds (at least "```" plus one letter) ending `text`, or 0."""
+    for k in range(min(len(text), _MAX_OPENER), len(FENCE), -1):
+        tail = text[-k:].upper()
+        if any((FENCE + kind).startswith(tail) for kind in kinds):
+            return k
+    return 0
+
+def _parse_fields(body):
+    """`key: value` lines of a block body (keys lower-cased)."""
+    data = {}
+    for line in body.strip().split('\n'):
+        if ':' in line:
+            key, val = line.split(':', 1)
+            data[key.strip().lower()] = val.strip()
+    return data
+
+def _handle_data_table(block, result):
+    rendered = _render_table(block.body)
+    if rendered is None:
+        return block.raw
+    if rendered.attachment:
+        result.attachments.append((rendered.filename, rendered.attachment))
+    return rendered.text
+
+def _handle_memory_update(block, result):
+    if result.facts is None:
+        result.facts = block.body.strip()
+    return ""
+
+def _handle_visual_prompt(block, result):
+    if result.visual_prompt is None:
+        result.visual_prompt = block.body.strip()
+    return ""
+
+def _handle_dice_roll(block, result):
+    """Pattern: ```DICE_ROLL\n[Character Name] rolls [dice notation] for [reason]\n```"""
+    match = _DICE_BODY.fullmatch(block.body)
+    if not match:
+        return block.raw
+    character_name = match.group(1).strip()
+    notation = match.group(2).strip()
+    reason = match.group(3).strip() if match.group(3) else "unknown reason"
+
+    rolled = roll(notation)
+    if rolled.error:
+        return f"❌ **{character_name}** attempted to roll {notation} but: {rolled.error}"
+    return f"🎲 **{character_name}** rolls {notation} for {reason}: {rolled.formatted}"
+
+def _handle_roll_call(block, result):
+    stored_calls = []
+    for line in block.body.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        # Parse: @Username: 2d6+3 for Reason (the @ is optional)
+        call_match = _ROLL_CALL_LINE.match(line)
+        if call_match:
+            username = call_match.group(1)
+            notation = call_match.group(2)
+            reason = call_match.group(3).strip() if call_match.group(3) else "unknown"
+            stored_calls.append({"username": username, "notation": notation, "reason": reason})
+
+    # Only collected here: pending_rolls is written once the turn commits (see register_roll_calls)
+    result.roll_calls.extend(stored_calls)
+
+    # Return a user-friendly message
+    return "\n".join(f"📋 **{call['username']}**, roll {call['notation']} for {call['reason']}" for call in stored_calls)
+
+def _handle_feedback(block, result):
+    data = _parse_fields(block.body)
+    if 'type' in data and 'user' in data:
+        result.feedback.append(data)
+    return ""
+
+def _handle_table_state(block, result):
+    data = _parse_fields(block.body)
+    if 'state' in data:
+        result.state_change = data
+    return ""
+
+BLOCK_HANDLERS = {
+    "DATA_TABLE": _handle_data_table,
+    "MEMORY_UPDATE": _handle_memory_update,
+    "VISUAL_PROMPT": _handle_visual_prompt,
+    "DICE_ROLL": _handle_dice_roll,
+    "ROLL_CALL": _handle_roll_call,
+    "FEEDBACK_DETECTED": _handle_feedback,
+    "TABLE_STATE": _handle_table_state,
+}
+
+def _record_timing(kind, ms):
+    stats = protocol_stats.setdefault(kind, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+    stats["count"] += 1
+    stats["total_ms"] += ms
+    stats["max_ms"] = max(stats["max_ms"], ms)
+
+def process_protocol_blocks(text, kinds=PROTOCOL_TAGS):
+    """
+    Scans `text` once and dispatches each block of the given kinds to its handler.
+    Narrative spans are kept as-is; `result.text` is not stripped. Each handler's
+    time is appended to `result.timings` and accumulated in `protocol_stats`.
+    """
+    result = ProtocolResult()
+    started = time.perf_counter()
+    tokens = scan_protocol_blocks(text, kinds)
+    _record_timing("scan", (time.perf_counter() - started) * 1000)
+
+    result.text = "".join(token if isinstance(token, str) else _dispatch(token, result) for token in tokens)
+    return result
+
+def _handle_unclosed(block, result):
+    """
+    The response ended inside `block`, typically at the output token cap. Only its
+    complete lines are handled (the facts that arrived before the cut-off are kept);
+    nothing of the raw block reaches players.
+    """
+    print(f"⚠️ Response ended inside an unclosed {block.kind} block; handling its complete lines only.")
+    body = block.body[:block.body.rfind("\n") + 1]
+    if not body.strip():
+        return ""
+    output = BLOCK_HANDLERS[block.kind](ProtocolBlock(block.kind, body, block.raw), result)
+    return "" if output == block.raw else output
+
+def _dispatch(block, result):
+    """Runs the handler for `block`, timing it; returns the text that replaces the block."""
+    started = time.perf_counter()
+    output = BLOCK_HANDLERS[block.kind](block, result) if block.closed else _handle_unclosed(block, result)
+    ms = (time.perf_counter() - started) * 1000
+    result.timings.append((block.kind, ms))
+    _record_timing(block.kind, ms)
+    return output
+
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+class StreamingProtocolParser:
+    """
+    Incremental counterpart of `process_protocol_blocks` for streamed responses.
+
+    `feed(chunk)` returns the newly displayable text. Narrative is released as soon as
+    it cannot be the start of a protocol block; a block's handler runs the moment the
+    block closes and its output (a dice result, a rendered table) is released in its
+    place. A plain code fence is held back until it closes. `close()` flushes the rest
+    and returns the `ProtocolResult`, which `process_response_formatting(..., parsed=)`
+    finishes without parsing the response again.
+    """
+
+    def __init__(self, kinds=PROTOCOL_TAGS):
+        self.kinds = kinds
+        self.result = ProtocolResult()
+        self._pending = ""       # Unparsed tail: a possible opener or an open block
+        self._open = None        # (kind, tag_end) of the block being received
+        self._close_from = 0
+        self._text = ""          # Parsed output so far
+        self._fence_at = None    # Start of an unclosed plain fence in `_text`
+        self._shown = 0
+
+    def feed(self, chunk):
+        self._pending += chunk
+        self._drain()
+        safe = self._safe_end()
+        new = self._text[self._shown:safe]
+        self._shown = safe
+        return new
+
+    def close(self):
+        """Ends the stream. An unclosed block or truncated tag is handled like the batch parser does."""
+        if self._open is not None:
+            kind, tag_end = self._open
+            block = ProtocolBlock(kind, self._pending[tag_end:], self._pending, closed=False)
+            self._commit(_dispatch(block, self.result))
+        else:
+            self._commit(self._pending[:len(self._pending) - _partial_opener(self._pending, self.kinds)])
+        self._pending = ""
+        self._open = None
+        self.result.text = self._text
+        return self.result
+
+    @property
+    def visible(self):
+        """Everything displayable so far, with the blank lines left by removed blocks collapsed."""
+        return _BLANK_LINES.sub("\n\n", self._text[:self._safe_end()]).strip()
+
+    def _safe_end(self):
+        return len(self._text) if self._fence_at is None else self._fence_at
+
+    def _commit(self, piece):
+        start = len(self._text)
+        self._text += piece
+        i = piece.find(FENCE)
+        while i != -1:
+            self._fence_at = start + i if self._fence_at is None else None
+            i = piece.find(FENCE, i + len(FENCE))
+
+    def _find_opener(self):
+        pos = 0
+        while True:
+            opener = _BLOCK_OPENER.search(self._pending, pos)
+            if opener is None or opener.group(1).upper() in self.kinds:
+                return opener
+            pos = opener.end()
+
+    def _held_length(self):
+        """Length of the longest tail of `_pending` that could still grow into a block opener."""
+        for k in range(min(len(self._pending), _MAX_OPENER), 0, -1):
+            tail = self._pending[-k:].upper()
+            if any(prefix.startswith(tail) for prefix in _OPENER_PREFIXES):
+                return k
+        return 0
+
+    def _drain(self):
+        while True:
+            if self._open is None:
+                opener = self._find_opener()
+                if opener is None:
+                    keep = len(self._pending) - self._held_length()
+                    self._commit(self._pending[:keep])
+                    self._pending = self._pending[keep:]
+                    return
+                self._commit(self._pending[:opener.start()])
+                self._pending = self._pending[opener.start():]
+                self._open = (opener.group(1).upper(), opener.end() - opener.start())
+                self._close_from = self._open[1]
+
+            kind, tag_end = self._open
+            close = self._pending.find(FENCE, self._close_from)
+            if close == -1:
+                # A fence may arrive split across chunks
+                self._close_from = max(tag_end, len(self._pending) - len(FENCE) + 1)
+                return
+            end = close + len(FENCE)
+            block = ProtocolBlock(kind, self._pending[tag_end:close], self._pending[:end])
+            self._pending = self._pending[end:]
+            self._open = None
+            self._commit(_dispatch(block, self.result))
+
+def _found(result, kind):
+    return any(k == kind for k, _ in result.timings)
 
 def filter_away_mentions(text):
     """
     Removes mentions (<@ID>) for users who are currently Away.
     This acts as a safety net if the AI hallucinates a tag despite instructions.
     """
-    away_users = away_manager.get_all_away_users()
-    if not away_users:
-        return text
+    # Preventing the ping is the priority, so the mention is replaced rather than kept
+    return away_manager.suppress_mentions(text)
+
+def process_dice_rolls(text):
+    """Intercepts DICE_ROLL protocol blocks and executes actual dice rolls."""
+    result = process_protocol_blocks(text, ("DICE_ROLL",))
+    if result.text != text:
+        print("🎲 Intercepted and executed DICE_ROLL block")
+    return result.text
 
-    processed = text
-    for user_id in away_users:
-        # Check for standard mention format <@123456>
-        mention_pattern = rf"<@!?{user_id}>"
-        if re.search(mention_pattern, processed):
-            print(f"🛡️ Suppressed mention for away user {user_id}")
-            # Replace with a generic name reference or just strip it.
-            # Stripping it might break grammar, but preventing the ping is priority.
-            # We'll replace it with their display name if possible, or just "the character".
-            processed = re.sub(mention_pattern, "**(Away)**", processed)
-            
-    return processed
+def register_roll_calls(calls):
+    """Stores collected ROLL_CALL entries in `pending_rolls`, keyed by username."""
+    for call in calls:
+        pending_rolls[call["username"]] = {
+            "notation": call["notation"],
+            "reason": call["reason"],
+            "timestamp": time.time()
+        }
 
 def process_roll_calls(text):
     """
@@ -78,56 +372,11 @@ def process_roll_calls(text):
     @Username: 2d6+3 for Defy Danger
     ```
     """
-    global pending_rolls
-    
-    roll_call_pattern = r'```ROLL_CALL\s*(.*?)\s*```'
-    
-    def extract_and_store(match):
-        content = match.group(1).strip()
-        lines = content.split('\n')
-        
-        stored_calls = []
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Parse: @Username: 2d6+3 for Reason
-            # We allow optional @
-            call_pattern = r'@?(\w+):\s*([^\s]+)(?:\s+for\s+(.+))?'
-            call_match = re.match(call_pattern, line, re.IGNORECASE)
-            
-            if call_match:
-                username = call_match.group(1)
-                notation = call_match.group(2)
-                reason = call_match.group(3).strip() if call_match.group(3) else "unknown"
-                
-                # Store in pending_rolls keyed by username
-                pending_rolls[username] = {
-                    "notation": notation,
-                    "reason": reason,
-                    "timestamp": time.time()
-                }
-                
-                stored_calls.append({
-                    "username": username,
-                    "notation": notation,
-                    "reason": reason
-                })
-        
-        # Return a user-friendly message
-        if stored_calls:
-            messages = [f"📋 **{call['username']}**, roll {call['notation']} for {call['reason']}" 
-                       for call in stored_calls]
-            return "\n".join(messages)
-        return ""
-    
-    processed = re.sub(roll_call_pattern, extract_and_store, text, flags=re.DOTALL | re.IGNORECASE)
-    
-    if "ROLL_CALL" in text.upper() and processed != text:
+    result = process_protocol_blocks(text, ("ROLL_CALL",))
+    if result.text != text:
         print("📋 Intercepted ROLL_CALL block")
-    
-    return processed
+    register_roll_calls(result.roll_calls)
+    return result.text
 
 def process_feedback_detection(text):
     """
@@ -140,25 +389,10 @@ def process_feedback_detection(text):
     content: I loved the dragon description
     ```
     """
-    feedback_pattern = r"```FEEDBACK_DETECTED\s*(.*?)```"
-    matches = re.findall(feedback_pattern, text, re.DOTALL | re.IGNORECASE)
-    detected_feedback = []
-    
-    for block in matches:
-        data = {}
-        for line in block.strip().split('\n'):
-            if ':' in line:
-                key, val = line.split(':', 1)
-                data[key.strip().lower()] = val.strip()
-        if 'type' in data and 'user' in data:
-            detected_feedback.append(data)
-            
-    text = re.sub(feedback_pattern, "", text, flags=re.DOTALL | re.IGNORECASE).strip()
-    
-    if detected_feedback:
-        print(f"🔍 Found {len(detected_feedback)} implicit feedback items.")
-        
-    return text, detected_feedback
+    result = process_protocol_blocks(text, ("FEEDBACK_DETECTED",))
+    if result.feedback:
+        print(f"🔍 Found {len(result.feedback)} implicit feedback items.")
+    return result.text.strip(), result.feedback
 
 def process_table_state_detection(text):
     """
@@ -170,183 +404,258 @@ def process_table_state_detection(text):
     reason: Bio-break
     ```
     """
-    state_pattern = r"```TABLE_STATE\s*(.*?)```"
-    matches = re.findall(state_pattern, text, re.DOTALL | re.IGNORECASE)
-    detected_state_change = None
-    
-    for block in matches:
-        data = {}
-        for line in block.strip().split('\n'):
-            if ':' in line:
-                key, val = line.split(':', 1)
-                data[key.strip().lower()] = val.strip()
-        if 'state' in data:
-            detected_state_change = data
-            
-    text = re.sub(state_pattern, "", text, flags=re.DOTALL | re.IGNORECASE).strip()
-    
-    if detected_state_change:
-        print(f"🛑 Found implicit Table State Change: {detected_state_change}")
-        
-    return text, detected_state_change
+    result = process_protocol_blocks(text, ("TABLE_STATE",))
+    if result.state_change:
+        print(f"🛑 Found implicit Table State Change: {result.state_change}")
+    return result.text.strip(), result.state_change
 
-def render_table_as_ascii(match):
-    """
-    Processes a DATA_TABLE block into a PrettyTable ASCII string.
-    """
-    table_block = match.group(1)
+def _render_table(table_block):
+    """Renders a DATA_TABLE body (see `tables.render_table_block`), or None if it has no header row."""
     try:
-        lines = [l.strip() for l in table_block.strip().split('\n') if l.strip()]
-        title = "Data Table"
-        headers = []
-        rows = []
-        
-        for line in lines:
-            if line.startswith("Title:"):
-                title = line.replace("Title:", "").strip()
-            elif "|" in line:
-                cols = [c.strip() for c in line.split('|')]
-                if not headers:
-                    headers = cols
-                else:
-                    rows.append(cols)
-        
-        if headers:
-            pt = PrettyTable()
-            pt.field_names = headers
-            pt.align = "l"
-            pt.border = True
-            
-            for row in rows:
-                if len(row) < len(headers):
-                    row.extend(["" ] * (len(headers) - len(row)))
-                pt.add_row(row[:len(headers)])
-            
-            return f"**{title}**\n```text\n{pt.get_string()}\n```"
+        return render_table_block(table_block)
     except Exception as e:
         print(f"⚠️ Failed to parse DATA_TABLE: {e}")
-        return match.group(0)
-    return match.group(0)
+        return None
+
+def render_table_as_ascii(match):
+    """
+    Processes a DATA_TABLE block (regex match, body in group 1) into an ASCII table.
+    Rows that do not fit are dropped without an attachment; protocol handling keeps them.
+    """
+    rendered = _render_table(match.group(1))
+    return rendered.text if rendered else match.group(0)
 
-def process_response_formatting(text):
+def process_response_formatting(text, parsed=None, attachments=None, roll_calls=None):
     """
-    Handles all regex-based replacements and extractions (DATA_TABLE, MEMORY_UPDATE, VISUAL_PROMPT, FEEDBACK).
-    Returns: final_text, facts, visual_prompt, detected_feedback
+    Handles all protocol blocks (DATA_TABLE, MEMORY_UPDATE, VISUAL_PROMPT, DICE_ROLL, ROLL_CALL,
+    FEEDBACK_DETECTED, TABLE_STATE) in a single scan; see `process_protocol_blocks`.
+    `parsed` is the result of a `StreamingProtocolParser` that already consumed `text`
+    (its handlers have run, so the blocks are not processed twice). If `attachments`
+    is a list, (filename, content) pairs for files to send with the reply are appended
+    (full DATA_TABLEs too long to show inline). If `roll_calls` is a list, ROLL_CALL
+    entries are appended to it for `register_roll_calls()` once the turn commits;
+    otherwise they are stored in `pending_rolls` right away.
+    Returns: final_text, facts, visual_prompt, detected_feedback, detected_state_change
     """
     
-    # 0. Safety Net: Filter Away Mentions
-    text = filter_away_mentions(text)
-
-    # 1. DATA_TABLE (Case Insensitive + Flexible Whitespace)
-    data_table_pattern = r"```DATA_TABLE\s*(.*?)```"
-    if re.search(data_table_pattern, text, re.DOTALL | re.IGNORECASE):
-        print("🔍 Found DATA_TABLE block.")
-    text = re.sub(data_table_pattern, render_table_as_ascii, text, flags=re.DOTALL | re.IGNORECASE).strip()
-    
-    memory_update_pattern = r"```MEMORY_UPDATE\s*(.*?)```"
-    memory_match = re.search(memory_update_pattern, text, re.DOTALL | re.IGNORECASE)
-    facts = None
-    if memory_match:
-        print("🔍 Found MEMORY_UPDATE block.")
-        facts = memory_match.group(1).strip()
-        text = re.sub(memory_update_pattern, "", text, flags=re.DOTALL | re.IGNORECASE).strip()
-        
-    # 3. VISUAL_PROMPT 
-    # Primary: Backticked block
-    visual_prompt_pattern = r"```VISUAL_PROMPT\s*(.*?)```"
-    visual_match = re.search(visual_prompt_pattern, text, re.DOTALL | re.IGNORECASE)
-    visual_prompt = None
-    if visual_match:
-        print("🔍 Found backticked VISUAL_PROMPT.")
-        visual_prompt = visual_match.group(1).strip()
-        text = re.sub(visual_prompt_pattern, "", text, flags=re.DOTALL | re.IGNORECASE).strip()
+    if parsed is None:
+        # 0. Safety Net: Filter Away Mentions
+        text = filter_away_mentions(text)
+
+        # 1. Every fenced protocol block, in one pass
+        result = process_protocol_blocks(text)
+        text = result.text
     else:
-        # Fallback: Header + the Structure brackets (for when AI forgets backticks or uses bolding)
-        # We look for the keyword and then any sequence of [...] blocks
-        fallback_pattern = r"(?!\*+|#+)?\s*VISUAL_PROMPT\s*(?!\*+|#+)?(?:[:-])?\s*((?:\\\\[.*?\\\\]\s*)+)"
-        fallback_match = re.search(fallback_pattern, text, re.DOTALL | re.IGNORECASE)
+        result = parsed
+        text = filter_away_mentions(result.text)
+
+    for kind, message in (("DATA_TABLE", "🔍 Found DATA_TABLE block."), ("MEMORY_UPDATE", "🔍 Found MEMORY_UPDATE block."),
+                          ("VISUAL_PROMPT", "🔍 Found backticked VISUAL_PROMPT."), ("DICE_ROLL", "🎲 Intercepted and executed DICE_ROLL block"),
+                          ("ROLL_CALL", "📋 Intercepted ROLL_CALL block")):
+        if _found(result, kind):
+            print(message)
+
+    # 2. VISUAL_PROMPT without backticks
+    visual_prompt = result.visual_prompt
+    if visual_prompt is None:
+        fallback_match = _VISUAL_FALLBACK.search(text)
         if fallback_match:
             print("🔍 Found fallback VISUAL_PROMPT structure.")
             visual_prompt = fallback_match.group(1).strip()
-            text = re.sub(fallback_pattern, "", text, flags=re.DOTALL | re.IGNORECASE).strip()
+            text = _VISUAL_FALLBACK.sub("", text)
 
     if not visual_prompt and "VISUAL_PROMPT" in text.upper():
         print("⚠️ Found 'VISUAL_PROMPT' keyword but failed to parse the structure.")
-    
-    # 4. DICE_ROLL - Intercept and execute actual dice rolls
-    text = process_dice_rolls(text)
-
-    # 5. ROLL_CALL - Intercept and queue pending rolls
-    text = process_roll_calls(text)
 
-    # 6. FEEDBACK DETECTED - Implicit feedback
-    text, detected_feedback = process_feedback_detection(text)
+    if result.feedback:
+        print(f"🔍 Found {len(result.feedback)} implicit feedback items.")
+    if result.state_change:
+        print(f"🛑 Found implicit Table State Change: {result.state_change}")
+    if result.timings:
+        summary = ", ".join(f"{kind} {ms:.2f} ms" for kind, ms in result.timings)
+        print(f"⏱️ Protocol blocks: {summary}")
 
-    # 7. TABLE STATE - Implicit flow
-    text, detected_state_change = process_table_state_detection(text)
+    if attachments is not None:
+        attachments.extend(result.attachments)
+    if roll_calls is None:
+        register_roll_calls(result.roll_calls)
+    else:
+        roll_calls.extend(result.roll_calls)
 
-    return text, facts, visual_prompt, detected_feedback, detected_state_change
+    return text.strip(), result.facts, visual_prompt, result.feedback, result.state_change
 
-def check_length_violation(text, limit=1900):
+def check_length_violation(text, limit=NARRATIVE_CHAR_LIMIT):
     """
     Checks if the narrative portion of the text exceeds the character limit.
     Assumes 'text' is the processed narrative (protocols stripped).
     """
     return len(text) > limit
 
-def smart_chunk_text(text, limit=1900):
+def condense_to_limit(text, limit=NARRATIVE_CHAR_LIMIT):
+    """
+    Shortens text locally so it fits within `limit`, without another LLM call.
+    Collapses redundant whitespace, then cuts at the last paragraph break that fits,
+    falling back to the last sentence end and finally the last word boundary.
+    Never leaves a ``` fence open.
+    """
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    if len(text) <= limit:
+        return text
+
+    window = text[:limit + 1]
+    cut = window.rfind("\n\n")
+    if cut < limit // 2:
+        sentence_end = max(window.rfind(p) for p in (". ", "! ", "? ", ".\n", "!\n", "?\n"))
+        cut = sentence_end + 1 if sentence_end >= limit // 2 else -1
+    if cut <= 0:
+        space = window.rfind(" ", 0, limit - 1)
+        cut = space if space > 0 else limit - 1
+        condensed = text[:cut].rstrip() + "…"
+    else:
+        condensed = text[:cut].rstrip()
+
+    if condensed.count("```") % 2:
+        # The cut landed inside a code block (e.g. a rendered DATA_TABLE)
+        fence = condensed.rfind("```")
+        if condensed[:fence].strip():
+            condensed = condensed[:fence].rstrip()
+        else:
+            condensed = condensed[:limit - 4].rstrip() + "\n```"
+    return condensed
+
+def apply_length_guard(text, limit=NARRATIVE_CHAR_LIMIT, min_keep=0.6):
+    """
+    Enforces the narrative limit, preferring local condensation over a regenerate.
+    Returns (text, needs_retry). A retry is only requested when condensing would
+    keep less than `min_keep` of the original text. Outcomes are counted in `length_stats`.
+    """
+    length_stats["checked"] += 1
+    if not check_length_violation(text, limit):
+        return text, False
+
+    length_stats["overflows"] += 1
+    condensed = condense_to_limit(text, limit)
+    if len(condensed) >= len(text) * min_keep:
+        length_stats["condensed"] += 1
+        print(f"✂️ Output too long ({len(text)} chars); condensed locally to {len(condensed)} chars.")
+        return condensed, False
+
+    length_stats["retries"] += 1
+    rate = length_stats["retries"] / length_stats["checked"]
+    print(f"⚠️ Output too long ({len(text)} chars); full retry needed ({length_stats['retries']}/{length_stats['checked']} turns, {rate:.1%}).")
+    return text, True
+
+# Chunk break separators in order of preference: paragraph, line, sentence end, word.
+# Each is (separator, offset of the cut within it): a sentence keeps its punctuation.
+_CHUNK_BREAKS = (
+    (("\n\n", 0),),
+    (("\n", 0),),
+    ((". ", 1), ("! ", 1), ("? ", 1)),
+    ((" ", 0),),
+)
+
+def _fence_spans(text):
+    """(open, header_end, end) of each ``` code block; an unclosed block runs to the end of the text."""
+    spans = []
+    pos = 0
+    while True:
+        start = text.find(FENCE, pos)
+        if start == -1:
+            return spans
+        close = text.find(FENCE, start + len(FENCE))
+        end = len(text) if close == -1 else close + len(FENCE)
+        newline = text.find("\n", start, end)
+        spans.append((start, newline if newline != -1 else start + len(FENCE), end))
+        pos = end
+
+def _span_at(spans, opens, offset):
+    """The code block strictly containing `offset`, or None."""
+    i = bisect.bisect_right(opens, offset - 1) - 1
+    return spans[i] if i >= 0 and spans[i][2] > offset else None
+
+def _last_break(text, group, low, high, spans, opens):
+    """The largest cut offset in (low, high] at one of the group's separators, outside code blocks."""
+    best = None
+    for sep, advance in group:
+        bound = high - advance + len(sep)
+        while True:
+            i = text.rfind(sep, low + 1 - advance, bound)
+            if i == -1 or (best is not None and i + advance <= best):
+                break
+            span = _span_at(spans, opens, i + advance)
+            if span is None:
+                best = i + advance
+                break
+            bound = span[0] - advance + len(sep)
+    return best
+
+def smart_chunk_text(text, limit=NARRATIVE_CHAR_LIMIT):
     """
     Splits text into chunks respecting the limit, prioritizing:
     1. Paragraph breaks (\\n\\n)
     2. Line breaks (\\n)
     3. Sentence endings (. )
-    4. Hard limit
+    4. Word boundaries
+    5. Hard limit
+    Breaks in the first half of a chunk are only used when nothing better fits.
+    Code blocks (e.g. rendered DATA_TABLEs) are never split; a block longer than
+    the limit is split at a line break, closed, and reopened in the next chunk.
+    Chunks are collected as offsets and sliced once; each chunk only scans its own
+    window, so this runs in linear time.
     """
     if len(text) <= limit:
         return [text]
-    
-    chunks = []
-    current_chunk = ""
-    
-    # Strategy 1: Split by Paragraphs
-    # We use a custom split to preserve empty lines if needed, but standard split is fine for now
-    paragraphs = text.split('\n\n')
-    
-    for para in paragraphs:
-        # Check if adding this paragraph exceeds limit
-        # +2 for the \n\n we removed
-        if len(current_chunk) + len(para) + 2 <= limit:
-            current_chunk += para + "\n\n"
+
+    spans = _fence_spans(text)
+    opens = [span[0] for span in spans]
+    pieces = []  # (prefix, start, end, suffix)
+    start = 0
+    prefix = ""  # Reopened fence header when a chunk continues a code block
+    while True:
+        if not prefix:
+            while start < len(text) and text[start].isspace():
+                start += 1
+        budget = limit - len(prefix)
+        if len(text) - start <= budget:
+            pieces.append((prefix, start, len(text), ""))
+            break
+        end = start + budget
+        half = start + budget // 2
+
+        cut = None
+        for group in _CHUNK_BREAKS:
+            cut = _last_break(text, group, half, end, spans, opens)
+            if cut is not None:
+                break
+        if cut is None:
+            # Nothing in the second half of the window: take the best break in the first
+            cut = max((c for c in (_last_break(text, group, start, half, spans, opens) for group in _CHUNK_BREAKS) if c is not None), default=None)
+        if cut is not None:
+            pieces.append((prefix, start, cut, ""))
+            start, prefix = cut, ""
+            continue
+
+        span = _span_at(spans, opens, end)
+        if span is None:
+            # Hard limit
+            pieces.append((prefix, start, end, ""))
+            start, prefix = end, ""
+        elif span[0] > start and text[start:span[0]].strip():
+            # Keep the code block whole: end this chunk before it
+            pieces.append((prefix, start, span[0], ""))
+            start, prefix = span[0], ""
         else:
-            # Current chunk is full, push it
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = ""
-            
-            # Now handle the new paragraph 'para'
-            if len(para) <= limit:
-                current_chunk = para + "\n\n"
-            else:
-                # Paragraph itself is too huge. Strategy 2: Split by Lines
-                lines = para.split('\n')
-                for line in lines:
-                    if len(current_chunk) + len(line) + 1 <= limit:
-                         current_chunk += line + "\n"
-                    else:
-                        if current_chunk:
-                            chunks.append(current_chunk.strip())
-                            current_chunk = ""
-                        
-                        if len(line) <= limit:
-                            current_chunk = line + "\n"
-                        else:
-                             # Line is too huge. Strategy 3: Hard split
-                            while len(line) > limit:
-                                chunks.append(line[:limit])
-                                line = line[limit:]
-                            current_chunk = line + "\n"
-                            
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-        
-    return chunks
+            # The code block alone exceeds the limit: close it here and reopen it in the next chunk
+            closing = "\n" + FENCE
+            room = end - len(closing)
+            cut = text.rfind("\n", max(start, span[1]) + 1, room + 1)
+            if cut == -1:
+                cut = max(room, start + 1)
+            pieces.append((prefix, start, cut, closing))
+            start = cut + 1 if text[cut] == "\n" else cut
+            header = text[span[0]:span[1]]
+            prefix = header + "\n" if len(header) + 1 < limit // 2 else ""
+
+    chunks = (prefix + text[start:end] + suffix for prefix, start, end, suffix in pieces)
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
@@ -0,0 +1,116 @@
+import re
+import time
+import sys
+import os
+from typing import Callable, List, Optional
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from src.modules.narrative.parser import NARRATIVE_CHAR_LIMIT, condense_to_limit, filter_away_mentions, smart_chunk_text
+
+# The start of a Discord mention (<@!id>) that has not finished arriving
+_PARTIAL_MENTION = re.compile(r"<(?:@!?\d*)?\Z")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+class NarrativePreview:
+    """
+    The player-facing preview of a streamed reply, built from what
+    `StreamingProtocolParser.feed()` releases. Only new text is processed: away
+    mentions are filtered (an unfinished `<@...` is held until it completes), blank
+    lines are collapsed, and once the preview passes `limit` it is condensed to the
+    last paragraph that fits and stops growing (the streaming paragraph guard).
+    """
+
+    def __init__(self, limit: int = NARRATIVE_CHAR_LIMIT):
+        self.limit = limit
+        self.text = ""
+        self.full = False
+        self._tail = ""  # Trailing newlines or an unfinished mention, not yet shown
+
+    def append(self, new: str) -> str:
+        """Adds released text and returns the preview."""
+        if self.full or not new:
+            return self.text
+        pending = self._tail + new
+        end = len(pending)
+        mention = pending.rfind("<")
+        if mention != -1 and _PARTIAL_MENTION.match(pending, mention):
+            end = mention
+        end = len(pending[:end].rstrip("\n"))
+        self._tail = pending[end:]
+        piece = _BLANK_LINES.sub("\n\n", pending[:end])
+        if not self.text:
+            piece = piece.lstrip()
+        self.text += filter_away_mentions(piece)
+        if len(self.text) > self.limit:
+            self.text = condense_to_limit(self.text, self.limit)
+            self.full = True
+        return self.text
+
+class StreamingMessage:
+    """
+    Progressively renders a streamed GM reply into one or more Discord messages.
+
+    The first non-empty text is posted immediately (calling `on_first_post` right
+    before, so the turn can be committed); later updates edit the posted messages
+    at most once per `edit_interval` seconds to stay within Discord's edit rate limits.
+    Text longer than `limit` spills into follow-up messages via `smart_chunk_text`.
+    """
+
+    def __init__(self, channel, edit_interval: float = 1.0, limit: int = 1900, on_first_post: Optional[Callable[[], None]] = None, clock: Callable[[], float] = time.monotonic):
+        self.channel = channel
+        self.edit_interval = edit_interval
+        self.limit = limit
+        self.on_first_post = on_first_post
+        self.clock = clock
+        self.messages = []
+        self._shown: List[str] = []
+        self._last_render = None
+        self.started_at = clock()
+        self.first_post_latency: Optional[float] = None
+        self.stats = {"sends": 0, "edits": 0, "skipped": 0}
+
+    @property
+    def posted(self) -> bool:
+        return bool(self.messages)
+
+    def _chunks(self, text: str) -> List[str]:
+        return [c for c in smart_chunk_text(text, limit=self.limit) if c.strip()]
+
+    async def update(self, text: str):
+        """Shows `text` (`NarrativePreview.text`) if the throttle allows it."""
+        if not text.strip():
+            return
+        now = self.clock()
+        if self.posted and self._last_render is not None and now - self._last_render < self.edit_interval:
+            self.stats["skipped"] += 1
+            return
+        await self._render(self._chunks(text))
+        self._last_render = now
+
+    async def finalize(self, text: str):
+        """Renders the final processed text, ignoring the throttle, and removes surplus messages."""
+        chunks = self._chunks(text)
+        await self._render(chunks)
+        while len(self.messages) > len(chunks):
+            message = self.messages.pop()
+            self._shown.pop()
+            await message.delete()
+
+    async def _render(self, chunks: List[str]):
+        for i, chunk in enumerate(chunks):
+            if i < len(self.messages):
+                if self._shown[i] != chunk:
+                    await self.messages[i].edit(content=chunk)
+                    self._shown[i] = chunk
+                    self.stats["edits"] += 1
+                continue
+            if not self.messages:
+                if self.on_first_post:
+                    self.on_first_post()
+                self.first_post_latency = self.clock() - self.started_at
+                print(f"⚡ First GM text posted after {self.first_post_latency:.2f}s.")
+            self.messages.append(await self.channel.send(chunk))
+            self._shown.append(chunk)
+            self.stats["sends"] += 1
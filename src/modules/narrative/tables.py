@@ -0,0 +1,206 @@
+import functools
+import re
+import sys
+import os
+import textwrap
+import unicodedata
+from typing import List, NamedTuple, Optional, Tuple
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from src.core.config import DATA_TABLE_MAX_WIDTH, DATA_TABLE_MAX_CHARS, DATA_TABLE_CACHE_SIZE
+
+# Narrowest a wrapped column may get before the table switches to the compact layout
+MIN_COLUMN_WIDTH = 4
+# Wrapped cells are cut (with "…") after this many lines
+MAX_CELL_LINES = 3
+
+_SEPARATOR_CELL = re.compile(r":?-{3,}:?")
+
+class RenderedTable(NamedTuple):
+    """
+    A DATA_TABLE render. `layout` is "boxed", "wrapped" or "compact".
+    `attachment` holds the full table when `text` had to drop rows to fit.
+    """
+    text: str
+    layout: str
+    attachment: Optional[str] = None
+    filename: Optional[str] = None
+
+def display_width(text: str) -> int:
+    """Monospace columns `text` occupies (wide CJK/emoji count 2, combining marks 0)."""
+    if text.isascii():
+        return len(text)
+    width = 0
+    for ch in text:
+        if unicodedata.combining(ch):
+            continue
+        width += 2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1
+    return width
+
+def _pad(text: str, width: int) -> str:
+    return text + " " * (width - display_width(text))
+
+def _cut(text: str, width: int) -> str:
+    """The longest prefix of `text` that fits in `width` columns."""
+    if display_width(text) <= width:
+        return text
+    out, used = [], 0
+    for ch in text:
+        used += display_width(ch)
+        if used > width:
+            break
+        out.append(ch)
+    return "".join(out)
+
+def _wrap(text: str, width: int) -> List[str]:
+    """Wraps a cell to `width` columns, at most MAX_CELL_LINES lines."""
+    if text.isascii():
+        lines = textwrap.wrap(text, width) or [""]
+    else:
+        lines, current = [], ""
+        for ch in text:
+            if current and display_width(current + ch) > width:
+                lines.append(current)
+                current = ""
+            current += ch
+        lines.append(current)
+    if len(lines) > MAX_CELL_LINES:
+        lines = lines[:MAX_CELL_LINES]
+        lines[-1] = _cut(lines[-1], width - 1) + "…"
+    return lines
+
+def parse_table_block(body: str) -> Optional[Tuple[str, List[str], List[List[str]]]]:
+    """
+    Reads a DATA_TABLE body into (title, headers, rows), or None without a header row.
+    Markdown-style outer pipes and |---| separator rows are accepted. Rows are padded
+    or cut to the header count.
+    """
+    title = "Data Table"
+    headers: List[str] = []
+    rows: List[List[str]] = []
+    for line in body.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("Title:"):
+            title = line.replace("Title:", "").strip()
+            continue
+        if "|" not in line:
+            continue
+        if line.startswith("|"):
+            line = line[1:]
+        if line.endswith("|"):
+            line = line[:-1]
+        cols = [c.strip() for c in line.split('|')]
+        if all(_SEPARATOR_CELL.fullmatch(c) for c in cols):
+            continue
+        if not headers:
+            headers = cols
+        else:
+            rows.append((cols + [""] * len(headers))[:len(headers)])
+    if not headers:
+        return None
+    return title, headers, rows
+
+def _fit_widths(widths: List[int], available: int) -> List[int]:
+    """Caps the widest columns so the total fits `available` (narrow columns keep their width)."""
+    remaining = available
+    ordered = sorted(widths)
+    for i, width in enumerate(ordered):
+        share = remaining // (len(ordered) - i)
+        if width > share:
+            return [min(w, share) for w in widths]
+        remaining -= width
+    return widths
+
+def _boxed(headers: List[str], rows: List[List[str]], widths: List[int], wrap: bool) -> str:
+    """Bordered table in PrettyTable's default style (left-aligned, one space of padding)."""
+    border = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+    lines = [border]
+
+    def add(cells):
+        if wrap:
+            wrapped = [_wrap(c, w) for c, w in zip(cells, widths)]
+        else:
+            wrapped = [[c] for c in cells]
+        for i in range(max(len(cell) for cell in wrapped)):
+            parts = [_pad(cell[i] if i < len(cell) else "", w) for cell, w in zip(wrapped, widths)]
+            lines.append("| " + " | ".join(parts) + " |")
+
+    add(headers)
+    lines.append(border)
+    for row in rows:
+        add(row)
+    lines.append(border)
+    return "\n".join(lines)
+
+def _compact(headers: List[str], rows: List[List[str]]) -> List[str]:
+    """One bullet per row: the first cell in bold, the rest as `Header: value`."""
+    lines = []
+    for row in rows:
+        rest = " · ".join(f"{h}: {c}" for h, c in zip(headers[1:], row[1:]) if c)
+        lines.append(f"• **{row[0]}**" + (f" — {rest}" if rest else ""))
+    return lines
+
+def _filename(title: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", title.lower()).strip("_")
+    return f"{slug or 'table'}.txt"
+
+def render_table(title: str, headers: List[str], rows: List[List[str]], max_width: int = DATA_TABLE_MAX_WIDTH, max_chars: int = DATA_TABLE_MAX_CHARS) -> RenderedTable:
+    """
+    Renders a table for a Discord message.
+
+    Column widths are computed once. A table wider than `max_width` has its widest
+    columns narrowed and their cells wrapped; if that would leave columns under
+    MIN_COLUMN_WIDTH, rows are listed in a compact bullet layout instead. A render
+    longer than `max_chars` keeps the rows that fit and attaches the full table.
+    """
+    widths = [max([display_width(h)] + [display_width(r[i]) for r in rows]) for i, h in enumerate(headers)]
+    frame = 3 * len(headers) + 1
+    heading = f"**{title}**"
+
+    if sum(widths) + frame <= max_width:
+        layout, fitted = "boxed", widths
+    elif max_width - frame >= MIN_COLUMN_WIDTH * len(headers):
+        layout, fitted = "wrapped", _fit_widths(widths, max_width - frame)
+    else:
+        layout, fitted = "compact", None
+
+    def build(shown_rows, note=""):
+        if layout == "compact":
+            body = "\n".join(_compact(headers, shown_rows))
+            return f"{heading}\n{body}{note}"
+        table = _boxed(headers, shown_rows, fitted, wrap=layout == "wrapped")
+        return f"{heading}\n```text\n{table}\n```{note}"
+
+    text = build(rows)
+    if len(text) <= max_chars:
+        return RenderedTable(text, layout)
+
+    # Too long for one message: show the rows that fit and attach the full table
+    filename = _filename(title)
+    low, high = 0, len(rows)
+    while low < high:
+        mid = (low + high + 1) // 2
+        note = f"\n*…{len(rows) - mid} more rows in `{filename}`*"
+        if len(build(rows[:mid], note)) <= max_chars:
+            low = mid
+        else:
+            high = mid - 1
+    text = build(rows[:low], f"\n*…{len(rows) - low} more rows in `{filename}`*")
+    full = f"{title}\n{_boxed(headers, rows, widths, wrap=False)}\n"
+    return RenderedTable(text, layout, attachment=full, filename=filename)
+
+@functools.lru_cache(maxsize=DATA_TABLE_CACHE_SIZE)
+def render_table_block(body: str) -> Optional[RenderedTable]:
+    """
+    Parses and renders a DATA_TABLE body, or None if it has no header row.
+    Memoized by block: GMs re-emit the same shop and loot tables, and streaming
+    renders a block as soon as it closes. See `render_table_block.cache_info()`.
+    """
+    parsed = parse_table_block(body)
+    if parsed is None:
+        return None
+    return render_table(*parsed)
@@ -0,0 +1,162 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List
+
+class Turn:
+    """
+    A single scheduled GM turn.
+    The handler calls `commit()` right before it starts posting to Discord; until
+    then the turn may be cancelled and superseded by newer input.
+    """
+
+    def __init__(self, channel_id: int, messages: List[Any], restarts: int = 0):
+        self.channel_id = channel_id
+        self.messages = messages
+        self.restarts = restarts
+        self.committed = False
+
+    def commit(self):
+        """Marks the point of no return (output is about to become visible)."""
+        self.committed = True
+
+TurnHandler = Callable[[Any, List[Any], Turn], Awaitable[None]]
+
+class TurnScheduler:
+    """
+    Per-channel GM turn scheduler.
+
+    - Coalescing: a turn starts once no new message has arrived for `window` seconds
+      (capped at `max_delay` seconds after the first message of the burst) and
+      answers every queued message at once.
+    - Serialization: each channel has a single worker, so turns (and the ledger
+      updates and pending rolls they produce) never overlap within a channel.
+    - Cancellation: new input arriving while a turn is still generating (not yet
+      committed) cancels it; its messages are folded into the replacement turn.
+      A turn is superseded at most `max_restarts` times so chatter cannot starve it.
+    - Backpressure: at most `max_pending` messages are queued per channel; the oldest
+      are dropped from the queue (they remain visible in the channel history).
+    """
+
+    def __init__(self, handler: TurnHandler, window: float = 1.5, max_delay: float = 6.0, max_pending: int = 20, max_restarts: int = 2):
+        self.handler = handler
+        self.window = window
+        self.max_delay = max(max_delay, window)
+        self.max_pending = max(1, max_pending)
+        self.max_restarts = max_restarts
+        self._pending: Dict[int, List[Any]] = {}
+        self._first_seen: Dict[int, float] = {}
+        self._last_seen: Dict[int, float] = {}
+        self._restarts: Dict[int, int] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._active: Dict[int, tuple] = {}
+        self.stats = {
+            "messages": 0,
+            "turns": 0,
+            "cancelled": 0,
+            "dropped": 0,
+            "max_queue_depth": 0,
+            "total_wait": 0.0,
+            "last_wait": 0.0,
+        }
+
+    def submit(self, message):
+        """Queues a player message; starts the channel's worker or supersedes its in-flight turn."""
+        channel_id = message.channel.id
+        now = asyncio.get_running_loop().time()
+        pending = self._pending.setdefault(channel_id, [])
+        if not pending:
+            self._first_seen[channel_id] = now
+        pending.append(message)
+        self._last_seen[channel_id] = now
+        self.stats["messages"] += 1
+
+        if len(pending) > self.max_pending:
+            overflow = len(pending) - self.max_pending
+            del pending[:overflow]
+            self.stats["dropped"] += overflow
+            print(f"⚠️ Turn queue full for channel {channel_id}; dropped {overflow} queued message(s).")
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(pending))
+
+        active = self._active.get(channel_id)
+        if active:
+            turn, task = active
+            if not turn.committed and turn.restarts < self.max_restarts and not task.done():
+                task.cancel()
+
+        if channel_id not in self._workers:
+            self._workers[channel_id] = asyncio.create_task(self._worker(message.channel))
+
+    def pending_count(self, channel_id: int) -> int:
+        """Number of messages waiting for the next turn in a channel."""
+        return len(self._pending.get(channel_id, []))
+
+    def is_busy(self, channel_id: int) -> bool:
+        """True while a channel is debouncing or generating."""
+        return channel_id in self._workers
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Returns backpressure metrics (queue depth, waits, cancellations, drops)."""
+        turns = self.stats["turns"]
+        return {
+            "queue_depth": sum(len(p) for p in self._pending.values()),
+            "in_flight": len(self._active),
+            "avg_wait": self.stats["total_wait"] / turns if turns else 0.0,
+            **self.stats,
+        }
+
+    async def _wait_for_quiet(self, channel_id: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            deadline = min(
+                self._last_seen[channel_id] + self.window,
+                self._first_seen[channel_id] + self.max_delay
+            )
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+    async def _worker(self, channel):
+        channel_id = channel.id
+        loop = asyncio.get_running_loop()
+        try:
+            while self._pending.get(channel_id):
+                await self._wait_for_quiet(channel_id)
+                first_seen = self._first_seen[channel_id]
+                wait = loop.time() - first_seen
+                messages = self._pending.pop(channel_id)
+                turn = Turn(channel_id, messages, restarts=self._restarts.pop(channel_id, 0))
+
+                self.stats["turns"] += 1
+                self.stats["total_wait"] += wait
+                self.stats["last_wait"] = wait
+                if len(messages) > 1:
+                    print(f"🧵 Coalesced {len(messages)} messages into one GM turn.")
+
+                task = asyncio.create_task(self.handler(channel, messages, turn))
+                self._active[channel_id] = (turn, task)
+                try:
+                    await asyncio.wait({task})
+                except asyncio.CancelledError:
+                    task.cancel()
+                    raise
+                finally:
+                    self._active.pop(channel_id, None)
+
+                if task.cancelled():
+                    # Superseded: fold this turn's messages in front of the newer ones.
+                    self.stats["cancelled"] += 1
+                    self.stats["turns"] -= 1
+                    self.stats["total_wait"] -= wait
+                    merged = messages + self._pending.get(channel_id, [])
+                    if len(merged) > self.max_pending:
+                        self.stats["dropped"] += len(merged) - self.max_pending
+                        merged = merged[-self.max_pending:]
+                    self._pending[channel_id] = merged
+                    # Keep the burst's original anchor so max_delay still bounds the total wait
+                    self._first_seen[channel_id] = min(first_seen, self._first_seen.get(channel_id, first_seen))
+                    self._restarts[channel_id] = turn.restarts + 1
+                    print(f"⏭️ GM turn superseded by newer input (restart {turn.restarts + 1}).")
+                elif task.exception():
+                    print(f"❌ Error in turn handler: {task.exception()}")
+        finally:
+            self._workers.pop(channel_id, None)
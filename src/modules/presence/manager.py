@@ -1,12 +1,16 @@
 import json
 import os
+import re
 import time
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Pattern
 
 class AwayManager:
     """
     Manages player absence states.
     Persistence: stored in memory/away_status.json
+
+    Use the shared `away_manager` instance; state changes go through its methods so
+    the compiled mention pattern stays in sync with the away set.
     """
     
     VALID_MODES = ["auto-pilot", "off-screen", "narrative-exit"]
@@ -14,6 +18,7 @@ class AwayManager:
     def __init__(self, filepath: str = "memory/away_status.json"):
         self.filepath = filepath
         self.data: Dict[str, Dict] = {}
+        self._mention_pattern: Optional[Pattern[str]] = None
         self._load()
 
     def _load(self):
@@ -27,6 +32,15 @@ class AwayManager:
                 self.data = {}
         else:
             self.data = {}
+        self._compile_mentions()
+
+    def _compile_mentions(self):
+        """Rebuilds the single pattern matching a mention (<@ID> or <@!ID>) of any away user."""
+        if self.data:
+            alternation = "|".join(re.escape(user_id) for user_id in sorted(self.data))
+            self._mention_pattern = re.compile(rf"<@!?(?:{alternation})>")
+        else:
+            self._mention_pattern = None
 
     def _save(self):
         """Saves current state to JSON file."""
@@ -51,6 +65,7 @@ class AwayManager:
             "last_seen_message_id": last_seen_message_id,
             "timestamp": time.time()
         }
+        self._compile_mentions()
         self._save()
         return True
 
@@ -61,6 +76,7 @@ class AwayManager:
         """
         if user_id in self.data:
             away_data = self.data.pop(user_id)
+            self._compile_mentions()
             self._save()
             return away_data
         return None
@@ -77,6 +93,24 @@ class AwayManager:
         """Returns a dictionary of all currently away users."""
         return self.data.copy()
 
+    def suppress_mentions(self, text: str, replacement: str = "**(Away)**") -> str:
+        """Replaces mentions of away users with `replacement` in a single pass over `text`."""
+        if self._mention_pattern is None or "<@" not in text:
+            return text
+        suppressed = []
+
+        def replace(match):
+            suppressed.append(match.group(0))
+            return replacement
+
+        text = self._mention_pattern.sub(replace, text)
+        for mention in dict.fromkeys(suppressed):
+            print(f"🛡️ Suppressed mention for away user {mention.strip('<@!>')}")
+        return text
+
+# Shared instance: /away, /back and the response filter must see the same state
+away_manager = AwayManager()
+
 def _syntax_check():
     """A simple function to confirm the file is syntactically correct."""
     return True
\ No newline at end of file
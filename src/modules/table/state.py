@@ -15,6 +15,7 @@ class TableManager:
         self.state_file = state_file
         self.current_state = TableState.IDLE
         self.last_updated = None
+        self._listeners = []
         self.load_state()
 
     def load_state(self):
@@ -42,9 +43,19 @@ class TableManager:
             json.dump(data, f, indent=2)
 
     def set_state(self, new_state: TableState):
-        """Updates the state and persists it."""
+        """Updates the state, persists it and notifies listeners."""
+        old_state = self.current_state
         self.current_state = new_state
         self.save_state()
+        for listener in self._listeners:
+            try:
+                listener(old_state, new_state)
+            except Exception as e:
+                print(f"⚠️ Table state listener failed: {e}")
+
+    def add_listener(self, callback):
+        """Registers callback(old_state, new_state), called after every set_state()."""
+        self._listeners.append(callback)
 
     def get_state(self) -> TableState:
         """Returns the current table state."""
@@ -62,3 +62,32 @@ def test_get_all_away_users(away_manager):
     assert len(all_users) == 2
     assert "u1" in all_users
     assert "u2" in all_users
+
+def test_suppress_mentions_tracks_away_set(away_manager):
+    text = "<@111> and <@!222> look at <@333>."
+    assert away_manager.suppress_mentions(text) == text
+
+    away_manager.set_away("111", "auto-pilot", 1)
+    away_manager.set_away("222", "off-screen", 2)
+    assert away_manager.suppress_mentions(text) == "**(Away)** and **(Away)** look at <@333>."
+
+    away_manager.return_user("111")
+    assert away_manager.suppress_mentions(text) == "<@111> and **(Away)** look at <@333>."
+    assert away_manager.suppress_mentions("<@2222> is someone else") == "<@2222> is someone else"
+
+def test_pattern_is_rebuilt_from_disk(away_manager, tmp_path):
+    away_manager.set_away("444", "narrative-exit", 3)
+
+    reloaded = AwayManager(filepath=str(tmp_path / "away_status.json"))
+    assert reloaded.suppress_mentions("Hi <@444>") == "Hi **(Away)**"
+
+def test_parser_and_commands_share_one_manager(away_manager, monkeypatch):
+    from src.modules.narrative import parser
+    from src.modules.presence import manager
+    import src.main
+
+    assert parser.away_manager is manager.away_manager is src.main.away_manager
+
+    monkeypatch.setattr(parser, "away_manager", away_manager)
+    away_manager.set_away("555", "auto-pilot", 4)  # What /away does
+    assert parser.filter_away_mentions("<@555>, your turn.") == "**(Away)**, your turn."
@@ -0,0 +1,152 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+from src.core.llm import BatchJob, BatchRequest, GeminiProvider, LLMProvider
+from src.core.ollama import PrefixRouter
+
+class EchoProvider(LLMProvider):
+    """Provider without a batch API: jobs run on the local stand-in."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, model_name, system_instruction, history, temperature=0.7, static_prefix=None, max_output_tokens=None, **kwargs):
+        self.calls.append(model_name)
+        if history[0] == "boom":
+            raise RuntimeError("model refused")
+        return f"{model_name}: {history[0]}"
+
+class SlowJobProvider(LLMProvider):
+    """Batch backend that finishes after `polls` status checks."""
+
+    def __init__(self, polls):
+        self.polls = polls
+
+    async def generate(self, *args, **kwargs):
+        return ""
+
+    async def submit_batch(self, requests):
+        return BatchJob(name="job-1", total=len(requests))
+
+    async def get_batch(self, name):
+        self.polls -= 1
+        return BatchJob(name=name, state="succeeded" if self.polls <= 0 else "running", results={"a": "done"} if self.polls <= 0 else {})
+
+def _requests(*texts, model="m"):
+    return [BatchRequest(key=f"k{i}", model_name=model, system_instruction="sys", history=[text]) for i, text in enumerate(texts)]
+
+@pytest.mark.asyncio
+async def test_local_batch_collects_results_and_errors():
+    provider = EchoProvider()
+
+    job = await provider.run_batch(_requests("one", "boom", "three"), poll_interval=0.001)
+
+    assert job.done and job.state == "succeeded"
+    assert job.results == {"k0": "m: one", "k2": "m: three"}
+    assert job.errors == {"k1": "model refused"}
+    assert (await provider.get_batch(job.name)).total == 3
+
+@pytest.mark.asyncio
+async def test_run_batch_polls_with_backoff(monkeypatch):
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    job = await SlowJobProvider(polls=5).run_batch([], poll_interval=1.0, max_interval=4.0)
+
+    assert job.results == {"a": "done"}
+    assert sleeps == [1.0, 2.0, 4.0, 4.0, 4.0]
+
+@pytest.mark.asyncio
+async def test_run_batch_times_out():
+    with pytest.raises(asyncio.TimeoutError):
+        await SlowJobProvider(polls=100).run_batch([], poll_interval=0.01, timeout=0.05)
+
+@pytest.mark.asyncio
+async def test_unknown_job_raises():
+    with pytest.raises(KeyError):
+        await EchoProvider().get_batch("nope")
+
+class FakeBatches:
+    def __init__(self):
+        self.created = []
+        self.state = "JOB_STATE_RUNNING"
+
+    async def create(self, model, src):
+        self.created.append({"model": model, "src": src})
+        return SimpleNamespace(name="batches/1", state=self.state, dest=None)
+
+    async def get(self, name):
+        responses = [
+            SimpleNamespace(metadata=None, error=None, response=SimpleNamespace(text="ledgers")),
+            SimpleNamespace(metadata=None, error=SimpleNamespace(message="blocked"), response=None),
+        ]
+        done = self.state == "JOB_STATE_SUCCEEDED"
+        return SimpleNamespace(name=name, state=SimpleNamespace(value=self.state), dest=SimpleNamespace(inlined_responses=responses) if done else None)
+
+@pytest.mark.asyncio
+async def test_gemini_batch_maps_states_and_results():
+    batches = FakeBatches()
+    provider = GeminiProvider(api_key="x", client=SimpleNamespace(aio=SimpleNamespace(batches=batches)))
+
+    job = await provider.submit_batch(_requests("history a", "history b", model="arch-model"))
+    assert (job.name, job.state, job.total) == ("batches/1", "running", 2)
+    created = batches.created[0]
+    assert created["model"] == "arch-model"
+    assert created["src"][0].config.system_instruction == "sys"
+    assert created["src"][1].metadata == {"key": "k1"}
+
+    batches.state = "JOB_STATE_SUCCEEDED"
+    job = await provider.get_batch("batches/1")
+    assert job.state == "succeeded"
+    assert job.results == {"k0": "ledgers"}
+    assert job.errors == {"k1": "blocked"}
+
+@pytest.mark.asyncio
+async def test_gemini_batch_needs_one_model():
+    provider = GeminiProvider(api_key="x", client=SimpleNamespace(aio=SimpleNamespace(batches=FakeBatches())))
+
+    with pytest.raises(ValueError):
+        await provider.submit_batch(_requests("a", model="m1") + _requests("b", model="m2"))
+
+@pytest.mark.asyncio
+async def test_prefix_router_routes_batches():
+    remote, local = EchoProvider(), EchoProvider()
+    router = PrefixRouter(remote, {"ollama": local})
+
+    job = await router.run_batch(_requests("x", model="ollama:llama3.1"), poll_interval=0.001)
+
+    assert job.results == {"k0": "llama3.1: x"}
+    assert local.calls == ["llama3.1"] and remote.calls == []
+    with pytest.raises(ValueError):
+        await router.submit_batch(_requests("x", model="ollama:llama3.1") + _requests("y", model="gemini"))
+
+@pytest.mark.asyncio
+async def test_rebuild_can_run_as_batch():
+    from src.modules.memory.service import ledger_lock, rebuild_memory_from_history
+
+    job = BatchJob(name="b", state="succeeded", total=1, results={"rebuild": "FILE: world.ledger\nFacts"})
+    locked = []
+
+    async def run_batch_side_effect(*args, **kwargs):
+        locked.append(ledger_lock.locked())  # Ledger updates keep running while the job is pending
+        return job
+
+    def save_side_effect(text):
+        locked.append(ledger_lock.locked())
+        return 1
+
+    with patch("src.modules.memory.service.llm_provider.run_batch", new_callable=AsyncMock, side_effect=run_batch_side_effect) as run_batch, \
+         patch("src.modules.memory.service.save_ledger_files", side_effect=save_side_effect) as save:
+        count = await rebuild_memory_from_history("Alice: hello", use_batch=True)
+
+    assert count == 1
+    assert locked == [False, True]
+    request = run_batch.call_args.args[0][0]
+    assert request.key == "rebuild" and "Alice: hello" in request.history[0].text
+    save.assert_called_once_with("FILE: world.ledger\nFacts")
@@ -56,6 +56,32 @@ def test_smart_chunk_text_hard_split():
     assert chunks[0] == "A" * 50
     assert chunks[1] == "A" * 50
 
+def test_smart_chunk_text_keeps_code_blocks_whole():
+    """A rendered table is moved to the next chunk rather than split."""
+    intro = "The merchant unrolls a list. " * 3
+    table = "```text\n" + "\n".join(f"| Item {i} | {i} gp |" for i in range(6)) + "\n```"
+    chunks = smart_chunk_text(f"{intro}\n**Wares**\n{table}", limit=len(table) + 10)
+
+    assert chunks == [f"{intro}\n**Wares**", table]
+
+def test_smart_chunk_text_reopens_oversized_code_blocks():
+    """A code block longer than the limit is closed and reopened with its header."""
+    rows = [f"| Row {i:02d} | value |" for i in range(20)]
+    text = "```text\n" + "\n".join(rows) + "\n```"
+    chunks = smart_chunk_text(text, limit=120)
+
+    assert len(chunks) > 1
+    assert all(len(c) <= 120 for c in chunks)
+    assert all(c.startswith("```text\n") and c.endswith("```") for c in chunks)
+    assert [line for c in chunks for line in c.split("\n")[1:-1]] == rows
+
+def test_smart_chunk_text_prefers_sentences_over_words():
+    """Within a long line, the cut falls after the last sentence that fits."""
+    text = "The torch gutters and the goblin hisses. It raises a rusty blade at you"
+    chunks = smart_chunk_text(text, limit=50)
+
+    assert chunks == ["The torch gutters and the goblin hisses.", "It raises a rusty blade at you"]
+
 def test_process_response_formatting_data_table():
     """Test that DATA_TABLE blocks are correctly identified and processed."""
     sample_text = """
@@ -219,3 +245,65 @@ content: I loved the dragon description
     assert detected_feedback[0]['type'] == 'star'
     assert detected_feedback[0]['user'] == 'Alistair'
     assert detected_feedback[0]['content'] == 'I loved the dragon description'
+
+def test_scan_protocol_blocks_single_pass():
+    """Blocks and narrative come out in order; plain fences stay narrative and an unclosed block runs to the end."""
+    from src.modules.narrative.parser import ProtocolBlock, scan_protocol_blocks
+
+    text = "Intro\n```text\ncode\n```\n```memory_update\n- Fact\n```\nOutro ```VISUAL_PROMPT unclosed"
+    tokens = scan_protocol_blocks(text)
+
+    assert tokens[0] == "Intro\n```text\ncode\n```\n"
+    assert tokens[1] == ProtocolBlock("MEMORY_UPDATE", "\n- Fact\n", "```memory_update\n- Fact\n```")
+    assert tokens[2] == "\nOutro "
+    assert tokens[3] == ProtocolBlock("VISUAL_PROMPT", " unclosed", "```VISUAL_PROMPT unclosed", closed=False)
+    assert scan_protocol_blocks("The end.\n```MEMORY_UP") == ["The end.\n"]
+
+def test_truncated_reply_keeps_complete_facts_only():
+    """A reply cut off inside a protocol block (output token cap) never shows the raw block."""
+    text = "The crypt door groans open.\n\n```MEMORY_UPDATE\n- Party enters the crypt\n- Alistair"
+    cleaned_text, facts, visual_prompt, _, _ = process_response_formatting(text)
+
+    assert cleaned_text == "The crypt door groans open."
+    assert facts == "- Party enters the crypt"
+
+    cleaned_text, facts, visual_prompt, _, _ = process_response_formatting("Darkness.\n```VISUAL_PROMPT\nA dark cry")
+    assert cleaned_text == "Darkness."
+    assert facts is None and visual_prompt is None
+
+def test_process_response_formatting_reports_block_timings():
+    """Every handled block is timed, and the first MEMORY_UPDATE wins."""
+    from src.modules.narrative import parser
+
+    parser.protocol_stats.clear()
+    sample_text = """
+The door opens.
+```MEMORY_UPDATE
+- First
+```
+```MEMORY_UPDATE
+- Second
+```
+```TABLE_STATE
+state: PAUSED
+```
+"""
+    result = parser.process_protocol_blocks(sample_text)
+    cleaned_text, facts, _, _, state_change = parser.process_response_formatting(sample_text)
+
+    assert [kind for kind, _ in result.timings] == ["MEMORY_UPDATE", "MEMORY_UPDATE", "TABLE_STATE"]
+    assert cleaned_text == "The door opens."
+    assert facts == "- First"
+    assert state_change == {"state": "PAUSED"}
+    assert parser.protocol_stats["MEMORY_UPDATE"]["count"] == 4
+    assert parser.protocol_stats["scan"]["count"] == 2
+
+def test_one_line_dice_roll_stops_at_its_fence():
+    """A one-line DICE_ROLL block does not swallow the block after it."""
+    sample_text = "```DICE_ROLL Bo rolls 1d4```\n```MEMORY_UPDATE\n- Bo rolled\n```"
+
+    cleaned_text, facts, _, _, _ = process_response_formatting(sample_text)
+
+    assert cleaned_text.startswith("🎲 **Bo** rolls 1d4 for unknown reason:")
+    assert "```" not in cleaned_text
+    assert facts == "- Bo rolled"
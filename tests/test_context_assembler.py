@@ -0,0 +1,79 @@
+import pytest
+from google.genai import types
+from src.core.messages import message_text
+from src.modules.narrative.context import TRUNCATION_MARKER, ContextAssembler, estimate_tokens, keep_newest
+
+def _msg(text, role="user"):
+    return types.Content(role=role, parts=[types.Part.from_text(text=text)])
+
+@pytest.fixture
+def ledgers():
+    return {
+        "party.ledger": "P" * 400,
+        "world.ledger": "W" * 4000,
+        "npcs.ledger": "N" * 4000,
+    }
+
+def test_no_trimming_under_budget(ledgers):
+    assembler = ContextAssembler(token_budget=100_000)
+    history = [_msg("Hello"), _msg("Welcome, traveller.", role="model")]
+
+    ctx = assembler.assemble("PERSONA", "\n\n# CURRENT TABLE STATE: ACTIVE\n", ledgers, history)
+
+    assert ctx.dropped == []
+    assert ctx.history == history
+    assert ctx.system_instruction.startswith("PERSONA\n\n# CURRENT TABLE STATE: ACTIVE\n")
+    assert "# CURRENT CAMPAIGN STATE (READ-ONLY)" in ctx.system_instruction
+    assert "--- CAMPAIGN LEDGER: npcs.ledger ---" in ctx.system_instruction
+
+def test_history_trimmed_to_minimum_first(ledgers):
+    history = [_msg(f"message {i} " + "x" * 400) for i in range(10)]
+    ledger_total = sum(estimate_tokens(v) for v in ledgers.values())
+    assembler = ContextAssembler(token_budget=ledger_total + 700, min_history=3)
+
+    ctx = assembler.assemble("PERSONA", "", ledgers, history)
+
+    assert len(ctx.history) >= 3
+    assert message_text(ctx.history[-1]).startswith("message 9")
+    assert any(note.startswith("history:") for note in ctx.dropped)
+    assert "N" * 4000 in ctx.system_instruction
+
+def test_cold_ledgers_truncated_and_party_kept(ledgers):
+    history = [_msg("a" * 40) for _ in range(4)]
+    assembler = ContextAssembler(token_budget=1200, min_history=2, cold_ledger_tokens=100)
+    mtimes = {"world.ledger": 200.0, "npcs.ledger": 100.0, "party.ledger": 1.0}
+
+    ctx = assembler.assemble("PERSONA", "", ledgers, history, ledger_mtimes=mtimes)
+
+    assert "P" * 400 in ctx.system_instruction
+    assert any("npcs.ledger" in note for note in ctx.dropped)
+    assert ctx.total_tokens <= 1200
+    assert not ctx.over_budget
+
+def test_truncation_keeps_the_newest_entries():
+    ledger = "\n".join(f"- Entry {i}: the party travels on" for i in range(50))
+
+    kept = keep_newest(ledger, 100)
+
+    assert kept.startswith(TRUNCATION_MARKER)
+    assert kept.endswith("- Entry 49: the party travels on")
+    assert kept[len(TRUNCATION_MARKER):].startswith("- Entry")  # Cut at a line boundary
+    assert "- Entry 0:" not in kept
+    assert len(kept) - len(TRUNCATION_MARKER) <= 100
+
+def test_over_budget_reported_when_pinned_content_too_large():
+    assembler = ContextAssembler(token_budget=10)
+    ctx = assembler.assemble("PERSONA" * 100, "", {"party.ledger": "P" * 400}, [_msg("hi"), _msg("there")])
+
+    assert ctx.over_budget
+    assert len(ctx.history) == 1
+    assert "P" * 400 in ctx.system_instruction
+
+def test_zero_budget_disables_limit(ledgers):
+    assembler = ContextAssembler(token_budget=0)
+    history = [_msg("x" * 10_000) for _ in range(20)]
+
+    ctx = assembler.assemble("PERSONA", "", ledgers, history)
+
+    assert len(ctx.history) == 20
+    assert ctx.dropped == []
@@ -0,0 +1,67 @@
+import httpx
+import pytest
+from src.core.genai_clients import GenAIClientRegistry
+from src.core.llm import GeminiProvider
+from src.core.tts import GeminiTTSProvider
+
+def _handler(request):
+    if request.url.path.endswith("/models/gm-model"):
+        return httpx.Response(200, json={"name": "models/gm-model"})
+    return httpx.Response(404, json={"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+
+def _registry(**kwargs):
+    return GenAIClientRegistry(transport=httpx.MockTransport(_handler), sync_transport=httpx.MockTransport(_handler), **kwargs)
+
+def test_one_client_per_key_and_version():
+    registry = _registry()
+    client = registry.get("key-a")
+
+    assert registry.get("key-a") is client
+    assert registry.get("key-b") is not client
+    assert registry.get("key-a", api_version="v1") is not client
+    assert registry.get_stats()["clients"] == 3
+
+def test_providers_share_the_client():
+    registry = _registry()
+    shared = registry.get("key-a")
+
+    assert GeminiProvider(api_key="key-a", client=shared).client is GeminiTTSProvider(api_key="key-a", model_name="tts", client=shared).client
+
+def test_tts_defers_client_creation(monkeypatch):
+    created = []
+    monkeypatch.setattr("src.core.tts.get_genai_client", lambda api_key: created.append(api_key) or object())
+
+    tts = GeminiTTSProvider(api_key=None, model_name="tts")  # Replay/Ollama runs may have no Gemini key
+    assert created == []
+    assert tts.client is tts.client
+    assert created == [None]
+
+def test_configure_rejects_unknown_settings():
+    registry = _registry()
+    registry.configure(max_connections=5, keepalive_expiry=60.0)
+    assert registry.max_connections == 5
+    with pytest.raises(ValueError):
+        registry.configure(http3=True)
+
+@pytest.mark.asyncio
+async def test_warm_up_goes_through_the_pool():
+    registry = _registry()
+    registry.get("key-a")
+
+    latency = await registry.warm_up("gm-model")
+    assert latency is not None
+
+    stats = registry.get_stats()
+    assert stats["requests"] == 1
+    assert stats["errors"] == 0
+    assert stats["warmups"] == 1
+    await registry.aclose()
+
+@pytest.mark.asyncio
+async def test_failed_warm_up_is_reported_not_raised():
+    registry = _registry()
+    registry.get("key-a")
+
+    assert await registry.warm_up("missing-model") is None
+    assert registry.get_stats()["errors"] == 1
+    assert registry.stats["warmups"] == 0
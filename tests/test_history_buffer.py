@@ -0,0 +1,86 @@
+import pytest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from src.modules.narrative.history import ChannelHistoryBuffer
+
+CHANNEL_ID = 42
+
+def _message(msg_id, content, author_id=1, name="alistair", bot=False):
+    author = SimpleNamespace(id=author_id, name=name, display_name=name.capitalize(), bot=bot)
+    return SimpleNamespace(
+        id=msg_id,
+        channel=SimpleNamespace(id=CHANNEL_ID),
+        author=author,
+        content=content,
+        created_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+
+class FakeChannel:
+    def __init__(self, messages, channel_id=CHANNEL_ID):
+        self.id = channel_id
+        self.messages = messages
+        self.history_calls = 0
+
+    async def _iterate(self, limit):
+        # Discord returns newest first
+        for msg in list(reversed(self.messages))[:limit]:
+            yield msg
+
+    def history(self, limit):
+        self.history_calls += 1
+        return self._iterate(limit)
+
+def test_record_and_recent_order():
+    buffer = ChannelHistoryBuffer(capacity=10)
+    for i in range(1, 6):
+        buffer.record(_message(i, f"msg {i}"))
+
+    recent = buffer.recent(CHANNEL_ID, 3)
+    assert [r.content for r in recent] == ["msg 3", "msg 4", "msg 5"]
+    assert recent[0].display_name == "Alistair"
+
+def test_capacity_is_bounded():
+    buffer = ChannelHistoryBuffer(capacity=3)
+    for i in range(1, 10):
+        buffer.record(_message(i, f"msg {i}"))
+
+    assert [r.id for r in buffer.recent(CHANNEL_ID)] == [7, 8, 9]
+
+def test_edit_and_delete():
+    buffer = ChannelHistoryBuffer()
+    buffer.record(_message(1, "I attack the goblin"))
+    buffer.record(_message(2, "The goblin dodges", author_id=99, bot=True))
+
+    assert buffer.update_content(CHANNEL_ID, 1, "I attack the orc")
+    assert buffer.remove(CHANNEL_ID, 2)
+    assert not buffer.remove(CHANNEL_ID, 2)
+
+    assert [r.content for r in buffer.recent(CHANNEL_ID)] == ["I attack the orc"]
+
+@pytest.mark.asyncio
+async def test_backfill_once_and_merge_with_live_messages():
+    channel = FakeChannel([_message(i, f"old {i}") for i in range(1, 4)])
+    buffer = ChannelHistoryBuffer(capacity=10)
+    # A live edit arrived before the backfill finished
+    buffer.record(_message(3, "old 3 (edited)"))
+    buffer.record(_message(4, "live 4"))
+
+    await buffer.ensure(channel)
+    await buffer.ensure(channel)
+
+    assert channel.history_calls == 1
+    assert buffer.is_backfilled(CHANNEL_ID)
+    assert [r.content for r in buffer.recent(CHANNEL_ID)] == ["old 1", "old 2", "old 3 (edited)", "live 4"]
+
+@pytest.mark.asyncio
+async def test_non_target_channel_is_read_live():
+    other = FakeChannel([_message(1, "first")], channel_id=7)
+    buffer = ChannelHistoryBuffer(capacity=10, channel_id=CHANNEL_ID)
+
+    assert [r.content for r in await buffer.fetch(other, 5)] == ["first"]
+    other.messages.append(_message(2, "posted later"))
+    buffer.record(SimpleNamespace(**{**vars(_message(2, "posted later")), "channel": SimpleNamespace(id=7)}))
+
+    assert [r.content for r in await buffer.fetch(other, 5)] == ["first", "posted later"]
+    assert other.history_calls == 2
+    assert buffer.recent(7) == []
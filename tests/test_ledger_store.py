@@ -0,0 +1,56 @@
+import pytest
+from src.modules.memory.store import LedgerStore
+
+@pytest.fixture
+def memory_dir(tmp_path):
+    d = tmp_path / "memory"
+    d.mkdir()
+    (d / "party.ledger").write_text("| **Hero** | <@1> |", encoding="utf-8")
+    (d / "world.ledger").write_text("The Spire stands.", encoding="utf-8")
+    return d
+
+def test_get_all_matches_ledger_format(memory_dir):
+    store = LedgerStore(str(memory_dir))
+    content = store.get_all()
+
+    assert "--- CAMPAIGN LEDGER: party.ledger ---" in content
+    assert "--- CAMPAIGN LEDGER: world.ledger ---" in content
+    assert content.index("party.ledger") < content.index("world.ledger")
+
+def test_serves_from_memory_until_invalidated(memory_dir):
+    store = LedgerStore(str(memory_dir))
+    store.get_all()
+
+    (memory_dir / "world.ledger").write_text("The Spire has fallen.", encoding="utf-8")
+    assert store.get("world.ledger") == "The Spire stands."
+
+    version = store.version
+    store.invalidate("world.ledger")
+    assert store.version == version + 1
+    assert store.get("world.ledger") == "The Spire has fallen."
+    assert "The Spire has fallen." in store.get_all()
+
+def test_invalidate_new_and_deleted_files(memory_dir):
+    store = LedgerStore(str(memory_dir))
+    assert store.names() == ["party.ledger", "world.ledger"]
+
+    (memory_dir / "npcs.ledger").write_text("Grix the merchant.", encoding="utf-8")
+    store.invalidate("npcs.ledger")
+    (memory_dir / "world.ledger").unlink()
+    store.invalidate("world.ledger")
+
+    assert store.names() == ["npcs.ledger", "party.ledger"]
+    assert store.get("world.ledger") is None
+
+def test_full_invalidate_reloads_directory(memory_dir):
+    store = LedgerStore(str(memory_dir))
+    store.get_all()
+    (memory_dir / "feedback.ledger").write_text("- Loves dragons", encoding="utf-8")
+
+    store.invalidate()
+    assert store.get("feedback.ledger") == "- Loves dragons"
+
+def test_missing_directory_is_empty(tmp_path):
+    store = LedgerStore(str(tmp_path / "nowhere"))
+    assert store.get_all() == ""
+    assert store.get_ledgers() == {}
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from src.modules.memory.worker import LedgerUpdateWorker
+from src.modules.table.state import TableManager, TableState
+
+class RecordingArchitect:
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    async def __call__(self, facts):
+        await asyncio.sleep(self.delay)
+        self.calls.append(facts)
+
+@pytest.mark.asyncio
+async def test_facts_within_window_share_one_call():
+    architect = RecordingArchitect()
+    worker = LedgerUpdateWorker(architect, batch_window=0.05)
+
+    worker.enqueue("- Alistair found a silver key")
+    await asyncio.sleep(0.01)
+    worker.enqueue("- Alistair found a silver key\n- The innkeeper is a spy")
+    assert worker.queue_depth == 2
+
+    await asyncio.sleep(0.12)
+    assert architect.calls == ["- Alistair found a silver key\n- Alistair found a silver key\n- The innkeeper is a spy"]
+    assert worker.queue_depth == 0
+    assert worker.get_stats()["batches"] == 1
+    assert worker.get_stats()["merged"] == 1
+
+def test_repeated_facts_from_different_turns_are_kept():
+    merged = LedgerUpdateWorker.merge_facts([
+        "- Alistair drinks a healing potion\n- Alistair drinks a healing potion",
+        "- Alistair drinks a healing potion",
+    ])
+
+    assert merged == "- Alistair drinks a healing potion\n- Alistair drinks a healing potion"
+
+@pytest.mark.asyncio
+async def test_flush_applies_immediately():
+    architect = RecordingArchitect()
+    worker = LedgerUpdateWorker(architect, batch_window=10.0)
+
+    worker.enqueue("- The bridge collapsed")
+    await worker.flush()
+
+    assert architect.calls == ["- The bridge collapsed"]
+    assert worker.queue_depth == 0
+
+@pytest.mark.asyncio
+async def test_facts_during_update_form_next_batch_and_errors_are_contained():
+    calls = []
+
+    async def architect(facts):
+        calls.append(facts)
+        if len(calls) == 1:
+            raise RuntimeError("architect unavailable")
+
+    worker = LedgerUpdateWorker(architect, batch_window=0.0)
+    worker.enqueue("- first")
+    await asyncio.sleep(0.01)
+    worker.enqueue("- second")
+    await worker.flush()
+
+    assert calls == ["- first", "- second"]
+    assert worker.stats["errors"] == 1
+
+def test_table_manager_notifies_listeners(tmp_path):
+    manager = TableManager(state_file=str(tmp_path / "table_state.json"))
+    seen = []
+    manager.add_listener(lambda old, new: seen.append((old, new)))
+
+    manager.set_state(TableState.ACTIVE)
+    manager.set_state(TableState.PAUSED)
+
+    assert seen == [(TableState.IDLE, TableState.ACTIVE), (TableState.ACTIVE, TableState.PAUSED)]
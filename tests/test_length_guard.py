@@ -0,0 +1,51 @@
+import pytest
+from src.modules.narrative import parser
+from src.modules.narrative.parser import condense_to_limit, apply_length_guard
+from src.modules.narrative.context import output_token_limit
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    for key in parser.length_stats:
+        parser.length_stats[key] = 0
+
+def test_condense_cuts_at_paragraph_boundary():
+    p1, p2, p3 = "A" * 60, "B" * 30, "C" * 40
+    text = f"{p1}\n\n\n\n{p2}\n\n{p3}"
+    assert condense_to_limit(text, limit=100) == f"{p1}\n\n{p2}"
+
+def test_condense_falls_back_to_sentence_and_word():
+    text = "The orc roars. " * 10
+    condensed = condense_to_limit(text, limit=50)
+    assert condensed.endswith("roars.")
+    assert len(condensed) <= 50
+
+    condensed = condense_to_limit("word " * 40, limit=50)
+    assert condensed.endswith("…")
+    assert len(condensed) <= 50
+
+def test_condense_never_leaves_fence_open():
+    text = "Loot found.\n\n**Loot**\n```text\n" + "| gold | 10 |\n" * 20 + "```"
+    condensed = condense_to_limit(text, limit=80)
+    assert condensed.count("```") % 2 == 0
+    assert condensed == "Loot found.\n\n**Loot**"
+
+def test_guard_prefers_local_condensation():
+    text = ("x" * 90 + "\n\n") * 3
+    result, needs_retry = apply_length_guard(text.strip(), limit=200)
+    assert not needs_retry
+    assert len(result) <= 200
+    assert parser.length_stats == {"checked": 1, "overflows": 1, "condensed": 1, "retries": 0}
+
+def test_guard_requests_retry_when_too_much_would_be_lost():
+    text = ("x" * 90 + "\n\n") * 10
+    result, needs_retry = apply_length_guard(text.strip(), limit=200, min_keep=0.6)
+    assert needs_retry
+    assert parser.length_stats["retries"] == 1
+
+    short, needs_retry = apply_length_guard("fine", limit=200)
+    assert (short, needs_retry) == ("fine", False)
+    assert parser.length_stats["checked"] == 2
+
+def test_output_token_limit_leaves_room_for_protocols():
+    assert output_token_limit(1900, protocol_tokens=0) == 950
+    assert output_token_limit(1900) > output_token_limit(1900, protocol_tokens=0)
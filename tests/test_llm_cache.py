@@ -0,0 +1,95 @@
+import asyncio
+import time
+import pytest
+from google.genai import types
+from src.core.llm import LLMProvider
+from src.core.llm_cache import CachingProvider, ResponseCache, cache_key
+
+class CountingProvider(LLMProvider):
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def generate(self, model_name, system_instruction, history, temperature=0.7, static_prefix=None, max_output_tokens=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return f"reply {self.calls}"
+
+def _history(text="Recap the session"):
+    return [types.Content(role="user", parts=[types.Part.from_text(text=text)])]
+
+def test_key_covers_model_instruction_contents_and_temperature():
+    base = cache_key("m", "persona", _history(), 0.7)
+    assert base == cache_key("m", "persona", _history(), 0.7)
+    assert base != cache_key("m2", "persona", _history(), 0.7)
+    assert base != cache_key("m", "persona!", _history(), 0.7)
+    assert base != cache_key("m", "persona", _history("other"), 0.7)
+    assert base != cache_key("m", "persona", _history(), 0.8)
+
+@pytest.mark.asyncio
+async def test_calls_are_cached_only_when_opted_in():
+    inner = CountingProvider()
+    provider = CachingProvider(inner, ResponseCache())
+
+    assert await provider.generate("m", "sys", _history()) == "reply 1"
+    assert await provider.generate("m", "sys", _history()) == "reply 2"
+    assert await provider.generate("m", "sys", _history(), use_cache=True) == "reply 3"
+    assert await provider.generate("m", "sys", _history(), use_cache=True) == "reply 3"
+
+    assert inner.calls == 3
+    stats = provider.get_stats()
+    assert stats["memory_hits"] == 1
+    assert stats["bypassed"] == 2
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_generation():
+    inner = CountingProvider(delay=0.02)
+    provider = CachingProvider(inner)
+
+    results = await asyncio.gather(*[provider.generate("m", "sys", ["same"], use_cache=True) for _ in range(3)])
+
+    assert results == ["reply 1"] * 3
+    assert inner.calls == 1
+    assert provider.stats["coalesced"] == 2
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_lets_waiters_retry():
+    inner = CountingProvider(delay=0.05)
+    provider = CachingProvider(inner)
+
+    leader = asyncio.create_task(provider.generate("m", "sys", ["same"], use_cache=True))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(provider.generate("m", "sys", ["same"], use_cache=True))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await waiter == "reply 2"
+    assert leader.cancelled()
+    assert inner.calls == 2
+
+def test_lru_eviction_and_ttl():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.stats["evictions"] == 1
+
+    cache._entries["a"] = (time.time() - 120, "A")
+    assert cache.get("a") is None
+
+def test_disk_tier_survives_restart_and_is_bounded(tmp_path):
+    cache = ResponseCache(disk_dir=str(tmp_path), max_disk_entries=2)
+    for key in ["k1", "k2", "k3"]:
+        cache.put(key, key.upper())
+    kept = sorted(p.stem for p in tmp_path.glob("*.json"))
+    assert len(kept) == 2
+
+    restarted = ResponseCache(disk_dir=str(tmp_path))
+    assert restarted.get(kept[0]) == kept[0].upper()
+    assert restarted.stats["disk_hits"] == 1
+    assert restarted.get(kept[0]) == kept[0].upper()
+    assert restarted.stats["memory_hits"] == 1
@@ -0,0 +1,190 @@
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from google.genai import types
+from src.core.llm import DYNAMIC_CONTEXT_HEADER, GeminiProvider
+
+class FakeGenAIClient:
+    """Local stand-in for genai.Client that records every call made through `aio`."""
+
+    def __init__(self, fail_create=False):
+        self.generate_calls = []
+        self.created = []
+        self.updated = []
+        self.deleted = []
+        self.fail_create = fail_create
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(generate_content=self._generate_content, generate_content_stream=self._generate_content_stream),
+            caches=SimpleNamespace(create=self._create, update=self._update, delete=self._delete),
+        )
+
+    async def _generate_content(self, model, contents, config):
+        self.generate_calls.append({"model": model, "contents": contents, "config": config})
+        return SimpleNamespace(text="The GM speaks.")
+
+    async def _generate_content_stream(self, model, contents, config):
+        self.generate_calls.append({"model": model, "contents": contents, "config": config, "stream": True})
+
+        async def chunks():
+            for text in ["The GM ", None, "speaks."]:
+                yield SimpleNamespace(text=text)
+        return chunks()
+
+    async def _create(self, model, config):
+        if self.fail_create:
+            raise RuntimeError("Cached content is too small")
+        name = f"cachedContents/{len(self.created) + 1}"
+        self.created.append({"model": model, "name": name, "config": config})
+        return SimpleNamespace(name=name)
+
+    async def _update(self, name, config):
+        self.updated.append(name)
+
+    async def _delete(self, name):
+        self.deleted.append(name)
+
+def _history():
+    return [types.Content(role="user", parts=[types.Part.from_text(text="Alistair: I open the door.")])]
+
+@pytest.mark.asyncio
+async def test_cache_disabled_sends_full_instruction():
+    client = FakeGenAIClient()
+    provider = GeminiProvider(api_key="x", client=client)
+
+    await provider.generate("gm-model", "PERSONA+STATE", _history(), static_prefix="PERSONA")
+
+    call = client.generate_calls[0]
+    assert call["config"].system_instruction == "PERSONA+STATE"
+    assert call["config"].cached_content is None
+    assert client.created == []
+
+@pytest.mark.asyncio
+async def test_cached_prefix_reused_across_calls():
+    client = FakeGenAIClient()
+    provider = GeminiProvider(api_key="x", client=client, context_cache=True)
+
+    await provider.generate("gm-model", "PERSONA\n# STATE A", _history(), static_prefix="PERSONA")
+    await provider.generate("gm-model", "PERSONA\n# STATE B", _history(), static_prefix="PERSONA")
+
+    assert len(client.created) == 1
+    assert client.created[0]["config"].system_instruction == "PERSONA"
+    for call, state in zip(client.generate_calls, ["# STATE A", "# STATE B"]):
+        assert call["config"].cached_content == "cachedContents/1"
+        assert call["config"].system_instruction is None
+        assert call["contents"][0].parts[0].text == DYNAMIC_CONTEXT_HEADER + state
+    assert provider.cache_manager.stats["reused"] == 1
+
+@pytest.mark.asyncio
+async def test_changed_prefix_recreates_handle():
+    client = FakeGenAIClient()
+    provider = GeminiProvider(api_key="x", client=client, context_cache=True)
+
+    await provider.generate("gm-model", "PERSONA v1", _history(), static_prefix="PERSONA v1")
+    await provider.generate("gm-model", "PERSONA v2", _history(), static_prefix="PERSONA v2")
+
+    assert [c["name"] for c in client.created] == ["cachedContents/1", "cachedContents/2"]
+    assert client.deleted == ["cachedContents/1"]
+    assert client.generate_calls[1]["config"].cached_content == "cachedContents/2"
+
+@pytest.mark.asyncio
+async def test_ttl_refreshed_when_half_expired():
+    client = FakeGenAIClient()
+    provider = GeminiProvider(api_key="x", client=client, context_cache=True, cache_ttl=100)
+
+    await provider.generate("gm-model", "PERSONA", _history(), static_prefix="PERSONA")
+    provider.cache_manager._handles["gm-model"].expires_at = time.time() + 10
+    await provider.generate("gm-model", "PERSONA", _history(), static_prefix="PERSONA")
+
+    assert client.updated == ["cachedContents/1"]
+    assert len(client.created) == 1
+
+@pytest.mark.asyncio
+async def test_create_failure_falls_back_without_retrying():
+    client = FakeGenAIClient(fail_create=True)
+    provider = GeminiProvider(api_key="x", client=client, context_cache=True)
+
+    await provider.generate("gm-model", "PERSONA", _history(), static_prefix="PERSONA")
+    await provider.generate("gm-model", "PERSONA", _history(), static_prefix="PERSONA")
+
+    assert provider.cache_manager.stats["failures"] == 1
+    assert all(c["config"].system_instruction == "PERSONA" for c in client.generate_calls)
+
+@pytest.mark.asyncio
+async def test_generate_stream_yields_text_deltas():
+    client = FakeGenAIClient()
+    provider = GeminiProvider(api_key="x", client=client, context_cache=True)
+
+    deltas = [d async for d in provider.generate_stream("gm-model", "PERSONA\n# STATE", _history(), static_prefix="PERSONA")]
+
+    assert deltas == ["The GM ", "speaks."]
+    assert client.generate_calls[0]["stream"]
+    assert client.generate_calls[0]["config"].cached_content == "cachedContents/1"
+
+@pytest.mark.asyncio
+async def test_max_output_tokens_is_forwarded():
+    client = FakeGenAIClient()
+    provider = GeminiProvider(api_key="x", client=client, context_cache=True)
+
+    await provider.generate("gm-model", "PERSONA", _history(), max_output_tokens=1200)
+    await provider.generate("gm-model", "PERSONA\n# STATE", _history(), static_prefix="PERSONA", max_output_tokens=1200)
+
+    assert [c["config"].max_output_tokens for c in client.generate_calls] == [1200, 1200]
+    assert client.generate_calls[1]["config"].cached_content == "cachedContents/1"
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_create_one_handle():
+    client = FakeGenAIClient()
+    create = client._create
+
+    async def slow_create(model, config):
+        await asyncio.sleep(0.01)
+        return await create(model, config)
+
+    client.aio.caches.create = slow_create
+    provider = GeminiProvider(api_key="x", client=client, context_cache=True)
+
+    await asyncio.gather(*(provider.generate("gm-model", "PERSONA", _history(), static_prefix="PERSONA") for _ in range(3)))
+
+    assert len(client.created) == 1
+    assert client.deleted == []
+    assert {c["config"].cached_content for c in client.generate_calls} == {"cachedContents/1"}
+
+class APIError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+def _failing_cached_calls(client, error):
+    generate = client._generate_content
+
+    async def generate_content(model, contents, config):
+        if config.cached_content:
+            client.generate_calls.append({"model": model, "contents": contents, "config": config})
+            raise error
+        return await generate(model, contents, config)
+
+    client.aio.models.generate_content = generate_content
+
+@pytest.mark.asyncio
+async def test_expired_cache_falls_back_to_full_prompt():
+    client = FakeGenAIClient()
+    _failing_cached_calls(client, APIError(404, "CachedContent not found (or permission denied)"))
+    provider = GeminiProvider(api_key="x", client=client, context_cache=True)
+
+    assert await provider.generate("gm-model", "PERSONA\n# STATE", _history(), static_prefix="PERSONA") == "The GM speaks."
+
+    assert client.generate_calls[1]["config"].system_instruction == "PERSONA\n# STATE"
+    assert "gm-model" not in provider.cache_manager._handles
+
+@pytest.mark.asyncio
+async def test_rate_limit_keeps_cache_and_is_not_resent():
+    client = FakeGenAIClient()
+    _failing_cached_calls(client, APIError(429, "Resource has been exhausted"))
+    provider = GeminiProvider(api_key="x", client=client, context_cache=True)
+
+    with pytest.raises(APIError):
+        await provider.generate("gm-model", "PERSONA\n# STATE", _history(), static_prefix="PERSONA")
+
+    assert len(client.generate_calls) == 1  # Backoff is ResilientProvider's job
+    assert provider.cache_manager._handles["gm-model"].name == "cachedContents/1"
@@ -0,0 +1,58 @@
+import json
+import pytest
+from src.core.llm import LLMProvider, ProviderFactory
+from src.core.llm_replay import RecordingProvider, ReplayProvider, ReplayMissError
+
+class EchoProvider(LLMProvider):
+    async def generate(self, model_name, system_instruction, history, **kwargs):
+        return f"{model_name}: {history[-1]}"
+
+@pytest.mark.asyncio
+async def test_record_then_replay_offline(tmp_path):
+    fixture = tmp_path / "calls.jsonl"
+    recorder = RecordingProvider(EchoProvider(), str(fixture))
+    await recorder.generate("gm", "sys", ["I open the door"], temperature=0.7)
+    await recorder.generate("architect", "arch", ["- facts"], temperature=0.1)
+    streamed = [d async for d in recorder.generate_stream("gm", "sys", ["I knock"])]
+
+    records = [json.loads(line) for line in fixture.read_text().splitlines()]
+    assert [r["model"] for r in records] == ["gm", "architect", "gm"]
+    assert records[2]["stream"] and records[2]["deltas"][0][1] == streamed[0]
+    assert all(r["latency"] >= 0 for r in records)
+
+    replay = ProviderFactory.get_provider("replay", replay_file=str(fixture))
+    assert await replay.generate("architect", "arch", ["- facts"], temperature=0.1) == "architect: - facts"
+    assert await replay.generate("gm", "sys", ["I open the door"]) == "gm: I open the door"
+    assert [d async for d in replay.generate_stream("gm", "sys", ["I knock"])] == streamed
+    assert replay.stats["hits"] == 3
+
+@pytest.mark.asyncio
+async def test_unknown_request_strict_and_fallback(tmp_path):
+    fixture = tmp_path / "calls.jsonl"
+    recorder = RecordingProvider(EchoProvider(), str(fixture))
+    await recorder.generate("gm", "sys", ["first"])
+    await recorder.generate("gm", "sys", ["second"])
+
+    with pytest.raises(ReplayMissError):
+        await ReplayProvider(str(fixture)).generate("gm", "sys", ["drifted prompt"])
+
+    lenient = ReplayProvider(str(fixture), strict=False)
+    assert await lenient.generate("gm", "sys", ["drifted"]) == "gm: first"
+    assert await lenient.generate("gm", "sys", ["drifted again"]) == "gm: second"
+    assert lenient.stats["fallbacks"] == 2
+
+@pytest.mark.asyncio
+async def test_realtime_replay_honours_recorded_latency(tmp_path):
+    fixture = tmp_path / "calls.jsonl"
+    fixture.write_text(json.dumps({"key": "k", "model": "gm", "stream": False, "response": "slow", "latency": 0.05}) + "\n")
+
+    import time
+    fast = ReplayProvider(str(fixture))
+    started = time.perf_counter()
+    await fast.replay(fast.records[0])
+    assert time.perf_counter() - started < 0.04
+
+    slow = ReplayProvider(str(fixture), realtime=True)
+    started = time.perf_counter()
+    await slow.replay(slow.records[0])
+    assert time.perf_counter() - started >= 0.045
@@ -0,0 +1,52 @@
+import os
+import pytest
+from src.modules.narrative.loader import SystemInstructionCache
+
+@pytest.fixture
+def sources(tmp_path):
+    persona = tmp_path / "gm_persona.md"
+    persona.write_text("You are the GM.", encoding="utf-8")
+    knowledge = tmp_path / "knowledge"
+    knowledge.mkdir()
+    (knowledge / "rules.md").write_text("Roll 2d6.", encoding="utf-8")
+    return persona, knowledge
+
+def test_cache_hit_on_unchanged_files(sources):
+    persona, knowledge = sources
+    cache = SystemInstructionCache(persona, knowledge)
+
+    first = cache.get()
+    second = cache.get()
+
+    assert first is second
+    assert "You are the GM." in first
+    assert "--- FILE: rules.md ---" in first
+    assert cache.get_stats()["misses"] == 1
+    assert cache.get_stats()["hits"] == 1
+
+def test_cache_rebuilds_when_knowledge_changes(sources):
+    persona, knowledge = sources
+    cache = SystemInstructionCache(persona, knowledge)
+    cache.get()
+
+    rules = knowledge / "rules.md"
+    rules.write_text("Roll 2d6+1 for everything.", encoding="utf-8")
+    st = rules.stat()
+    os.utime(rules, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    assert "2d6+1" in cache.get()
+    assert cache.misses == 2
+
+def test_cache_rebuilds_when_file_added(sources):
+    persona, knowledge = sources
+    cache = SystemInstructionCache(persona, knowledge)
+    cache.get()
+
+    (knowledge / "setting.md").write_text("The Spire.", encoding="utf-8")
+
+    assert "--- FILE: setting.md ---" in cache.get()
+    assert cache.misses == 2
+
+def test_missing_persona_uses_default(tmp_path):
+    cache = SystemInstructionCache(tmp_path / "missing.md", tmp_path / "knowledge")
+    assert cache.get() == "You are an amazing Game Master."
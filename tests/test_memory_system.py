@@ -69,6 +69,7 @@ async def test_update_ledgers_logic(mock_save, mock_load, mock_gen, temp_memory_
         await update_ledgers_logic("Fact to add")
     
     mock_gen.assert_called_once()
+    assert not mock_gen.call_args.kwargs.get("use_cache")  # A malformed reply must not be replayed
     mock_save.assert_called_once_with("FILE: update.ledger\nNew content")
 
 def test_save_ledger_files_extension_handling(temp_memory_dir):
@@ -0,0 +1,77 @@
+import pytest
+from types import SimpleNamespace
+from google.genai import types
+from src.core.llm import GeminiProvider
+from src.core.llm_cache import contents_fingerprint
+from src.core.messages import ChatMessage, ConversionCache, message_text, to_gemini_contents
+from src.core.ollama import history_to_messages
+
+def test_message_is_compact():
+    message = ChatMessage.user("I open the door.", author="Alistair", message_id=1)
+
+    assert not hasattr(message, "__dict__")
+    with pytest.raises(AttributeError):
+        message.extra = 1
+    assert message.content == "Alistair: I open the door."
+    assert ChatMessage.model("It creaks.").content == "It creaks."
+
+def test_conversion_is_cached_by_message_id():
+    cache = ConversionCache()
+    first = cache.convert(ChatMessage.user("Hello", author="Alistair", message_id=7), "gemini")
+    again = cache.convert(ChatMessage.user("Hello", author="Alistair", message_id=7), "gemini")
+
+    assert again is first
+    assert cache.stats == {"hits": 1, "misses": 1}
+    assert first.role == "user" and first.parts[0].text == "Alistair: Hello"
+
+def test_edited_message_is_reconverted():
+    cache = ConversionCache()
+    before = cache.convert(ChatMessage.user("Hello", message_id=7), "gemini")
+    after = cache.convert(ChatMessage.user("Hello there", message_id=7), "gemini")
+
+    assert after is not before
+    assert after.parts[0].text == "Hello there"
+    assert cache.stats["hits"] == 0
+
+def test_cache_is_bounded():
+    cache = ConversionCache(max_entries=2)
+    for i in range(3):
+        cache.convert(ChatMessage.user("x", message_id=i), "chat")
+
+    assert [key for key in cache._entries] == [("chat", 1), ("chat", 2)]
+
+def test_formats_and_passthrough():
+    content = types.Content(role="user", parts=[types.Part.from_text(text="Raw")])
+    history = [ChatMessage.user("Hi", author="Bo"), ChatMessage.model("Welcome."), content]
+
+    contents = to_gemini_contents(history)
+    assert [c.role for c in contents] == ["user", "model", "user"]
+    assert contents[2] is content
+    assert history_to_messages("", history) == [
+        {"role": "user", "content": "Bo: Hi"},
+        {"role": "assistant", "content": "Welcome."},
+        {"role": "user", "content": "Raw"},
+    ]
+    assert [message_text(item) for item in history] == ["Bo: Hi", "Welcome.", "Raw"]
+
+def test_fingerprint_matches_equivalent_content():
+    message = ChatMessage.user("I open the door.", author="Alistair")
+    content = types.Content(role="user", parts=[types.Part.from_text(text="Alistair: I open the door.")])
+
+    assert contents_fingerprint([message]) == contents_fingerprint([content])
+
+@pytest.mark.asyncio
+async def test_gemini_provider_receives_converted_contents():
+    calls = []
+
+    async def generate_content(model, contents, config):
+        calls.append(contents)
+        return SimpleNamespace(text="ok", usage_metadata=None)
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+    provider = GeminiProvider(api_key="x", client=client)
+
+    await provider.generate("m", "sys", [ChatMessage.user("Hello", author="Alistair", message_id=3)])
+
+    assert isinstance(calls[0][0], types.Content)
+    assert calls[0][0].parts[0].text == "Alistair: Hello"
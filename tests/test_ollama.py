@@ -0,0 +1,182 @@
+import asyncio
+import json
+import pytest
+from aiohttp import web
+from google.genai import types
+from src.core.llm import ProviderFactory, ResilientProvider
+from src.core.ollama import OllamaError, OllamaProvider, PrefixRouter, history_to_messages
+
+class StandInServer:
+    """Minimal Ollama-compatible server on a random local port."""
+
+    def __init__(self, delay=0.0, fail_status=None):
+        self.delay = delay
+        self.fail_status = fail_status
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+
+    async def chat(self, request):
+        payload = await request.json()
+        self.requests.append(payload)
+        if self.fail_status:
+            return web.json_response({"error": "model overloaded"}, status=self.fail_status)
+
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+
+        reply = f"echo: {payload['messages'][-1]['content']}"
+        if not payload["stream"]:
+            return web.json_response({"model": payload["model"], "message": {"role": "assistant", "content": reply}, "done": True})
+
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for word in reply.split(" "):
+            chunk = {"message": {"role": "assistant", "content": word + " "}, "done": False}
+            await response.write((json.dumps(chunk) + "\n").encode())
+        await response.write((json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}) + "\n").encode())
+        await response.write_eof()
+        return response
+
+    async def generate(self, request):
+        self.requests.append(await request.json())
+        return web.json_response({"done": True})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/api/chat", self.chat)
+        app.router.add_post("/api/generate", self.generate)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+def test_history_conversion():
+    history = [
+        types.Content(role="user", parts=[types.Part(text="I open the door.")]),
+        types.Content(role="model", parts=[types.Part(text="It creaks."), types.Part(text=" Cold air.")]),
+        "raw string",
+    ]
+
+    assert history_to_messages("Be the GM.", history) == [
+        {"role": "system", "content": "Be the GM."},
+        {"role": "user", "content": "I open the door."},
+        {"role": "assistant", "content": "It creaks. Cold air."},
+        {"role": "user", "content": "raw string"},
+    ]
+
+@pytest.mark.asyncio
+async def test_generate_sends_keep_alive_and_options():
+    async with StandInServer() as server:
+        provider = OllamaProvider(host=server.url, keep_alive="1h")
+        try:
+            text = await provider.generate("llama3.1", "sys", ["hello"], temperature=0.2, max_output_tokens=64)
+        finally:
+            await provider.aclose()
+
+    assert text == "echo: hello"
+    payload = server.requests[0]
+    assert payload["model"] == "llama3.1"
+    assert payload["keep_alive"] == "1h"
+    assert payload["stream"] is False
+    assert payload["options"] == {"temperature": 0.2, "num_predict": 64}
+
+@pytest.mark.asyncio
+async def test_stream_yields_deltas():
+    async with StandInServer() as server:
+        provider = OllamaProvider(host=server.url)
+        try:
+            deltas = [d async for d in provider.generate_stream("llama3.1", "sys", ["a b c"])]
+        finally:
+            await provider.aclose()
+
+    assert len(deltas) == 4
+    assert "".join(deltas).strip() == "echo: a b c"
+    assert provider.stats["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    async with StandInServer(delay=0.05) as server:
+        provider = OllamaProvider(host=server.url, max_concurrency=2)
+        try:
+            results = await asyncio.gather(*(provider.generate("llama3.1", "", [f"m{i}"]) for i in range(6)))
+        finally:
+            await provider.aclose()
+
+    assert sorted(results) == sorted(f"echo: m{i}" for i in range(6))
+    assert server.max_active == 2
+    assert provider.stats["max_in_flight"] == 2
+    assert provider.stats["requests"] == 6
+
+@pytest.mark.asyncio
+async def test_http_errors_carry_status_for_retries():
+    async with StandInServer(fail_status=503) as server:
+        provider = OllamaProvider(host=server.url)
+        resilient = ResilientProvider(provider, max_retries=1, backoff_base=0.0, timeout=None)
+        try:
+            with pytest.raises(OllamaError) as err:
+                await resilient.generate("llama3.1", "", ["hi"])
+        finally:
+            await provider.aclose()
+
+    assert err.value.code == 503
+    assert len(server.requests) == 2  # Retried once
+    assert provider.stats["errors"] == 2
+
+@pytest.mark.asyncio
+async def test_preload_pins_model():
+    async with StandInServer() as server:
+        provider = OllamaProvider(host=server.url, keep_alive=-1)
+        try:
+            assert await provider.preload("llama3.1") is True
+        finally:
+            await provider.aclose()
+
+    assert server.requests == [{"model": "llama3.1", "keep_alive": -1}]
+
+@pytest.mark.asyncio
+async def test_preload_failure_is_reported_not_raised():
+    provider = OllamaProvider(host="http://127.0.0.1:9", timeout=2.0)
+    try:
+        assert await provider.preload("llama3.1") is False
+    finally:
+        await provider.aclose()
+
+@pytest.mark.asyncio
+async def test_prefix_router_sends_prefixed_models_to_ollama():
+    async with StandInServer() as server:
+        local = OllamaProvider(host=server.url)
+
+        class Remote:
+            calls = []
+            async def generate(self, model_name, system_instruction, history, **kwargs):
+                self.calls.append(model_name)
+                return "remote"
+
+        remote = Remote()
+        router = PrefixRouter(remote, {"ollama": local})
+        try:
+            assert await router.generate("ollama:llama3.1:8b", "", ["x"]) == "echo: x"
+            assert await router.generate("gemini-2.0-flash", "", ["x"]) == "remote"
+        finally:
+            await local.aclose()
+
+    assert server.requests[0]["model"] == "llama3.1:8b"
+    assert remote.calls == ["gemini-2.0-flash"]
+
+def test_factory_builds_ollama_provider():
+    provider = ProviderFactory.get_provider("ollama", ollama_host="http://gpu-box:11434/", ollama_max_concurrency=4)
+
+    assert isinstance(provider, OllamaProvider)
+    assert provider.host == "http://gpu-box:11434"
+    assert provider.max_concurrency == 4
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from src.core.rate_limit import RateLimitedProvider, RateLimiter, TokenBucket, estimate_tokens
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class EchoProvider:
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, model_name, system_instruction, history, **kwargs):
+        self.calls.append(kwargs)
+        return "x" * 400
+
+    async def generate_stream(self, model_name, system_instruction, history, **kwargs):
+        for part in ("ab", "cd"):
+            yield part
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock=clock)  # 1 unit per second
+
+    bucket.take(60)
+    assert bucket.delay(1) == pytest.approx(1.0)
+    clock.now = 30
+    assert bucket.delay(30) == 0.0
+    assert bucket.delay(31) == pytest.approx(1.0)
+
+def test_bucket_reserve_and_oversized_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(100, clock=clock)
+
+    bucket.take(70)
+    assert bucket.delay(10) == 0.0
+    assert bucket.delay(10, reserve=30) > 0  # Would dip into the reserve
+    # Larger than the bucket: waits for a full bucket instead of forever
+    bucket.level = 100
+    assert bucket.delay(500, reserve=20) == 0.0
+
+def test_estimate_tokens_counts_input_and_output():
+    assert estimate_tokens("a" * 40, ["b" * 40], max_output_tokens=100) == 120
+    assert estimate_tokens("", [], output_guess=0) == 0
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_by_priority():
+    limiter = RateLimiter(rpm=6000, reserve=0.0)  # 100 requests per second
+    limiter.buckets["requests"].level = 0
+    order = []
+
+    async def call(caller):
+        await limiter.acquire(1, caller)
+        order.append(caller)
+
+    tasks = []
+    for caller in ("rebuild", "architect", "feedback", "gm"):
+        tasks.append(asyncio.create_task(call(caller)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+    assert order == ["gm", "feedback", "architect", "rebuild"]
+    stats = limiter.get_stats()
+    assert stats["queue_depth"] == 0
+    assert stats["callers"]["rebuild"]["max_wait_ms"] >= stats["callers"]["gm"]["max_wait_ms"]
+
+@pytest.mark.asyncio
+async def test_background_calls_leave_reserve_for_narration():
+    limiter = RateLimiter(rpm=6000, reserve=0.5)
+    limiter.buckets["requests"].level = 3000  # Exactly the reserve
+
+    rebuild = asyncio.create_task(limiter.acquire(1, "rebuild"))
+    await asyncio.sleep(0)
+    waited = await asyncio.wait_for(limiter.acquire(1, "gm"), 0.5)
+
+    assert waited < 0.05
+    assert not rebuild.done()
+    rebuild.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await rebuild
+    assert limiter.queue_depth == 0
+
+@pytest.mark.asyncio
+async def test_provider_consumes_and_settles_tokens():
+    inner = EchoProvider()
+    limiter = RateLimiter(tpm=10000)
+    provider = RateLimitedProvider(inner, limiter)
+
+    text = await provider.generate("m", "s" * 40, ["h" * 40], max_output_tokens=1000, caller="feedback", use_cache=True)
+
+    assert len(text) == 400
+    assert inner.calls == [{"max_output_tokens": 1000, "use_cache": True}]  # caller is consumed here
+    # Charged 20 input + 100 output tokens after the 1000-token reservation was refunded
+    assert limiter.buckets["tokens"].level == pytest.approx(10000 - 120, abs=1)
+    assert limiter.get_stats()["callers"]["feedback"]["calls"] == 1
+
+@pytest.mark.asyncio
+async def test_stream_acquires_quota():
+    limiter = RateLimiter(rpm=60)
+    provider = RateLimitedProvider(EchoProvider(), limiter)
+
+    deltas = [d async for d in provider.generate_stream("m", "", [], caller="gm")]
+
+    assert deltas == ["ab", "cd"]
+    assert limiter.buckets["requests"].level == pytest.approx(59, abs=0.1)
@@ -0,0 +1,125 @@
+import asyncio
+import pytest
+from google.genai import errors
+from src.core.llm import LLMProvider, ResilientProvider, CircuitBreaker, CircuitOpenError, is_retryable
+
+def _api_error(code):
+    return errors.APIError(code, {"error": {"code": code, "message": "boom", "status": "X"}})
+
+class ScriptedProvider(LLMProvider):
+    """Fails with the scripted errors first, then answers; `delays` are per-call sleeps."""
+
+    def __init__(self, failures=(), delays=()):
+        self.failures = list(failures)
+        self.delays = list(delays)
+        self.calls = 0
+        self.deadlines = []
+
+    async def generate(self, model_name, system_instruction, history, deadline=None, **kwargs):
+        self.calls += 1
+        self.deadlines.append(deadline)
+        if self.delays:
+            await asyncio.sleep(self.delays.pop(0))
+        if self.failures:
+            raise self.failures.pop(0)
+        return f"answer {self.calls}"
+
+    async def generate_stream(self, model_name, system_instruction, history, **kwargs):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        for word in ["The ", "GM"]:
+            yield word
+
+def _provider(inner, **kwargs):
+    kwargs.setdefault("backoff_base", 0.001)
+    return ResilientProvider(inner, **kwargs)
+
+def test_retryable_classification():
+    assert is_retryable(_api_error(429))
+    assert is_retryable(_api_error(503))
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(_api_error(400))
+    assert not is_retryable(ValueError("bad"))
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors_then_succeeds():
+    inner = ScriptedProvider(failures=[_api_error(429), _api_error(503)])
+    provider = _provider(inner)
+
+    assert await provider.generate("gm", "sys", []) == "answer 3"
+    assert provider.stats["retries"] == 2
+    assert provider.stats["successes"] == 1
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_fail_immediately():
+    inner = ScriptedProvider(failures=[_api_error(400)])
+    provider = _provider(inner)
+
+    with pytest.raises(errors.APIError):
+        await provider.generate("gm", "sys", [])
+    assert inner.calls == 1
+    assert provider.breakers["gm"].state == "closed"
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_fails_fast():
+    inner = ScriptedProvider(failures=[_api_error(503)] * 10)
+    provider = _provider(inner, max_retries=5, breaker_threshold=2, breaker_reset=60)
+
+    with pytest.raises(errors.APIError):
+        await provider.generate("gm", "sys", [])
+    assert inner.calls == 2
+    with pytest.raises(CircuitOpenError):
+        await provider.generate("gm", "sys", [])
+    assert inner.calls == 2
+
+    # Other models are unaffected
+    inner.failures.clear()
+    assert await provider.generate("architect", "sys", []) == "answer 3"
+    stats = provider.get_stats()
+    assert stats["breaker_opened"] == 1
+    assert stats["breaker_rejected"] == 1
+    assert stats["open_breakers"] == ["gm"]
+
+def test_breaker_half_open_probe():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_attempts_and_is_forwarded():
+    inner = ScriptedProvider(delays=[1.0])
+    provider = _provider(inner, timeout=0.05, max_retries=3)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await provider.generate("gm", "sys", [])
+    assert inner.calls == 1
+    assert inner.deadlines[0] is not None
+    assert provider.stats["timeouts"] == 1
+
+@pytest.mark.asyncio
+async def test_hedge_wins_when_primary_is_slow():
+    inner = ScriptedProvider(delays=[0.0] * 5 + [0.5, 0.0])
+    provider = _provider(inner, hedge_percentile=95, hedge_min_samples=5)
+    for _ in range(5):
+        await provider.generate("gm", "sys", [])
+
+    assert await provider.generate("gm", "sys", []) == "answer 7"
+    assert provider.stats["hedges"] == 1
+    assert provider.stats["hedge_wins"] == 1
+
+@pytest.mark.asyncio
+async def test_stream_retries_before_first_delta():
+    inner = ScriptedProvider(failures=[_api_error(500)])
+    provider = _provider(inner)
+
+    deltas = [d async for d in provider.generate_stream("gm", "sys", [])]
+    assert deltas == ["The ", "GM"]
+    assert provider.stats["retries"] == 1
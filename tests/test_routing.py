@@ -0,0 +1,125 @@
+import pytest
+from src.core.llm import CircuitOpenError
+from src.core.routing import ModelHealth, ModelRouter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TimedProvider:
+    """Fake provider: each model takes `latency[model]` fake seconds; models in `failing` raise."""
+
+    def __init__(self, clock, latency=None, failing=()):
+        self.clock = clock
+        self.latency = latency or {}
+        self.failing = set(failing)
+        self.calls = []
+
+    async def generate(self, model_name, system_instruction, history, **kwargs):
+        self.calls.append(model_name)
+        self.clock.now += self.latency.get(model_name, 1.0)
+        if model_name in self.failing:
+            raise CircuitOpenError(f"{model_name} is down")
+        return f"from {model_name}"
+
+    async def generate_stream(self, model_name, system_instruction, history, **kwargs):
+        self.calls.append(model_name)
+        if model_name in self.failing:
+            raise CircuitOpenError(f"{model_name} is down")
+        yield f"from {model_name}"
+
+def _router(clock, inner, **kwargs):
+    settings = dict(p95_slo=5.0, error_budget=0.25, window=300.0, min_samples=3, probe_interval=60.0, clock=clock)
+    settings.update(kwargs)
+    return ModelRouter(inner, {"gm": "fast-model", "architect": ""}, **settings)
+
+def test_health_window_expires_samples():
+    clock = FakeClock()
+    health = ModelHealth(window=10.0, clock=clock)
+    for seconds in (1.0, 2.0, 30.0):
+        health.record(seconds, ok=True)
+    health.record(1.0, ok=False)
+
+    snap = health.snapshot()
+    assert snap["calls"] == 4
+    assert snap["p95"] == 30.0
+    assert snap["error_rate"] == 0.25
+
+    clock.now = 11.0
+    assert health.snapshot()["calls"] == 0
+
+@pytest.mark.asyncio
+async def test_slow_primary_falls_back_and_recovers():
+    clock = FakeClock()
+    inner = TimedProvider(clock, latency={"slow-model": 12.0, "fast-model": 0.5})
+    router = _router(clock, inner)
+
+    for _ in range(3):
+        assert await router.generate("slow-model", "", [], caller="gm") == "from slow-model"
+
+    # p95 breached: the next calls go to the fallback
+    assert await router.generate("slow-model", "", [], caller="gm") == "from fast-model"
+    assert router.get_stats()["degraded"] == {"gm": "p95 12.0s > 5.0s"}
+    assert router.decisions[-1] == {"caller": "gm", "model": "fast-model", "kind": "fallback", "reason": "p95 12.0s > 5.0s"}
+
+    # After the probe interval one call checks the primary again
+    clock.now += 61
+    inner.latency["slow-model"] = 0.5
+    assert await router.generate("slow-model", "", [], caller="gm") == "from slow-model"
+    assert router.stats["probes"] == 1
+
+    # Once the old slow samples leave the window, the persona is routed back
+    clock.now += 301
+    assert await router.generate("slow-model", "", [], caller="gm") == "from slow-model"
+    assert router.get_stats()["degraded"] == {}
+
+@pytest.mark.asyncio
+async def test_failed_call_is_rescued_on_fallback():
+    clock = FakeClock()
+    inner = TimedProvider(clock, failing={"primary"})
+    router = _router(clock, inner)
+
+    assert await router.generate("primary", "", [], caller="gm") == "from fast-model"
+    assert inner.calls == ["primary", "fast-model"]
+    assert router.stats["rescued"] == 1
+    assert router.get_stats()["models"]["primary"]["error_rate"] == 1.0
+
+@pytest.mark.asyncio
+async def test_error_budget_triggers_fallback():
+    clock = FakeClock()
+    inner = TimedProvider(clock, failing={"primary"})
+    router = _router(clock, inner)
+
+    for _ in range(3):
+        await router.generate("primary", "", [], caller="gm")
+    inner.calls.clear()
+
+    assert await router.generate("primary", "", [], caller="gm") == "from fast-model"
+    assert inner.calls == ["fast-model"]
+    assert router.get_stats()["degraded"]["gm"].startswith("errors 100%")
+
+@pytest.mark.asyncio
+async def test_personas_without_fallback_pass_through():
+    clock = FakeClock()
+    inner = TimedProvider(clock, failing={"primary"})
+    router = _router(clock, inner)
+
+    with pytest.raises(CircuitOpenError):
+        await router.generate("primary", "", [], caller="architect")
+    with pytest.raises(CircuitOpenError):
+        await router.generate("primary", "", [])
+    assert router.stats["primary"] == 0
+
+@pytest.mark.asyncio
+async def test_stream_is_rescued_before_first_delta():
+    clock = FakeClock()
+    inner = TimedProvider(clock, failing={"primary"})
+    router = _router(clock, inner)
+
+    deltas = [d async for d in router.generate_stream("primary", "", [], caller="gm")]
+
+    assert deltas == ["from fast-model"]
+    assert inner.calls == ["primary", "fast-model"]
@@ -0,0 +1,159 @@
+import pytest
+from src.modules.narrative.parser import StreamingProtocolParser, pending_rolls, process_response_formatting, register_roll_calls
+from src.modules.narrative.streaming import NarrativePreview, StreamingMessage
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+        self.deleted = False
+
+    async def edit(self, content):
+        self.content = content
+
+    async def delete(self):
+        self.deleted = True
+
+class FakeChannel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content):
+        message = FakeMessage(content)
+        self.sent.append(message)
+        return message
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _visible(text):
+    parser = StreamingProtocolParser()
+    parser.feed(text)
+    return parser.visible
+
+def test_visible_text_holds_back_unclosed_blocks():
+    assert _visible("The door creaks open.\n```MEMORY_UPD") == "The door creaks open."
+    assert _visible("The door creaks open. `") == "The door creaks open."
+    assert _visible("A map:\n```text\nunfinished") == "A map:"
+
+def test_visible_text_hides_closed_protocol_blocks_only():
+    text = "You enter.\n```MEMORY_UPDATE\n- Door opened\n```\nA goblin!\n```text\nmap\n```"
+    assert _visible(text) == "You enter.\n\nA goblin!"  # The last fence could still become "```DATA_TABLE"
+    assert _visible(text + "\n") == "You enter.\n\nA goblin!\n```text\nmap\n```"
+    shown = _visible("```dice_roll Alistair rolls 1d20```Done")
+    assert shown.startswith("🎲 **Alistair** rolls 1d20") and shown.endswith("Done")
+
+def test_parser_releases_text_as_blocks_resolve():
+    parser = StreamingProtocolParser()
+
+    assert parser.feed("The goblin lunges. ``") == "The goblin lunges. "
+    assert parser.feed("`MEMORY_UPDATE\n- Goblin ") == ""
+    assert parser.feed("attacked\n`") == ""
+    assert parser.result.facts is None
+    assert parser.feed("``\nRoll!") == "\nRoll!"
+    assert parser.result.facts == "- Goblin attacked"  # Handler ran as soon as the block closed
+
+    result = parser.close()
+    assert result.text == "The goblin lunges. \nRoll!"
+    assert [kind for kind, _ in result.timings] == ["MEMORY_UPDATE"]
+
+def test_streamed_result_is_not_processed_twice():
+    pending_rolls.clear()
+    text = "Who goes first?\n```ROLL_CALL\n@Kaelen: 1d20 for Stealth\n```\n```VISUAL_PROMPT\nA dark hall\n```"
+    parser = StreamingProtocolParser()
+    for i in range(0, len(text), 5):
+        parser.feed(text[i:i + 5])
+
+    final_text, facts, visual_prompt, _, _ = process_response_formatting(text, parsed=parser.close())
+
+    assert final_text == "Who goes first?\n📋 **Kaelen**, roll 1d20 for Stealth"
+    assert visual_prompt == "A dark hall"
+    assert [kind for kind, _ in parser.result.timings] == ["ROLL_CALL", "VISUAL_PROMPT"]
+
+def test_roll_calls_wait_for_the_turn_to_commit():
+    pending_rolls.clear()
+    text = "Roll!\n```ROLL_CALL\n@Kaelen: 1d20 for Stealth\n```"
+    parser = StreamingProtocolParser()
+    parser.feed(text)
+    assert pending_rolls == {}  # A superseded turn must leave no pending rolls
+
+    roll_calls = []
+    final_text, *_ = process_response_formatting(text, parsed=parser.close(), roll_calls=roll_calls)
+    assert final_text == "Roll!\n📋 **Kaelen**, roll 1d20 for Stealth"
+    assert pending_rolls == {}
+
+    register_roll_calls(roll_calls)  # After turn.commit()
+    assert pending_rolls["Kaelen"]["notation"] == "1d20"
+
+def test_close_suppresses_a_truncated_block():
+    text = "The crypt door groans open.\n\n```MEMORY_UPDATE\n- Party enters the crypt\n- Alistair"
+    parser = StreamingProtocolParser()
+    for i in range(0, len(text), 7):
+        parser.feed(text[i:i + 7])
+
+    final_text, facts, _, _, _ = process_response_formatting(text, parsed=parser.close())
+
+    assert final_text == "The crypt door groans open."
+    assert facts == "- Party enters the crypt"
+
+    parser = StreamingProtocolParser()
+    parser.feed("Darkness falls.\n```DATA_TA")
+    assert parser.close().text == "Darkness falls.\n"
+
+def test_preview_filters_mentions_split_across_chunks(monkeypatch, tmp_path):
+    from src.modules.narrative import parser
+    from src.modules.presence.manager import AwayManager
+
+    away = AwayManager(filepath=str(tmp_path / "away_status.json"))
+    away.set_away("555", "auto-pilot", 1)
+    monkeypatch.setattr(parser, "away_manager", away)
+    preview = NarrativePreview()
+
+    assert preview.append("\nThe goblin turns to <@5") == "The goblin turns to "
+    assert preview.append("55>.\n\n\n\n") == "The goblin turns to **(Away)**."
+    assert preview.append("It snarls, a < b.") == "The goblin turns to **(Away)**.\n\nIt snarls, a < b."
+
+def test_preview_stops_at_the_paragraph_guard():
+    preview = NarrativePreview(limit=60)
+    preview.append("The door opens onto a long hall.\n\n")
+    text = preview.append("Torches gutter as the wind howls through the broken roof.")
+
+    assert text == "The door opens onto a long hall."
+    assert preview.full
+    assert preview.append("More.") == text
+
+@pytest.mark.asyncio
+async def test_first_post_is_immediate_and_edits_are_throttled():
+    channel, clock = FakeChannel(), FakeClock()
+    commits = []
+    stream = StreamingMessage(channel, edit_interval=1.0, on_first_post=lambda: commits.append(True), clock=clock)
+
+    await stream.update("")
+    assert channel.sent == [] and commits == []
+
+    await stream.update("The")
+    clock.now = 0.5
+    await stream.update("The tavern")
+    assert [m.content for m in channel.sent] == ["The"]
+    assert commits == [True]
+
+    clock.now = 1.2
+    await stream.update("The tavern falls silent.")
+    assert channel.sent[0].content == "The tavern falls silent."
+    assert stream.stats == {"sends": 1, "edits": 1, "skipped": 1}
+
+@pytest.mark.asyncio
+async def test_finalize_spills_and_trims_messages():
+    channel = FakeChannel()
+    stream = StreamingMessage(channel, limit=20, clock=FakeClock())
+
+    await stream.finalize("First paragraph.\n\nSecond paragraph.")
+    assert [m.content for m in channel.sent] == ["First paragraph.", "Second paragraph."]
+
+    await stream.finalize("Condensed.")
+    assert channel.sent[0].content == "Condensed."
+    assert channel.sent[1].deleted
+    assert len(stream.messages) == 1
@@ -0,0 +1,70 @@
+from prettytable import PrettyTable
+from src.modules.narrative.parser import process_response_formatting
+from src.modules.narrative.tables import display_width, parse_table_block, render_table, render_table_block
+
+def _block(body):
+    return f"```DATA_TABLE\n{body}\n```"
+
+def test_boxed_matches_prettytable():
+    headers, rows = ["Item", "Cost"], [["Potion", "50 gp"], ["Rope", ""]]
+    pt = PrettyTable()
+    pt.field_names = headers
+    pt.align = "l"
+    for row in rows:
+        pt.add_row(row)
+
+    rendered = render_table("Shop", headers, rows)
+
+    assert rendered.layout == "boxed"
+    assert rendered.text == f"**Shop**\n```text\n{pt.get_string()}\n```"
+
+def test_markdown_pipes_and_separator_rows():
+    title, headers, rows = parse_table_block("Title: Loot\n| Item | Cost |\n|:---|---:|\n| Sword | 10 gp |\n| Rope |")
+
+    assert title == "Loot"
+    assert headers == ["Item", "Cost"]
+    assert rows == [["Sword", "10 gp"], ["Rope", ""]]
+
+def test_wide_table_wraps_to_max_width():
+    rows = [["Sword", "A long blade forged in the fires of the northern mountains, still warm"]]
+    rendered = render_table("Loot", ["Item", "Description"], rows, max_width=40)
+
+    assert rendered.layout == "wrapped"
+    table_lines = [l for l in rendered.text.split("\n") if l.startswith(("|", "+"))]
+    assert all(display_width(l) <= 40 for l in table_lines)
+    assert "| Sword | A long blade" in rendered.text
+
+def test_too_many_columns_fall_back_to_compact():
+    rendered = render_table("Party", ["Name", "HP", "AC", "Class"], [["Kaelen", "12", "15", "Fighter"]], max_width=12)
+
+    assert rendered.layout == "compact"
+    assert rendered.text == "**Party**\n• **Kaelen** — HP: 12 · AC: 15 · Class: Fighter"
+
+def test_overflow_attaches_full_table():
+    rows = [[f"Item {i}", f"{i} gp"] for i in range(100)]
+    rendered = render_table("Merchant Stock", ["Item", "Cost"], rows, max_chars=400)
+
+    assert len(rendered.text) <= 400
+    assert rendered.filename == "merchant_stock.txt"
+    assert "more rows in `merchant_stock.txt`" in rendered.text
+    assert "Item 99" in rendered.attachment and "Item 99" not in rendered.text
+
+    attachments = []
+    text, *_ = process_response_formatting(_block("Title: Merchant Stock\nItem | Cost\n" + "\n".join(f"Item {i} | {i} gp" for i in range(200))), attachments=attachments)
+    assert "more rows in `merchant_stock.txt`" in text
+    assert attachments and attachments[0][0] == "merchant_stock.txt"
+
+def test_wide_characters_are_aligned():
+    assert display_width("龍") == 2
+    rendered = render_table("Names", ["Name"], [["龍"], ["ab"]])
+
+    lines = rendered.text.split("\n")[2:-1]
+    assert len({display_width(l) for l in lines}) == 1
+
+def test_repeated_blocks_hit_the_cache():
+    body = "Title: Cache Test\nName | Value\nA | 1"
+    render_table_block(body)
+    hits = render_table_block.cache_info().hits
+
+    assert render_table_block(body) is render_table_block(body)
+    assert render_table_block.cache_info().hits == hits + 2
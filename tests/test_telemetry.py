@@ -0,0 +1,123 @@
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+import discord
+from src.core.llm import GeminiProvider, ResilientProvider
+from src.core.telemetry import CallRecord, Telemetry, TelemetryProvider, format_aggregates, report_usage
+
+def _usage(prompt, output, cached=None):
+    return SimpleNamespace(prompt_token_count=prompt, candidates_token_count=output, cached_content_token_count=cached)
+
+class UsageClient:
+    """genai.Client stand-in whose responses carry usage_metadata."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate, generate_content_stream=self._stream))
+
+    async def _generate(self, model, contents, config):
+        if self.failures:
+            self.failures -= 1
+            raise TimeoutError("slow")
+        return SimpleNamespace(text="The GM speaks.", usage_metadata=_usage(120, 30, 100))
+
+    async def _stream(self, model, contents, config):
+        async def chunks():
+            yield SimpleNamespace(text="The GM ", usage_metadata=_usage(120, 2))
+            yield SimpleNamespace(text="speaks.", usage_metadata=_usage(120, 5))
+        return chunks()
+
+@pytest.mark.asyncio
+async def test_gemini_usage_is_recorded_per_caller():
+    telemetry = Telemetry()
+    provider = TelemetryProvider(GeminiProvider(api_key="x", client=UsageClient()), telemetry)
+
+    await provider.generate("gm-model", "sys", [], caller="gm")
+
+    record = telemetry.records[0]
+    assert (record.caller, record.model, record.stream, record.ok) == ("gm", "gm-model", False, True)
+    assert (record.prompt_tokens, record.output_tokens, record.cached_tokens) == (120, 30, 100)
+    assert record.latency >= 0
+
+@pytest.mark.asyncio
+async def test_stream_reports_final_usage_and_first_token():
+    telemetry = Telemetry()
+    provider = TelemetryProvider(GeminiProvider(api_key="x", client=UsageClient()), telemetry)
+
+    text = "".join([d async for d in provider.generate_stream("gm-model", "sys", [], caller="gm")])
+
+    record = telemetry.records[0]
+    assert text == "The GM speaks."
+    assert record.stream and record.first_token is not None
+    assert (record.prompt_tokens, record.output_tokens) == (120, 5)  # Cumulative usage, counted once
+
+@pytest.mark.asyncio
+async def test_usage_from_retries_is_summed():
+    telemetry = Telemetry()
+    inner = ResilientProvider(GeminiProvider(api_key="x", client=UsageClient(failures=1)), backoff_base=0.0, timeout=None)
+    provider = TelemetryProvider(inner, telemetry)
+
+    await provider.generate("gm-model", "sys", [], caller="architect")
+
+    assert telemetry.records[0].prompt_tokens == 120  # Failed attempt reported nothing
+
+@pytest.mark.asyncio
+async def test_errors_and_early_stop():
+    telemetry = Telemetry()
+
+    class Broken:
+        async def generate(self, *args, **kwargs):
+            report_usage(10, 0)
+            raise TimeoutError("stalled")
+
+        async def generate_stream(self, *args, **kwargs):
+            for part in ("a", "b", "c"):
+                yield part
+
+    provider = TelemetryProvider(Broken(), telemetry)
+    with pytest.raises(TimeoutError):
+        await provider.generate("m", "", [], caller="feedback")
+    stream = provider.generate_stream("m", "", [], caller="gm")
+    assert await stream.__anext__() == "a"
+    await stream.aclose()
+
+    failed, stopped = telemetry.records
+    assert (failed.ok, failed.error, failed.prompt_tokens) == (False, "TimeoutError", 10)
+    assert stopped.ok and stopped.caller == "gm"
+
+def test_report_usage_outside_a_call_is_ignored():
+    report_usage(5, 5, 5)
+
+def test_aggregates_and_jsonl(tmp_path):
+    dump = tmp_path / "calls.jsonl"
+    telemetry = Telemetry(max_records=3, dump_path=str(dump))
+    for caller, latency in (("gm", 1.0), ("gm", 3.0), ("architect", 8.0), ("gm", 2.0)):
+        telemetry.add(CallRecord(timestamp=1e12, caller=caller, model="m", latency=latency, prompt_tokens=100, output_tokens=10))
+
+    aggregates = telemetry.aggregates()
+    assert list(aggregates) == ["architect", "gm"]  # Oldest record dropped from memory
+    assert aggregates["gm"]["calls"] == 2
+    assert aggregates["gm"]["prompt_tokens"] == 200
+    assert aggregates["gm"]["p95_latency"] == 3.0
+    assert len(dump.read_text().splitlines()) == 4  # ...but kept in the file
+    assert json.loads(telemetry.to_jsonl().splitlines()[0])["caller"] == "gm"
+    assert "architect" in format_aggregates(aggregates)
+    assert format_aggregates({}) == "No LLM calls recorded."
+
+@pytest.mark.asyncio
+async def test_llm_stats_command_dumps_jsonl():
+    from src.main import llm_stats_command
+
+    telemetry = Telemetry()
+    telemetry.add(CallRecord(timestamp=1e12, caller="bard", model="m", latency=0.5))
+    interaction = AsyncMock(spec=discord.Interaction)
+    interaction.response = AsyncMock(spec=discord.InteractionResponse)
+
+    with patch("src.main.llm_telemetry", telemetry):
+        await llm_stats_command.callback(interaction, minutes=0, dump=True)
+
+    args, kwargs = interaction.response.send_message.call_args
+    assert "bard" in args[0]
+    assert kwargs["ephemeral"] is True
+    assert kwargs["file"].filename == "llm_calls.jsonl"
@@ -0,0 +1,172 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from src.modules.narrative.turns import TurnScheduler
+
+def _message(channel, content):
+    return SimpleNamespace(channel=channel, content=content)
+
+@pytest.mark.asyncio
+async def test_burst_is_folded_into_one_turn():
+    turns = []
+
+    async def handler(channel, messages, turn):
+        turns.append([m.content for m in messages])
+
+    scheduler = TurnScheduler(handler, window=0.05)
+    channel = SimpleNamespace(id=1)
+    for text in ["I draw my sword", "I cast shield", "I hide", "I pray"]:
+        scheduler.submit(_message(channel, text))
+        await asyncio.sleep(0.01)
+
+    await asyncio.sleep(0.15)
+    assert turns == [["I draw my sword", "I cast shield", "I hide", "I pray"]]
+    assert scheduler.stats["messages"] == 4
+    assert scheduler.stats["turns"] == 1
+    assert not scheduler.is_busy(1)
+
+@pytest.mark.asyncio
+async def test_messages_during_generation_form_next_turn():
+    turns = []
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def handler(channel, messages, turn):
+        turns.append([m.content for m in messages])
+        turn.commit()
+        started.set()
+        await release.wait()
+
+    scheduler = TurnScheduler(handler, window=0.01)
+    channel = SimpleNamespace(id=1)
+    scheduler.submit(_message(channel, "first"))
+    await started.wait()
+
+    scheduler.submit(_message(channel, "second"))
+    scheduler.submit(_message(channel, "third"))
+    assert scheduler.pending_count(1) == 2
+    assert len(turns) == 1
+
+    release.set()
+    await asyncio.sleep(0.05)
+    assert turns == [["first"], ["second", "third"]]
+
+@pytest.mark.asyncio
+async def test_max_delay_caps_a_continuous_burst():
+    turns = []
+
+    async def handler(channel, messages, turn):
+        turns.append(len(messages))
+
+    scheduler = TurnScheduler(handler, window=0.05, max_delay=0.1)
+    channel = SimpleNamespace(id=1)
+    for i in range(12):
+        scheduler.submit(_message(channel, f"msg {i}"))
+        await asyncio.sleep(0.02)
+
+    await asyncio.sleep(0.15)
+    assert len(turns) >= 2
+    assert sum(turns) == 12
+
+@pytest.mark.asyncio
+async def test_channels_are_independent_and_errors_do_not_stop_worker():
+    turns = []
+
+    async def handler(channel, messages, turn):
+        if messages[0].content == "boom":
+            raise RuntimeError("generation failed")
+        turns.append((channel.id, messages[0].content))
+
+    scheduler = TurnScheduler(handler, window=0.01)
+    a, b = SimpleNamespace(id=1), SimpleNamespace(id=2)
+    scheduler.submit(_message(a, "boom"))
+    scheduler.submit(_message(b, "hello"))
+    await asyncio.sleep(0.05)
+    scheduler.submit(_message(a, "retry"))
+    await asyncio.sleep(0.05)
+
+    assert sorted(turns) == [(1, "retry"), (2, "hello")]
+
+@pytest.mark.asyncio
+async def test_uncommitted_turn_is_superseded_by_new_input():
+    turns = []
+    started = asyncio.Event()
+
+    async def handler(channel, messages, turn):
+        started.set()
+        await asyncio.sleep(0.05)  # "generating"
+        turns.append([m.content for m in messages])
+
+    scheduler = TurnScheduler(handler, window=0.01)
+    channel = SimpleNamespace(id=1)
+    scheduler.submit(_message(channel, "I open the door"))
+    await started.wait()
+    scheduler.submit(_message(channel, "wait, I knock first"))
+
+    await asyncio.sleep(0.15)
+    assert turns == [["I open the door", "wait, I knock first"]]
+    metrics = scheduler.get_metrics()
+    assert metrics["cancelled"] == 1
+    assert metrics["turns"] == 1
+    assert metrics["queue_depth"] == 0
+
+@pytest.mark.asyncio
+async def test_restart_keeps_the_max_delay_anchor():
+    loop = asyncio.get_running_loop()
+    started = []
+
+    async def handler(channel, messages, turn):
+        started.append(loop.time())
+        await asyncio.sleep(0.5)  # "generating"
+
+    scheduler = TurnScheduler(handler, window=0.1, max_delay=0.2)
+    channel = SimpleNamespace(id=1)
+    t0 = loop.time()
+    scheduler.submit(_message(channel, "I open the door"))
+    await asyncio.sleep(0.25)
+    scheduler.submit(_message(channel, "wait, I knock first"))
+    await asyncio.sleep(0.02)
+
+    # The burst began at t0, so max_delay has passed and the replacement starts at once
+    assert len(started) == 2
+    assert started[1] - t0 < 0.3
+
+@pytest.mark.asyncio
+async def test_restarts_are_capped():
+    completed = []
+
+    async def handler(channel, messages, turn):
+        await asyncio.sleep(0.03)
+        completed.append(len(messages))
+
+    scheduler = TurnScheduler(handler, window=0.0, max_restarts=1)
+    channel = SimpleNamespace(id=1)
+    scheduler.submit(_message(channel, "a"))
+    for text in ["b", "c", "d"]:
+        await asyncio.sleep(0.01)
+        scheduler.submit(_message(channel, text))
+
+    await asyncio.sleep(0.2)
+    assert scheduler.stats["cancelled"] == 1
+    assert sum(completed) == 4
+
+@pytest.mark.asyncio
+async def test_queue_is_bounded():
+    release = asyncio.Event()
+
+    async def handler(channel, messages, turn):
+        turn.commit()
+        await release.wait()
+
+    scheduler = TurnScheduler(handler, window=0.0, max_pending=3)
+    channel = SimpleNamespace(id=1)
+    scheduler.submit(_message(channel, "first"))
+    await asyncio.sleep(0.01)
+    for i in range(5):
+        scheduler.submit(_message(channel, f"queued {i}"))
+
+    assert scheduler.pending_count(1) == 3
+    assert scheduler.stats["dropped"] == 2
+    assert scheduler.get_metrics()["in_flight"] == 1
+    release.set()
+    await asyncio.sleep(0.02)